@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of NINJA-IDE (http://ninja-ide.org).
+#
+# NINJA-IDE is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# any later version.
+#
+# NINJA-IDE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
+"""Compare the changed lines tracker of the gutter with difflib.
+
+The TextChangeWidget is registered in a plain editor and the time spent
+in its slot of each change of the document is measured. It's compared
+with a difflib pass over the whole text, what the widget did after each
+edit before. The unsaved lines of both must be the same.
+
+Run it from the root of the repository:
+
+    QT_QPA_PLATFORM=offscreen python3 benchmarks/text_changes.py [lines]
+"""
+
+import os
+import sys
+import time
+import random
+import difflib
+
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtWidgets import QPlainTextEdit
+from PyQt5.QtGui import QTextCursor
+from PyQt5.QtCore import QObject
+from PyQt5.QtCore import pyqtSignal
+
+LINES = 20000
+EDITS = 200
+
+
+class _NEditable(QObject):
+    fileSaved = pyqtSignal()
+
+
+class _Editor(QPlainTextEdit):
+    """What the TextChangeWidget needs of a NEditor"""
+
+    def __init__(self, text):
+        super().__init__()
+        self.setPlainText(text)
+        self.neditable = _NEditable()
+        self.visible_blocks = []
+
+
+def _edits(lines):
+    """Return the (line, column, removed chars, text) of the edits"""
+    rand = random.Random(0)
+    edits = []
+    for _ in range(EDITS):
+        lineno = rand.randrange(lines // 3, 2 * lines // 3)
+        text = rand.choice(["x", "new_name", "\n    pass\n", "# ", ""])
+        edits.append((lineno, rand.randrange(4), rand.randrange(3), text))
+    return edits
+
+
+def _apply(editor, edits):
+    """Do the edits in editor"""
+    document = editor.document()
+    for lineno, column, removed, text in edits:
+        block = document.findBlockByNumber(
+            min(lineno, document.blockCount() - 1))
+        cursor = QTextCursor(block)
+        cursor.movePosition(QTextCursor.Right, QTextCursor.MoveAnchor,
+                            min(column, block.length() - 1))
+        cursor.movePosition(QTextCursor.Right, QTextCursor.KeepAnchor,
+                            removed)
+        cursor.insertText(text)
+
+
+def _difflib_unsaved(saved_text, text):
+    """The unsaved lines as the widget computed them with difflib"""
+    unsaved = set()
+    matcher = difflib.SequenceMatcher(None, saved_text.splitlines(),
+                                      text.splitlines())
+    for tag, _, _, j1, j2 in matcher.get_opcodes():
+        if tag in ('insert', 'replace'):
+            unsaved.update(range(j1, j2))
+    return unsaved
+
+
+def main(lines=LINES):
+    app = QApplication(sys.argv)
+    sys.path.insert(0, os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))))
+    from ninja_ide import resources
+    from ninja_ide.tools import json_manager
+    resources.COLOR_SCHEME = json_manager.load_editor_schemes()[
+        "Ninja Dark"]
+    from ninja_ide.gui.editor.side_area import text_change_widget
+
+    saved_text = "\n".join("value_%d = compute(%d)  # line" % (i, i)
+                           for i in range(lines))
+    edits = _edits(lines)
+
+    editor = _Editor(saved_text)
+    # The slots are called in the order they were connected, the ones
+    # around the widget measure its slot
+    spent = [0.0, 0.0]
+    document = editor.document()
+    document.contentsChange.connect(
+        lambda *args: spent.__setitem__(0, time.perf_counter()))
+    widget = text_change_widget.TextChangeWidget()
+    widget.register(editor)
+    document.contentsChange.connect(
+        lambda *args: spent.__setitem__(
+            1, spent[1] + time.perf_counter() - spent[0]))
+    _apply(editor, edits)
+    changes = widget._TextChangeWidget__changes
+
+    text = editor.toPlainText()
+    start = time.perf_counter()
+    expected = _difflib_unsaved(saved_text, text)
+    difflib_time = time.perf_counter() - start
+
+    unsaved = set(lineno for lineno, state in enumerate(changes.states)
+                  if state == text_change_widget.UNSAVED)
+    tracker_ms = spent[1] / len(edits) * 1000
+    print("%d lines, %d edits" % (lines, len(edits)))
+    print("tracker: %.3f ms per edit" % tracker_ms)
+    print("difflib: %.3f ms per pass" % (difflib_time * 1000))
+    print("same unsaved lines: %s" % (unsaved == expected))
+    app.quit()
+    return 0 if unsaved == expected else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(*[int(arg) for arg in sys.argv[1:2]]))
@@ -58,12 +58,17 @@ def _get_parser():
     parser.add_argument('--logfile', help="A file path to log, special "
                         "words STDOUT or STDERR are accepted",
                         default=None, metavar="logfile")
+    parser.add_argument('--profile-startup', help="Write the time of each "
+                        "phase of the start and of each import to a "
+                        "report, ~/.ninja_ide/startup_profile.txt by "
+                        "default", nargs='?', const='', default=None,
+                        metavar="report")
     return parser
 
 
 def parse():
     filenames = projects_path = linenos = None
-    extra_plugins = log_level = log_file = None
+    extra_plugins = log_level = log_file = profile_startup = None
 
     try:
         opts = _get_parser().parse_args()
@@ -85,9 +90,10 @@ def parse():
             else [opts.plugin]
         log_level = opts.loglevel
         log_file = opts.logfile
+        profile_startup = opts.profile_startup
 
     except Exception as reason:
         print("Args couldn't be parsed.")
         print(reason)
     return (filenames, projects_path, extra_plugins, linenos, log_level,
-            log_file)
+            log_file, profile_startup)
@@ -42,27 +42,35 @@ def run_ninja():
             libc.prctl(PR_SET_NAME, b"%s\0" % PROCNAME, 0, 0, 0)
         except OSError:
             print("The process couldn't be renamed'")
-    filenames, projects_path, extra_plugins, linenos, log_level, log_file = \
-        cliparser.parse()
+    (filenames, projects_path, extra_plugins, linenos, log_level, log_file,
+     profile_startup) = cliparser.parse()
     # Create the QApplication object before using the
     # Qt modules to avoid warnings
     app = QApplication(sys.argv)
     from ninja_ide import resources
-    from ninja_ide.core import settings
+    # The loggers write in the home folder, it must exist before any
+    # module creates one
     resources.create_home_dir_structure()
+    from ninja_ide.tools import startup_profiler
+    if profile_startup is not None:
+        startup_profiler.enable(profile_startup)
+    from ninja_ide.core import settings
     # Load Logger
     from ninja_ide.tools.logger import NinjaLogger
     NinjaLogger.argparse(log_level, log_file)
 
     # Load Settings
-    settings.load_settings()
+    with startup_profiler.phase("Load settings"):
+        settings.load_settings()
     QCoreApplication.setAttribute(Qt.AA_EnableHighDpiScaling, settings.HDPI)
     if settings.CUSTOM_SCREEN_RESOLUTION:
         os.environ["QT_SCALE_FACTOR"] = settings.CUSTOM_SCREEN_RESOLUTION
-    from ninja_ide import ninja_style
-    app.setStyle(ninja_style.NinjaStyle(resources.load_theme()))
+    with startup_profiler.phase("Load style"):
+        from ninja_ide import ninja_style
+        app.setStyle(ninja_style.NinjaStyle(resources.load_theme()))
 
-    from ninja_ide import gui
+    with startup_profiler.phase("Import GUI"):
+        from ninja_ide import gui
     # Start the UI
     gui.start_ide(app, filenames, projects_path, extra_plugins, linenos)
 
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of NINJA-IDE (http://ninja-ide.org).
+#
+# NINJA-IDE is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# any later version.
+#
+# NINJA-IDE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
+"""Files of a folder and its sub folders, listed once and kept current.
+
+Each folder is listed the first time it is needed and watched since
+then, when it changes only that folder is listed again. The entries have
+the size, mtime and inode the files had when their folder was listed,
+a file changed in place keeps its entry until the folder is listed
+again (rescan). Hidden files and folders are skipped, like QDir does by
+default."""
+
+import os
+import threading
+from collections import namedtuple
+
+from PyQt5.QtCore import QObject
+from PyQt5.QtCore import QFileSystemWatcher
+from PyQt5.QtCore import pyqtSignal
+from PyQt5.QtCore import pyqtSlot
+
+from ninja_ide.tools.logger import NinjaLogger
+
+logger = NinjaLogger('ninja_ide.core.file_handling.file_inventory')
+
+
+class FileEntry(namedtuple('FileEntry', 'path extension size mtime inode')):
+    """A file listed, mtime in ns"""
+
+    __slots__ = ()
+
+    @property
+    def stamp(self):
+        """(mtime, size, inode), a file changed when its stamp changed"""
+        return (self.mtime, self.size, self.inode)
+
+
+def _list_folder(folder):
+    """Return ({name: FileEntry}, [sub folders]) of folder or None if it
+    can't be read"""
+    try:
+        entries = list(os.scandir(folder))
+    except OSError:
+        return None
+    files = {}
+    sub_folders = []
+    for entry in entries:
+        if entry.name.startswith('.'):
+            continue
+        try:
+            if entry.is_dir():
+                sub_folders.append(entry.path)
+            else:
+                stat = entry.stat()
+                files[entry.name] = FileEntry(
+                    entry.path, os.path.splitext(entry.name)[1],
+                    stat.st_size, stat.st_mtime_ns, entry.inode())
+        except OSError:
+            continue
+    return files, sorted(sub_folders)
+
+
+def _matches(entry, extensions):
+    return not extensions or entry.path.endswith(extensions)
+
+
+class FileInventory(QObject):
+    """Files of path, it can be queried from any thread.
+
+    inventoryChanged is emitted with the folder listed again when it
+    changed."""
+
+    inventoryChanged = pyqtSignal('QString')
+    # Folders listed (from any thread) to be watched in the owner thread
+    _foldersListed = pyqtSignal()
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self._lock = threading.Lock()
+        # folder -> ({name: FileEntry}, [sub folders])
+        self._folders = {}
+        # True when all the sub folders were listed
+        self._complete = False
+        self._filling = False
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged['const QString&'].connect(
+            self._on_directory_changed)
+        self._foldersListed.connect(self._sync_watcher)
+
+    @property
+    def complete(self):
+        """True when all the sub folders were listed"""
+        return self._complete
+
+    def _folder(self, folder):
+        """Return the listing of folder, list it if it isn't known"""
+        with self._lock:
+            listing = self._folders.get(folder)
+        if listing is None:
+            listing = _list_folder(folder)
+            if listing is None:
+                return {}, []
+            with self._lock:
+                self._folders[folder] = listing
+            self._foldersListed.emit()
+        return listing
+
+    def _walk(self, folder):
+        """List folder and its sub folders that aren't known"""
+        folders = [folder]
+        listed = False
+        while folders:
+            current = folders.pop()
+            with self._lock:
+                listing = self._folders.get(current)
+            if listing is None:
+                listing = _list_folder(current)
+                if listing is None:
+                    continue
+                with self._lock:
+                    self._folders[current] = listing
+                listed = True
+            folders.extend(reversed(listing[1]))
+        if listed:
+            self._foldersListed.emit()
+
+    def walk(self):
+        """List all the sub folders not known yet, in the calling thread"""
+        if not self._complete:
+            self._walk(self.path)
+            self._complete = True
+
+    def fill(self):
+        """List all the sub folders in a thread of its own, the queries
+        give what is known meanwhile"""
+        with self._lock:
+            if self._complete or self._filling:
+                return
+            self._filling = True
+        thread = threading.Thread(target=self._fill, daemon=True)
+        thread.start()
+
+    def _fill(self):
+        try:
+            self.walk()
+        except Exception as reason:
+            logger.error("Files of %s not listed: %r" % (self.path, reason))
+        finally:
+            self._filling = False
+
+    def rescan(self):
+        """List again all the folders, in the calling thread. The entries
+        of the files changed in place are current after it"""
+        folders = {}
+        pending = [self.path]
+        while pending:
+            folder = pending.pop()
+            listing = _list_folder(folder)
+            if listing is None:
+                continue
+            folders[folder] = listing
+            pending.extend(listing[1])
+        with self._lock:
+            self._folders = folders
+            self._complete = True
+        self._foldersListed.emit()
+
+    def folder_entries(self, folder=None, extensions=None):
+        """Return the FileEntry of the files in folder (the root one by
+        default) sorted by name, only the ones with extensions if given"""
+        files, _ = self._folder(folder or self.path)
+        extensions = tuple(extensions or ())
+        return [entry for _, entry in sorted(files.items())
+                if _matches(entry, extensions)]
+
+    def folder_files(self, folder=None, extensions=None):
+        """Return the paths of folder_entries"""
+        return [entry.path
+                for entry in self.folder_entries(folder, extensions)]
+
+    def entries(self, extensions=None, folder=None):
+        """Return the FileEntry of the files listed in folder (the root
+        one by default) and its sub folders, only the ones with
+        extensions if given. Nothing is listed, see walk and fill"""
+        folder = folder or self.path
+        prefix = os.path.join(folder, '')
+        with self._lock:
+            listings = [files for known, (files, _) in self._folders.items()
+                        if known == folder or known.startswith(prefix)]
+        extensions = tuple(extensions or ())
+        return [entry for files in listings for entry in files.values()
+                if _matches(entry, extensions)]
+
+    def files(self, extensions=None):
+        """Return the paths of all the files listed, only the ones with
+        extensions if given"""
+        return [entry.path for entry in self.entries(extensions)]
+
+    def refresh(self, folder=None):
+        """List folder (the root one by default) again now"""
+        folder = folder or self.path
+        with self._lock:
+            known = folder in self._folders
+        if known:
+            self._on_directory_changed(folder)
+
+    def clear(self):
+        """Forget the files and stop watching the folders"""
+        with self._lock:
+            self._folders.clear()
+            self._complete = False
+        folders = self._watcher.directories()
+        if folders:
+            self._watcher.removePaths(folders)
+
+    @pyqtSlot()
+    def _sync_watcher(self):
+        """Watch the folders listed, only them"""
+        with self._lock:
+            known = set(self._folders)
+        watched = set(self._watcher.directories())
+        if watched - known:
+            self._watcher.removePaths(list(watched - known))
+        if known - watched:
+            self._watcher.addPaths(list(known - watched))
+
+    def _drop(self, folders):
+        """Forget folders and their sub folders"""
+        prefixes = tuple(folder + os.sep for folder in folders)
+        dropped = [known for known in self._folders
+                   if known in folders or known.startswith(prefixes)]
+        for known in dropped:
+            del self._folders[known]
+
+    @pyqtSlot('QString')
+    def _on_directory_changed(self, folder):
+        listing = _list_folder(folder)
+        with self._lock:
+            old = self._folders.pop(folder, None)
+            if listing is None:
+                # Removed, with its sub folders
+                self._drop([folder])
+            else:
+                self._folders[folder] = listing
+                if old is not None:
+                    self._drop(set(old[1]) - set(listing[1]))
+        if listing is not None and old is not None and self._complete:
+            for added in set(listing[1]) - set(old[1]):
+                self._walk(added)
+        self._sync_watcher()
+        self.inventoryChanged.emit(folder)
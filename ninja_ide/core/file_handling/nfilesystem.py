@@ -29,6 +29,51 @@ from ninja_ide.tools.logger import NinjaLogger
 logger = NinjaLogger('ninja_ide.core.file_handling.nfilesystem')
 
 
+class _PathTrie(object):
+    """Map folders to values, the value of the deepest folder containing
+    a path is found in the time of walking its parts"""
+
+    def __init__(self):
+        # {part: node}, the value of a folder is in the key None
+        self._root = {}
+
+    def _parts(self, path):
+        return [part for part in os.path.normpath(path).split(os.sep)
+                if part]
+
+    def add(self, path, value):
+        node = self._root
+        for part in self._parts(path):
+            node = node.setdefault(part, {})
+        node[None] = value
+
+    def remove(self, path):
+        nodes = [self._root]
+        parts = self._parts(path)
+        for part in parts:
+            node = nodes[-1].get(part)
+            if node is None:
+                return
+            nodes.append(node)
+        nodes[-1].pop(None, None)
+        # Remove the nodes left empty
+        for part, node in zip(reversed(parts), reversed(nodes[:-1])):
+            if node[part]:
+                break
+            del node[part]
+
+    def find(self, path):
+        """Return the value of the deepest folder containing path"""
+        node = self._root
+        found = node.get(None)
+        for part in self._parts(path):
+            node = node.get(part)
+            if node is None:
+                break
+            found = node.get(None, found)
+        return found
+
+
 class NVirtualFileSystem(QObject):
     # Signals
     projectOpened = pyqtSignal('QString')
@@ -38,8 +83,8 @@ class NVirtualFileSystem(QObject):
         self.__tree = {}
         self.__watchables = {}
         self.__projects = {}
-        # bc maps are cheap but my patience is not
-        self.__reverse_project_map = {}
+        # Folder of each project, to find the project of a file
+        self.__project_trie = _PathTrie()
         super(NVirtualFileSystem, self).__init__(*args, **kwargs)
 
     def list_projects(self):
@@ -59,7 +104,7 @@ class NVirtualFileSystem(QObject):
             logger.debug(pext)
             qfsm.setNameFilters(pext)
             self.__projects[project_path] = project
-            self.__check_files_for(project_path)
+            self.__project_trie.add(project_path, project)
             self.projectOpened.emit(project_path)
         else:
             qfsm = self.__projects[project_path]
@@ -77,39 +122,28 @@ class NVirtualFileSystem(QObject):
             project_root = self.__projects[project_path]
             nfiles = list(self.__tree.values())
             for nfile in nfiles:
-                if self.__reverse_project_map[nfile] == project_root:
+                if self.__project_trie.find(nfile.file_path) is \
+                        project_root:
                     del self.__tree[nfile.file_path]
                     nfile.close()
+            self.__project_trie.remove(project_path)
+            project_root.close()
             # This might not be needed just being extra cautious
             del self.__projects[project_path].model
             del self.__projects[project_path]
             self.projectClosed.emit(project_path)
 
-    def __check_files_for(self, project_path):
-        project = self.__projects[project_path]
-        for each_file_path in list(self.__tree.keys()):
-            nfile = self.__tree[each_file_path]
-            if nfile.file_path.startswith(project_path):
-                self.__reverse_project_map[nfile] = project
-
     def __closed_file(self, nfile_path):
         if nfile_path in self.__tree:
             del self.__tree[nfile_path]
-        if nfile_path in self.__reverse_project_map:
-            del self.__reverse_project_map[nfile_path]
         if nfile_path in self.__watchables:
             del self.__watchables[nfile_path]
 
     def __add_file(self, nfile):
         nfile.fileClosing['QString', bool].connect(self.__closed_file)
         # nfile.willMove.connect(lambda _, old, new: self.__closed_file(old))
-        existing_paths = sorted(list(self.__projects.keys()), reverse=True)
         self.__tree[nfile.file_path] = nfile
-        for each_path in existing_paths:
-            if nfile.file_path.startswith(each_path):
-                project = self.__projects[each_path]
-                self.__reverse_project_map[nfile] = project
-                return project
+        return self.__project_trie.find(nfile.file_path)
 
     def get_file(self, nfile_path=None):
         if nfile_path is None:
@@ -135,9 +169,7 @@ class NVirtualFileSystem(QObject):
         return self.__projects
 
     def get_project_for_file(self, filename):
-        nfile = self.get_file(filename)
-        project = self.__reverse_project_map.get(nfile, None)
-        return project
+        return self.__project_trie.find(filename)
 
     def get_files(self):
         return self.__tree
@@ -14,17 +14,26 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
+"""Interpreters of Python found in the system.
+
+What is known of each interpreter (version, sys.path, site-packages,
+platform) is asked once to it and stored in the interpreter inventory,
+INVENTORY_PATH. An interpreter is asked again only when its executable
+changes (another mtime, inode or size)."""
 
 import os
 import re
 import subprocess
 import json
+import threading
+from concurrent import futures
 
 from PyQt5.QtCore import QObject
 from PyQt5.QtCore import QTimer
 from PyQt5.QtCore import QThread
 from PyQt5.QtCore import pyqtSignal
 
+from ninja_ide import resources
 from ninja_ide.tools.logger import NinjaLogger
 from ninja_ide.tools import utils
 from ninja_ide.core import settings
@@ -39,6 +48,161 @@ else:
 # TODO: esto debería ser configurable
 _VENV_PATHS = [".virtualenvs"]
 
+INVENTORY_PATH = os.path.join(resources.NINJA_KNOWLEDGE_PATH,
+                              "interpreters.json")
+# Bump it when the info asked to the interpreters changes
+INVENTORY_VERSION = 1
+# Max time (seconds) to wait for an interpreter to answer
+PROBE_TIMEOUT = 10
+# Number of interpreters asked at the same time
+PROBE_WORKERS = 4
+
+_PROBE_CODE = """
+import sys, json
+info = {}
+info['versionInfo'] = list(sys.version_info[:4])
+info['version'] = sys.version
+info['platform'] = sys.platform
+info['prefix'] = sys.prefix
+info['sysPath'] = sys.path[1:]
+info['builtinModules'] = list(sys.builtin_module_names)
+try:
+    import site
+    info['sitePackages'] = list(site.getsitepackages())
+    info['userSitePackages'] = site.getusersitepackages()
+except Exception:
+    info['sitePackages'] = [p for p in sys.path if p.endswith('-packages')]
+    info['userSitePackages'] = None
+print(json.dumps(info))
+"""
+
+_inventory = None
+_inventory_lock = threading.Lock()
+
+
+def _executable_key(path):
+    """Return what changes when the executable of path is replaced"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_ino, stat.st_size]
+
+
+def probe(path):
+    """Ask its info to the interpreter in path, None if it fails"""
+    try:
+        output = subprocess.check_output(
+            [path, "-c", _PROBE_CODE], stdin=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL, timeout=PROBE_TIMEOUT)
+        return json.loads(output.decode())
+    except (OSError, ValueError, subprocess.SubprocessError) as reason:
+        logger.warning("Interpreter %s not probed: %r" % (path, reason))
+        return None
+
+
+class InterpreterInventory(object):
+    """Info of the interpreters already probed, it can be used from any
+    thread"""
+
+    def __init__(self, path=INVENTORY_PATH):
+        self._path = path
+        self._lock = threading.Lock()
+        # exec path -> {"key": executable key, "info": info}
+        self._entries = {}
+        self._changed = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self._path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and \
+                data.get("version") == INVENTORY_VERSION:
+            self._entries = data.get("interpreters", {})
+
+    def save(self):
+        with self._lock:
+            if not self._changed:
+                return
+            data = {"version": INVENTORY_VERSION,
+                    "interpreters": dict(self._entries)}
+            self._changed = False
+        tmp_path = self._path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self._path)
+        except OSError as reason:
+            logger.warning("Interpreter inventory not saved: %r" % reason)
+
+    def _cached(self, path):
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is not None and entry["key"] == _executable_key(path):
+            return entry["info"]
+        return None
+
+    def _probe(self, path):
+        key = _executable_key(path)
+        info = probe(path)
+        if info is not None:
+            with self._lock:
+                self._entries[path] = {"key": key, "info": info}
+                self._changed = True
+        return info
+
+    def get_info(self, path):
+        """Return the info of the interpreter in path, it is probed if it
+        is not known or it changed. None if it can't be probed."""
+        info = self._cached(path)
+        if info is None:
+            info = self._probe(path)
+        return info
+
+    def get_infos(self, paths):
+        """Return {path: info} of the interpreters in paths that answer.
+
+        The unknown or changed ones are probed at the same time."""
+        infos = {}
+        to_probe = []
+        for path in paths:
+            info = self._cached(path)
+            if info is None:
+                to_probe.append(path)
+            else:
+                infos[path] = info
+        if to_probe:
+            with futures.ThreadPoolExecutor(PROBE_WORKERS) as executor:
+                for path, info in zip(to_probe,
+                                      executor.map(self._probe, to_probe)):
+                    if info is not None:
+                        infos[path] = info
+        return infos
+
+    def prune(self):
+        """Forget the interpreters that don't exist anymore"""
+        with self._lock:
+            for path in list(self._entries):
+                if not os.path.exists(path):
+                    del self._entries[path]
+                    self._changed = True
+
+
+def get_inventory():
+    global _inventory
+    with _inventory_lock:
+        if _inventory is None:
+            _inventory = InterpreterInventory()
+        return _inventory
+
+
+def get_info(path):
+    """Return the info of the interpreter in path (see _PROBE_CODE)"""
+    return get_inventory().get_info(path)
+
 
 class InterpreterService(QObject):
 
@@ -73,8 +237,9 @@ class InterpreterService(QObject):
 
     def set_interpreter(self, path):
         if self.__current_interpreter is None:
-            interpreter = Interpreter(path)
-            interpreter.version = self.__get_version(path)
+            inventory = get_inventory()
+            interpreter = Interpreter(path, inventory.get_info(path))
+            inventory.save()
             self.__current_interpreter = interpreter
         else:
             interpreter = self.__interpreters.get(path)
@@ -89,9 +254,6 @@ class InterpreterService(QObject):
     def get_interpreters(self):
         return list(self.__interpreters.values())
 
-    def __get_version(self, path):
-        return self.__locator.get_info(path)["versionInfo"]
-
     def load(self):
         self.refresh()
         self.set_interpreter(settings.PYTHON_EXEC)
@@ -99,10 +261,14 @@ class InterpreterService(QObject):
 
 class Interpreter(object):
 
-    def __init__(self, path):
+    def __init__(self, path, info=None):
         self._path = path
         self._venv = None
         self._version = None
+        # What the interpreter said of itself (see _PROBE_CODE)
+        self.info = info or {}
+        if "versionInfo" in self.info:
+            self.version = self.info["versionInfo"]
 
     @property
     def path(self):
@@ -127,6 +293,18 @@ class Interpreter(object):
     def version(self, value):
         self._version = ".".join(map(str, value[:-1]))
 
+    @property
+    def sys_path(self):
+        return self.info.get("sysPath", [])
+
+    @property
+    def site_packages(self):
+        return self.info.get("sitePackages", [])
+
+    @property
+    def platform(self):
+        return self.info.get("platform")
+
     @property
     def venv(self):
         return self._venv
@@ -163,49 +341,43 @@ class _IntepreterLocator(QObject):
                 "/usr/sbin", "/sbin", "/usr/local/sbin"
             ]
 
-    @staticmethod
-    def get_info(interp_exec):
-        string = (
-            "import sys\nimport json\ninfo = {}\n"
-            "info['versionInfo'] = sys.version_info[:4]\n"
-            "info['version'] = sys.version\n"
-            "print(json.dumps(info))"
-        )
-        output = subprocess.check_output([interp_exec, "-c", string])
-        return json.loads(output.decode())
-
-    def load_suggestions(self):
-        # FIXME: unify this
-        interpreters, venvs = [], []
+    def _candidates(self):
+        """Return [(exec path, venv name or None)] of the interpreters
+        in the virtualenvs folders and the known paths"""
+        candidates = []
         for venv in _VENV_PATHS:
             venvdir = os.path.join(os.path.expanduser("~"), venv)
             if not os.path.exists(venvdir):
                 continue
             subdirs = os.listdir(venvdir)
             for subdir in subdirs:
-                if os.path.isdir(os.path.join(venvdir, subdir)):
-                    venvpath = os.path.join(venvdir, subdir, "bin")
-                    files = os.listdir(venvpath)
-                    for f in files:
-                        if _PYREGEX.match(f):
-                            path = os.path.join(venvpath, f)
-                            info = self.get_info(path)
-                            interpreter = Interpreter(path)
-                            interpreter.version = info["versionInfo"]
-                            interpreter.venv = subdir
-                            venvs.append(interpreter)
-
-        if self._know_paths:
-            for path in self._know_paths:
-                if not os.path.exists(path):
+                venvpath = os.path.join(venvdir, subdir, "bin")
+                if not os.path.isdir(venvpath):
                     continue
-                files = os.listdir(path)
-                for f in files:
+                for f in os.listdir(venvpath):
                     if _PYREGEX.match(f):
-                        python_path = os.path.join(path, f)
-                        info = self.get_info(python_path)
-                        interpreter = Interpreter(python_path)
-                        interpreter.version = info["versionInfo"]
-                        interpreters.append(interpreter)
-        all_interpreters = list(set(interpreters + venvs))
+                        candidates.append((os.path.join(venvpath, f), subdir))
+        for path in self._know_paths:
+            if not os.path.exists(path):
+                continue
+            for f in os.listdir(path):
+                if _PYREGEX.match(f):
+                    candidates.append((os.path.join(path, f), None))
+        return candidates
+
+    def load_suggestions(self):
+        candidates = self._candidates()
+        inventory = get_inventory()
+        infos = inventory.get_infos([path for path, _ in candidates])
+        inventory.prune()
+        inventory.save()
+        interpreters = []
+        for path, venv in candidates:
+            info = infos.get(path)
+            if info is None:
+                continue
+            interpreter = Interpreter(path, info)
+            interpreter.venv = venv
+            interpreters.append(interpreter)
+        all_interpreters = list(set(interpreters))
         self.finished.emit(all_interpreters)
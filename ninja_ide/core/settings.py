@@ -120,6 +120,11 @@ HIDE_TOOLBAR = PYTHON_EXEC_CONFIGURED_BY_USER = False
 
 PYTHON_EXEC = sys.executable
 
+# Lines kept in the output of the programs run (0: no limit)
+OUTPUT_MAX_LINES = 10000
+# Write all the output of the programs run in resources.OUTPUT_LOGS
+OUTPUT_LOG = False
+
 SESSIONS = {}
 
 TOOLBAR_ITEMS = [
@@ -226,6 +231,9 @@ CHECK_STYLE = FIND_ERRORS = True
 SHOW_LINE_NUMBERS = True
 SHOW_TEXT_CHANGES = True
 # SHOW_TEXT_CHANGE_AREA = True
+# MB of parsed modules kept in memory and pickled by the completion server
+COMPLETION_MEMORY_CACHE = 512
+COMPLETION_DISK_CACHE = 256
 # SHOW_LINT_AREA = True
 
 SYNTAX = {}
@@ -444,8 +452,10 @@ def clean_locator_db(qsettings):
     last_clean = should_clean_locator_knowledge()
     if last_clean is not None:
         file_path = os.path.join(resources.NINJA_KNOWLEDGE_PATH, 'locator.db')
-        if os.path.isfile(file_path):
-            os.remove(file_path)
+        # Include the journal files of the WAL mode
+        for path in (file_path, file_path + '-wal', file_path + '-shm'):
+            if os.path.isfile(path):
+                os.remove(path)
         qsettings.setValue("ide/cleanLocator", last_clean)
 
 
@@ -461,6 +471,8 @@ def load_settings():
     # global UI_LAYOUT
     global PYTHON_EXEC
     global EXECUTION_OPTIONS
+    global OUTPUT_MAX_LINES
+    global OUTPUT_LOG
     # global SWAP_FILE
     # global SWAP_FILE_INTERVAL
     # global PYTHON_EXEC_CONFIGURED_BY_USER
@@ -505,6 +517,8 @@ def load_settings():
     global HIDE_TOOLBAR
     global AUTOCOMPLETE_BRACKETS
     global AUTOCOMPLETE_QUOTES
+    global COMPLETION_MEMORY_CACHE
+    global COMPLETION_DISK_CACHE
     # global TOOLBAR_ITEMS
     # global SHOW_MINIMAP
     # global MINIMAP_MAX_OPACITY
@@ -578,6 +592,10 @@ def load_settings():
     # EXECUTION OPTIONS
     EXECUTION_OPTIONS = qsettings.value(
         'execution/executionOptions', defaultValue='', type=str)
+    OUTPUT_MAX_LINES = qsettings.value(
+        'execution/outputMaxLines', defaultValue=10000, type=int)
+    OUTPUT_LOG = qsettings.value(
+        'execution/outputLog', defaultValue=False, type=bool)
     # extensions = [item for item in tuple(qsettings.value(
     #    'preferences/general/supportedExtensions', []))]
     # if extensions:
@@ -672,6 +690,10 @@ def load_settings():
         "editor/intellisense/autocomplete_brackets", True, type=bool)
     AUTOCOMPLETE_QUOTES = qsettings.value(
         "editor/intellisense/autocomplete_quotes", True, type=bool)
+    COMPLETION_MEMORY_CACHE = qsettings.value(
+        "editor/intellisense/memory_cache", 512, type=int)
+    COMPLETION_DISK_CACHE = qsettings.value(
+        "editor/intellisense/disk_cache", 256, type=int)
     # CHECK_HIGHLIGHT_LINE = qsettings.value(
     #    'preferences/editor/checkStyleInline', True, type=bool)
     # CODE_COMPLETION = qsettings.value(
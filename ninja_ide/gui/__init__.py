@@ -23,11 +23,13 @@ from PyQt5.QtGui import QPixmap
 from PyQt5.QtGui import QIcon
 
 from PyQt5.QtCore import QCoreApplication
+from PyQt5.QtCore import QTimer
 from PyQt5.QtCore import Qt
 
 from ninja_ide import resources
 from ninja_ide.core import ipc
 from ninja_ide.tools import json_manager
+from ninja_ide.tools import startup_profiler
 from ninja_ide.gui import ide
 
 # Templates
@@ -95,16 +97,58 @@ def start_ide(app, filenames, projects_path, extra_plugins, linenos):
 
     # Loading Syntax
     _add_splash("Loading Syntax..")
-    json_manager.load_syntax()
-
-    load_fonts()
+    with startup_profiler.phase("Load syntax and fonts"):
+        json_manager.load_syntax()
+        load_fonts()
 
     # Loading Schemes
     _add_splash("Loading Schemes...")
-    all_schemes = json_manager.load_editor_schemes()
+    with startup_profiler.phase("Load schemes"):
+        all_schemes = json_manager.load_editor_schemes()
     resources.COLOR_SCHEME = all_schemes["Ninja Dark"]
     # Load Services
     _add_splash("Loading IDE Services...")
+    with startup_profiler.phase("Import services"):
+        _import_services()
+
+    # Loading Shortcuts
+    # resources.load_shortcuts()
+    # Loading GUI
+    _add_splash("Loading GUI...")
+    with startup_profiler.phase("Create the IDE"):
+        ninjaide = ide.IDE(start_server)
+    # Loading Session Files
+    _add_splash("Loading Files and Projects...")
+    with startup_profiler.phase("Load session files and projects"):
+        _load_session(ninjaide, qsettings, data_qsettings, filenames,
+                      projects_path, linenos)
+
+    # Showing GUI
+    with startup_profiler.phase("Show the IDE"):
+        ninjaide.show()
+    # OSX workaround for ninja window not in front
+    try:
+        ninjaide.raise_()
+    except Exception:
+        pass  # I really dont mind if this fails in any form
+    # Load external plugins
+    # if extra_plugins:
+    #     ninjaide.load_external_plugins(extra_plugins)
+    splash.finish(ninjaide)
+    # ninjaide.notify_plugin_errors()
+    # ninjaide.show_python_detection()
+    # Runs once the events queued, the first paint among them, are done
+    QTimer.singleShot(0, _after_first_paint)
+
+
+def _after_first_paint():
+    startup_profiler.mark("First paint")
+    with startup_profiler.phase("Load lazy services"):
+        ide.IDE.load_lazy_services()
+    startup_profiler.finish()
+
+
+def _import_services():
     # Register tools dock service after load some settings
     # FIXME: Find a better way to do this
     import ninja_ide.gui.tools_dock.tools_dock  # noqa
@@ -126,7 +170,7 @@ def start_ide(app, filenames, projects_path, extra_plugins, linenos):
     # Checkers
     from ninja_ide.gui.editor.checkers import errors_checker  # noqa
     from ninja_ide.gui.editor.checkers import pep8_checker  # noqa
-    # from ninja_ide.gui.editor.checkers import not_import_checker  # noqa
+    from ninja_ide.gui.editor.checkers import not_import_checker  # noqa
     # from ninja_ide.gui.editor.checkers import migration_2to3
     # Preferences
     # from ninja_ide.gui.dialogs.preferences import preferences_general  # noqa
@@ -137,22 +181,19 @@ def start_ide(app, filenames, projects_path, extra_plugins, linenos):
     # from ninja_ide.gui.dialogs.preferences import preferences_editor_display  # noqa
     # from ninja_ide.gui.dialogs.preferences import preferences_editor_behavior  # noqa
     # from ninja_ide.gui.dialogs.preferences import preferences_editor_intellisense  # noqa
-    from ninja_ide.intellisensei import intellisense_registry  # noqa
-    from ninja_ide.intellisensei import python_intellisense  # noqa
+    # Loaded when an editor asks for it or after the first paint
+    ide.IDE.register_lazy_service(
+        "intellisense",
+        "ninja_ide.intellisensei.intellisense_registry",
+        "ninja_ide.intellisensei.python_intellisense")
     # from ninja_ide.gui.dialogs.preferences import preferences_editor_completion
     # from ninja_ide.gui.dialogs.preferences import preferences_plugins
     # from ninja_ide.gui.dialogs.preferences import preferences_theme
     from ninja_ide.gui.editor.checkers import errors_lists  # noqa
-    from ninja_ide.gui.editor.checkers import errors_checker  # noqa
-    from ninja_ide.gui.editor.checkers import pep8_checker  # noqa
 
-    # Loading Shortcuts
-    # resources.load_shortcuts()
-    # Loading GUI
-    _add_splash("Loading GUI...")
-    ninjaide = ide.IDE(start_server)
-    # Loading Session Files
-    _add_splash("Loading Files and Projects...")
+
+def _load_session(ninjaide, qsettings, data_qsettings, filenames,
+                  projects_path, linenos):
     # First check if we need to load last session files
     if qsettings.value('general/loadFiles', True, type=bool):
         files = data_qsettings.value('lastSession/openedFiles')
@@ -174,20 +215,6 @@ def start_ide(app, filenames, projects_path, extra_plugins, linenos):
         ninjaide.load_session_files_projects(
             files, projects, current_file)
 
-    # Showing GUI
-    ninjaide.show()
-    # OSX workaround for ninja window not in front
-    try:
-        ninjaide.raise_()
-    except Exception:
-        pass  # I really dont mind if this fails in any form
-    # Load external plugins
-    # if extra_plugins:
-    #     ninjaide.load_external_plugins(extra_plugins)
-    splash.finish(ninjaide)
-    # ninjaide.notify_plugin_errors()
-    # ninjaide.show_python_detection()
-
 
 def load_fonts():
     import os
@@ -18,8 +18,11 @@
 from PyQt5.QtWidgets import (
     QWidget,
     QVBoxLayout,
+    QGridLayout,
     QCheckBox,
-    QGroupBox
+    QGroupBox,
+    QLabel,
+    QSpinBox
 )
 from ninja_ide import translations
 from ninja_ide.core import settings
@@ -43,13 +46,48 @@ class EditorIntelliSense(QWidget):
         self._check_quotes = QCheckBox(translations.TR_COMPLETE_QUOTES)
         vbox.addWidget(self._check_quotes)
         container.addWidget(group_1)
+
+        group_2 = QGroupBox(translations.TR_COMPLETION_CACHES)
+        grid = QGridLayout(group_2)
+        grid.addWidget(QLabel(translations.TR_COMPLETION_MEMORY_CACHE), 0, 0)
+        self._spin_memory_cache = QSpinBox()
+        self._spin_memory_cache.setRange(16, 16384)
+        self._spin_memory_cache.setSuffix(" MB")
+        grid.addWidget(self._spin_memory_cache, 0, 1)
+        grid.addWidget(QLabel(translations.TR_COMPLETION_DISK_CACHE), 1, 0)
+        self._spin_disk_cache = QSpinBox()
+        self._spin_disk_cache.setRange(0, 16384)
+        self._spin_disk_cache.setSuffix(" MB")
+        grid.addWidget(self._spin_disk_cache, 1, 1)
+        self._label_cache_stats = QLabel()
+        grid.addWidget(self._label_cache_stats, 2, 0, 1, 2)
+        container.addWidget(group_2)
         container.addStretch(1)
 
         # Initial settings
         self._check_braces.setChecked(settings.AUTOCOMPLETE_BRACKETS)
         self._check_quotes.setChecked(settings.AUTOCOMPLETE_QUOTES)
+        self._spin_memory_cache.setValue(settings.COMPLETION_MEMORY_CACHE)
+        self._spin_disk_cache.setValue(settings.COMPLETION_DISK_CACHE)
 
         self._preferences.savePreferences.connect(self._save)
+        self._intellisense = IDE.get_service("intellisense")
+        self._stats_request = None
+        if self._intellisense is not None:
+            self._intellisense.resultAvailable.connect(
+                self._on_result_available)
+            self._stats_request = self._intellisense.request_stats("python")
+
+    def _on_result_available(self, request_id, stats):
+        if request_id != self._stats_request:
+            return
+        if stats is None:
+            self._label_cache_stats.setText(
+                translations.TR_COMPLETION_CACHE_NO_STATS)
+            return
+        self._label_cache_stats.setText(
+            translations.TR_COMPLETION_CACHE_STATS.format(
+                megabytes=stats["bytes"] // (1024 * 1024), **stats))
 
     def _save(self):
 
@@ -64,6 +102,10 @@ class EditorIntelliSense(QWidget):
         settings.AUTOCOMPLETE_QUOTES = self._check_quotes.isChecked()
         qsettings.setValue("autocomplete_quotes",
                            settings.AUTOCOMPLETE_QUOTES)
+        settings.COMPLETION_MEMORY_CACHE = self._spin_memory_cache.value()
+        qsettings.setValue("memory_cache", settings.COMPLETION_MEMORY_CACHE)
+        settings.COMPLETION_DISK_CACHE = self._spin_disk_cache.value()
+        qsettings.setValue("disk_cache", settings.COMPLETION_DISK_CACHE)
 
         qsettings.endGroup()
         qsettings.endGroup()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of NINJA-IDE (http://ninja-ide.org).
+#
+# NINJA-IDE is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# any later version.
+#
+# NINJA-IDE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
+"""Work of an editor done in a thread, one run at a time.
+
+A BackgroundScheduler starts a run when the requests stop for a delay.
+A request received while a run goes on doesn't start another one, when
+the run finishes the scheduler decides if its result is the one wanted
+or it has to start again (the text or the request moved on)."""
+
+from PyQt5.QtCore import (
+    QObject,
+    QThread,
+    QTimer
+)
+
+# The runs must outlive their scheduler until they finish
+_running = set()
+
+
+class BackgroundRun(QThread):
+    """Work for the request with key, it checks cancelled to stop early"""
+
+    def __init__(self, key):
+        super().__init__()
+        self.key = key
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class BackgroundScheduler(QObject):
+    """Start a BackgroundRun after some ms without more requests.
+
+    The subclasses create the run in _start (called by the timer) and
+    handle it in _run_finished."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._run = None
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._start)
+
+    def schedule(self, delay):
+        """Call _start after delay ms without more calls"""
+        self._timer.start(delay)
+
+    def _start(self):
+        raise NotImplementedError
+
+    def _launch(self, run):
+        self._run = run
+        run.finished.connect(self._on_run_finished)
+        _running.add(run)
+        run.start()
+
+    def _cancel_run(self):
+        if self._run is not None:
+            self._run.cancel()
+
+    def _on_run_finished(self):
+        run, self._run = self._run, None
+        _running.discard(run)
+        if run is not None:
+            self._run_finished(run)
+
+    def _run_finished(self, run):
+        raise NotImplementedError
@@ -15,6 +15,8 @@
 # You should have received a copy of the GNU General Public License
 # along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
 
+import re
+
 from PyQt5.QtWidgets import QPlainTextEdit
 # from PyQt5.QtWidgets import QApplication
 # from PyQt5.QtWidgets import QVBoxLayout
@@ -32,6 +34,8 @@ from PyQt5.QtCore import pyqtSignal
 
 from ninja_ide import resources
 from ninja_ide.core import settings
+from ninja_ide.tools import text_search
+from ninja_ide.tools import text_replace
 from ninja_ide.gui.editor.mixin import EditorMixin
 
 
@@ -159,18 +163,45 @@ class BaseEditor(QPlainTextEdit, EditorMixin):
         return self.find_match(word_old, cs, wo, forward=True,
                                wrap_around=wrap_around)
 
-    def replace_all(self, word_old, word_new, cs=False, wo=False):
-        # Save cursor for restore later
-        cursor = self.textCursor()
-        with self:
-            # Move to beginning of text and replace all
-            self.moveCursor(QTextCursor.Start)
-            found = True
-            while found:
-                found = self.replace_match(word_old, word_new, cs, wo,
-                                           wrap_around=False)
-        # Reset position
-        self.setTextCursor(cursor)
+    def replacements(self, word_old, word_new, cs=False, wo=False,
+                     regex=False, selection=False):
+        """Return the (start, end, new text) of each occurrence of
+        word_old, in the selection or in all the text"""
+        try:
+            pattern = text_search.compile_pattern(word_old, cs, regex, wo)
+        except re.error:
+            return []
+        text = self.toPlainText()
+        start, end = 0, None
+        if selection:
+            # The cursor counts UTF-16 code units
+            cursor = self.textCursor()
+            start = text_replace.from_utf16(text, cursor.selectionStart())
+            end = text_replace.from_utf16(text, cursor.selectionEnd())
+        return text_replace.replacements(
+            text, pattern, word_new, start, end, regex)
+
+    def apply_replacements(self, spans):
+        """Replace the (start, end, new text) spans of the text in a
+        single edit block, so they are undone at once"""
+        spans = text_replace.utf16_spans(self.toPlainText(), spans)
+        cursor = QTextCursor(self.document())
+        cursor.beginEditBlock()
+        # From the end, the positions of the spans before don't change
+        for start, end, new in reversed(spans):
+            cursor.setPosition(start)
+            cursor.setPosition(end, QTextCursor.KeepAnchor)
+            cursor.insertText(new)
+        cursor.endEditBlock()
+
+    def replace_all(self, word_old, word_new, cs=False, wo=False,
+                    regex=False, selection=False):
+        """Replace all the occurrences of word_old, return how many"""
+        spans = self.replacements(word_old, word_new, cs, wo, regex,
+                                  selection)
+        if spans:
+            self.apply_replacements(spans)
+        return len(spans)
 
     def find_match(self, search, case_sensitive=False, whole_word=False,
                    backward=False, forward=False, wrap_around=True):
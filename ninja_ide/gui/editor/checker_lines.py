@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of NINJA-IDE (http://ninja-ide.org).
+#
+# NINJA-IDE is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# any later version.
+#
+# NINJA-IDE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
+"""Results of the checkers of a document by line.
+
+Each time the checkers finish the new results are compared with the
+previous ones, so the editor only updates the lines that changed."""
+
+
+class CheckerLines(object):
+    """{line: (color, ((col_start, col_end, color), ...))}
+
+    The color of a line is the one of the checker with the highest
+    priority that has results in it."""
+
+    def __init__(self):
+        self._lines = {}
+
+    def __len__(self):
+        return len(self._lines)
+
+    def __contains__(self, line):
+        return line in self._lines
+
+    def get(self, line):
+        """Return (color, spans) of line or None"""
+        return self._lines.get(line)
+
+    def lines(self):
+        return self._lines.keys()
+
+    def update(self, checkers):
+        """Replace the results with those of checkers, a list of
+        (checker, color, priority) sorted by priority (highest first).
+
+        Returns {line: color or None} of the lines that changed, None
+        when the line has no results now."""
+        colors = {}
+        spans = {}
+        for checker, color, _ in checkers:
+            for line, checks in checker.checks.items():
+                colors.setdefault(line, color)
+                line_spans = spans.setdefault(line, [])
+                for (col_start, col_end), _, _ in checks:
+                    line_spans.append((col_start, col_end, color))
+        lines = {line: (colors[line], tuple(line_spans))
+                 for line, line_spans in spans.items()}
+        changed = {line: value[0] for line, value in lines.items()
+                   if self._lines.get(line) != value}
+        changed.update((line, None) for line in self._lines
+                       if line not in lines)
+        self._lines = lines
+        return changed
+
+    def clear(self):
+        """Remove the results, return the lines that had them"""
+        changed = dict.fromkeys(self._lines)
+        self._lines = {}
+        return changed
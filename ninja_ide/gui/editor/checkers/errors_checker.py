@@ -15,13 +15,12 @@
 # You should have received a copy of the GNU General Public License
 # along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
 
-import _ast
+import sys
 from collections import defaultdict
 
 from PyQt5.QtCore import (
-    QThread,
-    pyqtSignal,
-    QTimer
+    QObject,
+    pyqtSignal
 )
 from ninja_ide.gui.editor.checkers import (
     register_checker,
@@ -30,72 +29,67 @@ from ninja_ide.gui.editor.checkers import (
 from ninja_ide import resources
 from ninja_ide import translations
 from ninja_ide.core import settings
-from ninja_ide.dependencies.pyflakes_mod import checker
 from ninja_ide.gui.ide import IDE
-from ninja_ide.gui.editor import helpers
+from ninja_ide.tools import linter
 from ninja_ide.tools.logger import NinjaLogger
 from ninja_ide.core.file_handling import file_manager
 
 logger = NinjaLogger(__file__)
 
 
-class ErrorsChecker(QThread):
+class ErrorsChecker(QObject):
 
     checkerCompleted = pyqtSignal()
 
     def __init__(self, neditor):
         super().__init__()
         self._neditor = neditor
-        self._path = ''
         self.checks = defaultdict(list)
 
         self.checker_icon = None
         self.checkerCompleted.connect(self.refresh_display)
 
-    def run_checks(self):
-        if not self.isRunning():
-            self._path = self._neditor.file_path
-            QTimer.singleShot(0, self.start)
-
     def reset(self):
         self.checks.clear()
 
-    def run(self):
-        exts = settings.SYNTAX.get('python')['extension']
-        file_ext = file_manager.get_file_extension(self._path)
-        if file_ext in exts:
-            try:
-                self.reset()
-                source = self._neditor.text
-                text = "[Error]: %s"
-                # Compile into an AST and handle syntax errors
-                try:
-                    tree = compile(source, self._path, "exec", _ast.PyCF_ONLY_AST)
-                except SyntaxError as reason:
-                    if reason.text is None:
-                        logger.error("Syntax error")
-                    else:
-                        text = text % reason.args[0]
-                        range_ = helpers.get_range(
-                            self._neditor, reason.lineno - 1, reason.offset)
-                        self.checks[reason.lineno - 1].append((range_, text, ""))
-                else:
-                    # Okay, now check it
-                    lint_checker = checker.Checker(tree, self._path)
-                    lint_checker.messages.sort(key=lambda msg: msg.lineno)
-                    source_lines = source.split('\n')
-                    for message in lint_checker.messages:
-                        lineno = message.lineno - 1
-                        text = message.message % message.message_args
-                        range_ = helpers.get_range(
-                            self._neditor, lineno, message.col)
-                        self.checks[lineno].append(
-                            (range_, text, source_lines[lineno].strip()))
-            except Exception as reason:
-                logger.warning("Checker not finished: {}".format(reason))
-
+    def set_checks(self, checks):
+        self.checks = checks
         self.checkerCompleted.emit()
 
+    def cache_config(self, parsed):
+        """The results only change with the python used to parse"""
+        return "pyflakes:%d.%d" % sys.version_info[:2]
+
+    def check(self, parsed):
+        """Return the checks for parsed, run by the CheckersScheduler"""
+        checks = defaultdict(list)
+        exts = settings.SYNTAX.get('python')['extension']
+        file_ext = file_manager.get_file_extension(parsed.path)
+        if file_ext not in exts:
+            return checks
+        text = "[Error]: %s"
+        # Compile into an AST and handle syntax errors
+        tree = parsed.tree
+        if tree is None:
+            reason = parsed.syntax_error
+            if reason is None or reason.text is None:
+                logger.error("Syntax error")
+            else:
+                text = text % reason.args[0]
+                # SyntaxError.offset starts at 1 (and can be None)
+                col = max((reason.offset or 1) - 1, 0)
+                range_ = parsed.get_range(reason.lineno - 1, col)
+                checks[reason.lineno - 1].append((range_, text, ""))
+        else:
+            # Okay, now check it in the lint pool
+            messages = linter.request('pyflakes', parsed.source, parsed.path)
+            for lineno, col, text in messages:
+                lineno -= 1
+                range_ = parsed.get_range(lineno, col)
+                checks[lineno].append(
+                    (range_, text, parsed.line_text(lineno).strip()))
+        return checks
+
     def message(self, lineno):
         if lineno in self.checks:
             return self.checks[lineno]
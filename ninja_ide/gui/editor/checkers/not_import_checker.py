@@ -15,11 +15,11 @@
 # You should have received a copy of the GNU General Public License
 # along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
 
+import os
 from collections import defaultdict
 
 from PyQt5.QtCore import (
-    QThread,
-    QTimer,
+    QObject,
     # Qt,
     pyqtSignal
 )
@@ -28,26 +28,23 @@ from ninja_ide import translations
 from ninja_ide.core import settings
 from ninja_ide.core.file_handling import file_manager
 # from ninja_ide.gui.ide import IDE
-from ninja_ide.dependencies import notimportchecker as nic
+from ninja_ide.tools import import_resolver
 from ninja_ide.gui.editor.checkers import (
     register_checker,
     remove_checker,
 )
-from ninja_ide.gui.editor import helpers
 # from ninja_ide.tools import ui_tools
 # from ninja_ide.gui.editor.checkers import errors_lists  # lint:ok
 
 # TODO: limit results for performance
 
 
-class NotImporterChecker(QThread):
+class NotImporterChecker(QObject):
     checkerCompleted = pyqtSignal()
 
     def __init__(self, editor):
         super(NotImporterChecker, self).__init__()
         self._editor = editor
-        self._path = ''
-        self._encoding = ''
         self.checks = defaultdict(list)
 
         self.checker_icon = None
@@ -66,42 +63,48 @@ class NotImporterChecker(QThread):
     def dirty_text(self):
         return translations.TR_NOT_IMPORT_CHECKER_TEXT + str(len(self.checks))
 
-    def run_checks(self):
-        if not self.isRunning():
-            self._path = self._editor.file_path
-            self._encoding = self._editor.encoding
-            QTimer.singleShot(10, self.start)
-
     def reset(self):
         self.checks.clear()
 
-    def run(self):
+    def set_checks(self, checks):
+        self.checks = checks
+        self.checkerCompleted.emit()
+
+    def cache_config(self, parsed):
+        """The imports are resolved from the folder of the file, with the
+        sys.path of the interpreter selected, and the names imported are
+        looked up in the modules found"""
+        resolver = import_resolver.get_resolver(settings.PYTHON_EXEC)
+        file_folder = os.path.dirname(parsed.path)
+        dependencies = []
+        if parsed.tree is not None:
+            dependencies = resolver.dependencies(parsed.tree, parsed.path)
+        return "%s:%s:%s:%r" % (resolver.interpreter, file_folder,
+                                resolver.generation(file_folder),
+                                dependencies)
+
+    def check(self, parsed):
+        """Return the checks for parsed, run by the CheckersScheduler"""
+        checks = defaultdict(list)
         exts = settings.SYNTAX.get('python')['extension']
-        file_ext = file_manager.get_file_extension(self._path)
-        not_imports = dict()
-        if file_ext in exts:
-            self.reset()
-            # source = self._editor.text
-            path = self._editor.file_path
-            checker = nic.Checker(path)
-            not_imports = checker.get_not_imports_on_file(
-                checker.get_imports())
-            if not_imports is None:
-                pass
+        file_ext = file_manager.get_file_extension(parsed.path)
+        if file_ext not in exts or parsed.tree is None:
+            return checks
+        # Looked up in the interpreter sys.path, nothing is imported
+        resolver = import_resolver.get_resolver(settings.PYTHON_EXEC)
+        not_imports = resolver.missing_imports(parsed.tree, parsed.path)
+        for key, values in not_imports.items():
+            if isinstance(values['mod_name'], dict):
+                for v in values['mod_name']:
+                    message = '[NOTIMP] {}: Dont exist'.format(
+                        v)
             else:
-                for key, values in not_imports.items():
-                    if isinstance(values['mod_name'], dict):
-                        for v in values['mod_name']:
-                            message = '[NOTIMP] {}: Dont exist'.format(
-                                v)
-                    else:
-                        message = '[NOTIMP] {}: Dont exist'.format(
-                                values['mod_name'])
-                    range_ = helpers.get_range(
-                        self._editor, values['lineno'] - 1)
-                    self.checks[values['lineno'] - 1].append(
-                        (range_, message, ""))
-        self.checkerCompleted.emit()
+                message = '[NOTIMP] {}: Dont exist'.format(
+                        values['mod_name'])
+            range_ = parsed.get_range(values['lineno'] - 1)
+            checks[values['lineno'] - 1].append(
+                (range_, message, ""))
+        return checks
 
     def message(self, index):
         if index in self.checks:
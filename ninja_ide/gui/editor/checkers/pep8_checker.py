@@ -17,8 +17,7 @@
 
 from collections import defaultdict
 
-from PyQt5.QtCore import QThread
-from PyQt5.QtCore import QTimer
+from PyQt5.QtCore import QObject
 from PyQt5.QtCore import pyqtSignal
 
 from ninja_ide import resources
@@ -29,20 +28,18 @@ from ninja_ide.gui.ide import IDE
 from ninja_ide.dependencies import pycodestyle
 from ninja_ide.gui.editor.checkers import register_checker
 from ninja_ide.gui.editor.checkers import remove_checker
-from ninja_ide.gui.editor import helpers
+from ninja_ide.tools import linter
 from ninja_ide.tools.logger import NinjaLogger
 
 logger = NinjaLogger(__name__)
 
 
-class Pep8Checker(QThread):
+class Pep8Checker(QObject):
     checkerCompleted = pyqtSignal()
 
     def __init__(self, editor):
         super(Pep8Checker, self).__init__()
         self._editor = editor
-        self._path = ''
-        self._encoding = ''
         self.checks = defaultdict(list)
 
         self.checker_icon = None
@@ -57,44 +54,37 @@ class Pep8Checker(QThread):
     def dirty_text(self):
         return translations.TR_PEP8_DIRTY_TEXT + str(len(self.checks))
 
-    def run_checks(self):
-        if not self.isRunning():
-            self._path = self._editor.file_path
-            self._encoding = self._editor.encoding
-            QTimer.singleShot(0, self.start)
-
     def reset(self):
         self.checks.clear()
 
-    def run(self):
-        exts = settings.SYNTAX.get('python')['extension']
-        file_ext = file_manager.get_file_extension(self._path)
-        if file_ext in exts:
-            try:
-                self.reset()
-                source = self._editor.text
-                path = self._editor.file_path
-                pep8_style = pycodestyle.StyleGuide(
-                    parse_argv=False,
-                    config_file='',
-                    checker_class=CustomChecker
-                )
-                temp_data = pep8_style.input_file(
-                    path,
-                    lines=source.splitlines(True)
-                )
-
-                source_lines = source.split('\n')
-                # for lineno, offset, code, text, doc in temp_data:
-                for lineno, col, code, text in temp_data:
-                    message = '[PEP8]: %s' % text
-                    range_ = helpers.get_range(self._editor, lineno - 1, col)
-                    self.checks[lineno - 1].append(
-                        (range_, message, source_lines[lineno - 1].strip()))
-            except Exception as reason:
-                logger.warning("Checker not finished: {}".format(reason))
+    def set_checks(self, checks):
+        self.checks = checks
         self.checkerCompleted.emit()
 
+    def cache_config(self, parsed):
+        return "%s:%s:%s" % (pycodestyle.__version__,
+                             pycodestyle.DEFAULT_IGNORE,
+                             pycodestyle.MAX_LINE_LENGTH)
+
+    def check(self, parsed):
+        """Return the checks for parsed, run by the CheckersScheduler"""
+        checks = defaultdict(list)
+        exts = settings.SYNTAX.get('python')['extension']
+        file_ext = file_manager.get_file_extension(parsed.path)
+        if file_ext not in exts:
+            return checks
+        temp_data = linter.request(
+            'pycodestyle', parsed.source, parsed.path)
+
+        # for lineno, offset, code, text, doc in temp_data:
+        for lineno, col, code, text in temp_data:
+            message = '[PEP8]: %s' % text
+            # pycodestyle columns start at 1
+            range_ = parsed.get_range(lineno - 1, max(col - 1, 0))
+            checks[lineno - 1].append(
+                (range_, message, parsed.line_text(lineno - 1).strip()))
+        return checks
+
     def message(self, line):
         if line in self.checks:
             return self.checks[line]
@@ -106,22 +96,6 @@ class Pep8Checker(QThread):
             error_list.refresh_pep8_list(self.checks)
 
 
-class CustomReport(pycodestyle.StandardReport):
-
-    def get_file_results(self):
-        data = []
-        for line_number, offset, code, text, doc in self._deferred_print:
-            col = offset + 1
-            data.append((line_number, col, code, text))
-        return data
-
-
-class CustomChecker(pycodestyle.Checker):
-
-    def __init__(self, *args, **kw):
-        super().__init__(*args, report=CustomReport(kw.pop("options")), **kw)
-
-
 def remove_pep8_checker():
     checker = (Pep8Checker,
                resources.COLOR_SCHEME.get("editor.pep8"), 2)
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of NINJA-IDE (http://ninja-ide.org).
+#
+# NINJA-IDE is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# any later version.
+#
+# NINJA-IDE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
+"""Run the checkers of a document in background.
+
+The requests are debounced and coalesced by revision of the document,
+the text is parsed once and the same ParsedSource is given to every
+checker. A run for an old revision is cancelled when a newer one is
+requested and only the results of the latest revision are shown, the
+results of a text that changed while they were obtained are discarded
+and the checkers run again.
+
+The checkers only see the ParsedSource, a snapshot of the document taken
+in the GUI thread, never the editor."""
+
+import os
+import _ast
+
+from PyQt5.QtCore import pyqtSignal
+
+from ninja_ide.gui.editor import helpers
+from ninja_ide.gui.editor import background
+from ninja_ide.tools import lint_cache
+from ninja_ide.tools.logger import NinjaLogger
+
+logger = NinjaLogger(__name__)
+
+# Time (ms) to wait for more requests before running the checkers
+CHECKERS_DELAY = 300
+
+
+class ParsedSource(object):
+    """Text of a document in a revision and its parse, shared by all the
+    checkers.
+
+    The AST is built the first time a checker asks for it."""
+
+    def __init__(self, source, path, encoding=None, revision=None):
+        self.source = source
+        self.path = path
+        self.encoding = encoding
+        self.revision = revision
+        self.lines = source.split('\n')
+        self._tree = None
+        self._syntax_error = None
+        self._parsed = False
+
+    def _parse(self):
+        if self._parsed:
+            return
+        self._parsed = True
+        try:
+            self._tree = compile(self.source, self.path, "exec",
+                                 _ast.PyCF_ONLY_AST)
+        except SyntaxError as reason:
+            self._syntax_error = reason
+
+    @property
+    def tree(self):
+        """The AST of the source, None if it has a syntax error"""
+        self._parse()
+        return self._tree
+
+    @property
+    def syntax_error(self):
+        self._parse()
+        return self._syntax_error
+
+    def line_text(self, lineno):
+        if 0 <= lineno < len(self.lines):
+            return self.lines[lineno]
+        return ''
+
+    def get_range(self, lineno, col=-1):
+        return helpers.get_text_range(self.line_text(lineno), col)
+
+
+class _CheckersRun(background.BackgroundRun):
+    """Run each checker over the same ParsedSource"""
+
+    def __init__(self, key, parsed, checkers):
+        super().__init__(key)
+        self.parsed = parsed
+        self.checkers = checkers
+        self.results = []
+
+    def _cache_key(self, checker):
+        """Return the key of the results of checker in the lint cache.
+
+        The checkers without a cache_config method are not cached."""
+        cache_config = getattr(checker, 'cache_config', None)
+        if cache_config is None:
+            return None
+        config = "%s:%s" % (os.path.splitext(self.parsed.path)[1],
+                            cache_config(self.parsed))
+        return lint_cache.make_key(
+            checker.__class__.__name__, config, self.parsed.source)
+
+    def run(self):
+        for checker in self.checkers:
+            if self.cancelled:
+                return
+            key = self._cache_key(checker)
+            checks = None
+            if key is not None:
+                checks = lint_cache.get(key)
+            if checks is None:
+                try:
+                    checks = checker.check(self.parsed)
+                except Exception as reason:
+                    logger.warning(
+                        "Checker not finished: {}".format(reason))
+                    checks = {}
+                else:
+                    if key is not None:
+                        lint_cache.put(
+                            key, checker.__class__.__name__, checks)
+            self.results.append(checks)
+
+
+class CheckersScheduler(background.BackgroundScheduler):
+    """Run the checkers of a NEditable when they are requested.
+
+    The requests received in CHECKERS_DELAY ms are joined, the checkers
+    run once for each (revision, path) of the document."""
+
+    checkersFinished = pyqtSignal()
+
+    def __init__(self, neditable):
+        super().__init__()
+        self._neditable = neditable
+        self._checkers = []
+        # (revision, path) of the last run requested and of the results
+        self._latest = None
+        self._checked = None
+
+    def set_checkers(self, checkers):
+        self.cancel()
+        self._checkers = list(checkers)
+        self._checked = None
+
+    def request(self, delay=CHECKERS_DELAY):
+        """Run the checkers after delay ms without more requests"""
+        self.schedule(delay)
+
+    def cancel(self):
+        self._timer.stop()
+        self._latest = None
+        self._cancel_run()
+
+    def _key(self):
+        editor = self._neditable.editor
+        return (editor.document().revision(), self._neditable.file_path)
+
+    def _start(self):
+        editor = self._neditable.editor
+        if editor is None or not self._checkers:
+            return
+        key = self._key()
+        if key == self._checked:
+            # The results shown are for this same text
+            return
+        self._latest = key
+        if self._run is not None:
+            if self._run.key != key:
+                # Started again when the stale run finishes
+                self._run.cancel()
+            return
+        parsed = ParsedSource(editor.text, self._neditable.file_path,
+                              getattr(editor, 'encoding', None), key[0])
+        self._launch(_CheckersRun(key, parsed, self._checkers))
+
+    def _run_finished(self, run):
+        if self._neditable.editor is None:
+            return
+        if not run.cancelled and run.key == self._latest and \
+                run.key != self._key():
+            # The text changed while it was checked
+            self._latest = None
+            self.request()
+        elif not run.cancelled and run.key == self._latest and \
+                len(run.results) == len(self._checkers):
+            self._checked = run.key
+            for checker, checks in zip(self._checkers, run.results):
+                checker.set_checks(checks)
+            self.checkersFinished.emit()
+        elif self._latest is not None and self._latest != self._checked:
+            self._start()
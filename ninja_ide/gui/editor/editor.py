@@ -17,7 +17,7 @@
 
 import re
 import sys
-import sre_constants
+import bisect
 from collections import OrderedDict
 
 from PyQt5.QtWidgets import QFrame
@@ -43,6 +43,9 @@ from ninja_ide.gui.editor import highlighter
 from ninja_ide.gui.editor import base_editor
 from ninja_ide.gui.editor import scrollbar
 from ninja_ide.gui.editor import extra_selection
+from ninja_ide.gui.editor import word_index
+from ninja_ide.gui.editor import checker_lines
+from ninja_ide.gui.editor import incremental_search
 # Extensions
 from ninja_ide.gui.editor.extensions import symbol_highlighter
 from ninja_ide.gui.editor.extensions import line_highlighter
@@ -73,8 +76,10 @@ class NEditor(base_editor.BaseEditor):
     # FIXME: cambiar nombre
     cursor_position_changed = pyqtSignal(int, int)
     current_line_changed = pyqtSignal(int)
+    highlight_checker_updated = pyqtSignal("PyQt_PyObject")
 
-    _MAX_CHECKER_SELECTIONS = 150  # For good performance
+    # Time (ms) to wait after a change to search again the found results
+    _FOUND_RESULTS_DELAY = 300
 
     def __init__(self, neditable):
         super().__init__()
@@ -126,17 +131,37 @@ class NEditor(base_editor.BaseEditor):
         self.autocomplete_quotes(settings.AUTOCOMPLETE_QUOTES)
         # Calltips
         # self.register_extension(calltip.CallTips)
-        # Highlight word under cursor
-        self.__word_occurrences = []
+        # Highlight word under cursor, only its visible occurrences have
+        # an ExtraSelection
+        self.__occurrences_word = None
+        # Results of the checkers by line, only the visible lines have
+        # ExtraSelections: {line: [ExtraSelection]}
+        self._checker_lines = checker_lines.CheckerLines()
+        self.__checker_selections = {}
         self._highlight_word_timer = QTimer()
         self._highlight_word_timer.setSingleShot(True)
         self._highlight_word_timer.setInterval(1000)
         self._highlight_word_timer.timeout.connect(
             self.highlight_selected_word)
+        # Results of the find widget: (text, cs, wo) searched and
+        # (color, [(start, end)]) found. Only the visible results have an
+        # ExtraSelection
+        self.__found_search = None
+        self.__found_results = None
+        self.__found_results_outdated = False
+        # Searches them again in background when the text changes
+        self._found_search = incremental_search.IncrementalSearch(self)
+        self._found_search.finished.connect(self._on_found_searched)
         # Install custom scrollbar
         self._scrollbar = scrollbar.NScrollBar(self)
         self._scrollbar.setAttribute(Qt.WA_OpaquePaintEvent, False)
         self.setVerticalScrollBar(self._scrollbar)
+        self._scrollbar.valueChanged.connect(
+            self._update_visible_found_results)
+        self._scrollbar.valueChanged.connect(
+            self._update_visible_occurrences)
+        self._scrollbar.valueChanged.connect(
+            self._update_visible_checkers)
         self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
         self.additional_builtins = None
         # Set the editor after initialization
@@ -149,6 +174,7 @@ class NEditor(base_editor.BaseEditor):
 
         self.cursorPositionChanged.connect(self._on_cursor_position_changed)
         self.blockCountChanged.connect(self.update)
+        self.textChanged.connect(self._on_text_changed_found_results)
 
         # Mark text changes
         self._text_change_widget = self.side_widgets.add(
@@ -263,98 +289,190 @@ class NEditor(base_editor.BaseEditor):
         self._text_change_widget.setVisible(value)
 
     def __clear_occurrences(self):
-        self.__word_occurrences.clear()
+        if self.__occurrences_word is not None:
+            self.__occurrences_word = None
+            self._scrollbar.remove_marker("occurrences")
         self._extra_selections.remove("occurrences")
 
     def highlight_selected_word(self):
         """Highlight word under cursor"""
 
+        word = self.word_under_cursor().selectedText()
+        if self.__found_results is None and \
+                self.__occurrences_word is not None and \
+                word.lower() == self.__occurrences_word.lower():
+            # Moved to another occurrence, the markers are the same
+            self._update_visible_occurrences()
+            return
         # Clear previous selections
         self.__clear_occurrences()
-        if self._extra_selections.get("find"):
-            # No re-highlight occurrences when have "find" extra selections
+        if self.__found_results is not None:
+            # No re-highlight occurrences when have "find" results
             return
 
-        word = self.word_under_cursor().selectedText()
-        if not word:
+        if not word or not word_index.WORD.fullmatch(word):
             return
 
-        results = self._get_find_index_results(word, cs=False, wo=True)[1]
+        self.__occurrences_word = word
+        index = word_index.get_word_index(self.document())
+        color = resources.COLOR_SCHEME.get("editor.occurrence")
+        self._scrollbar.add_markers(
+            "occurrences", index.lines_with(word), color)
+        self._update_visible_occurrences()
+
+    def _update_visible_occurrences(self):
+        """Create the ExtraSelections of the occurrences in the viewport"""
+        word = self.__occurrences_word
+        if word is None:
+            return
+        index = word_index.get_word_index(self.document())
+        color = resources.COLOR_SCHEME.get("editor.occurrence")
         selections = []
-        append = selections.append
-        # On very big files where a lots of occurrences can be found,
-        # this freeze the editor during a few seconds. So, we can limit of 500
-        # and make sure the editor will always remain responsive
-        for start_pos, end_pos in results[:500]:
+        first = self.first_visible_block().blockNumber()
+        last = self.last_visible_block().blockNumber()
+        block = self.first_visible_block()
+        for lineno, start, end in index.occurrences(word, first, last):
+            while block.blockNumber() < lineno:
+                block = block.next()
             selection = extra_selection.ExtraSelection(
                 self.textCursor(),
-                start_pos=start_pos,
-                end_pos=end_pos
+                start_pos=block.position() + start,
+                end_pos=block.position() + end
             )
-            color = resources.COLOR_SCHEME.get("editor.occurrence")
             selection.set_background(color)
-            append(selection)
-            # TODO: highlight results in scrollbar
-            # FIXME: from settings
-            # line = selection.cursor.blockNumber()
-            # Marker = scrollbar.marker
-            # marker = Marker(line, resources.get_color("SearchResult"), 0)
-            # self._scrollbar.add_marker("find", marker)
+            selections.append(selection)
         self._extra_selections.add("occurrences", selections)
 
     def clear_found_results(self):
+        self.__found_search = None
+        self.__found_results = None
+        self._found_search.cancel()
         self._scrollbar.remove_marker("find")
         self._extra_selections.remove("find")
 
-    def highlight_found_results(self, text, cs=False, wo=False):
-        """Highlight all found results from find/replace widget"""
+    def highlight_found_results(self, text, cs=False, wo=False, delay=0):
+        """Search text in background after delay ms and highlight the
+        results found"""
+        self.__found_search = (text, cs, wo)
+        self._found_search.search(self, text, cs, wo, delay)
 
-        index, results = self._get_find_index_results(text, cs=cs, wo=wo)
-        selections = []
-        append = selections.append
+    def _on_found_searched(self, editor, search, results):
+        if search == self.__found_search:
+            self.set_found_results(*search, results)
+
+    def set_found_results(self, text, cs, wo, results):
+        """Highlight results, the [(start, end)] found of text"""
         color = resources.COLOR_SCHEME.get("editor.search.result")
-        for start, end in results:
+        self.__found_search = (text, cs, wo)
+        self.__found_results = (color, results)
+        self.__found_results_outdated = False
+        self._scrollbar.remove_marker("find")
+        self._scrollbar.add_markers("find", self.__lines_of(results), color)
+        self._update_visible_found_results()
+
+    def found_results_index(self):
+        """Return the number of the found result where the cursor is (or
+        the number of results before it) and the number of results"""
+        if self.__found_results is None:
+            return 0, 0
+        _, results = self.__found_results
+        position = self.textCursor().position()
+        return bisect.bisect_left(results, (position,)), len(results)
+
+    def __lines_of(self, results):
+        """Return the line numbers that have some (start, end) of
+        results"""
+        document = self.document()
+        lines = (document.findBlock(start).blockNumber()
+                 for start, _ in results)
+        return list(OrderedDict.fromkeys(lines))
+
+    def _update_visible_found_results(self):
+        """Create the ExtraSelections of the found results in the
+        viewport"""
+        if self.__found_results is None or self.__found_results_outdated:
+            return
+        color, results = self.__found_results
+        start = self.first_visible_block().position()
+        last_block = self.last_visible_block()
+        end = last_block.position() + last_block.length()
+        index = bisect.bisect_left(results, (start,))
+        if index and results[index - 1][1] > start:
+            index -= 1
+        selections = []
+        foreground = utils.get_inverted_color(color)
+        for found_start, found_end in results[index:]:
+            if found_start >= end:
+                break
             selection = extra_selection.ExtraSelection(
                 self.textCursor(),
-                start_pos=start,
-                end_pos=end
+                start_pos=found_start,
+                end_pos=found_end
             )
             selection.set_background(color)
-            selection.set_foreground(utils.get_inverted_color(color))
-            append(selection)
-            line = selection.cursor.blockNumber()
-            self._scrollbar.add_marker("find", line, color)
+            selection.set_foreground(foreground)
+            selections.append(selection)
         self._extra_selections.add("find", selections)
 
-        return index, len(results)
+    def _on_text_changed_found_results(self):
+        if self.__found_search is not None:
+            # The positions are wrong until they are searched again, the
+            # ExtraSelections follow the changes meanwhile
+            self.__found_results_outdated = True
+            self.highlight_found_results(
+                *self.__found_search, delay=self._FOUND_RESULTS_DELAY)
+
+    @property
+    def checker_lines(self):
+        return self._checker_lines
 
     def _highlight_checkers(self, neditable):
-        """Add checker selections to the Editor"""
-        # Remove selections if they exists
-        self._extra_selections.remove("checker")
-        self._scrollbar.remove_marker("checker")
-        # Get checkers from neditable
-        checkers = neditable.sorted_checkers
+        """Update the checker selections and markers of the lines whose
+        results changed"""
+        changed = self._checker_lines.update(neditable.sorted_checkers)
+        if not changed:
+            return
+        for line in changed:
+            self.__checker_selections.pop(line, None)
+        self._scrollbar.update_markers("checker", changed, priority=1)
+        self._update_visible_checkers()
+        self.highlight_checker_updated.emit(self._checker_lines)
+
+    def __checker_line_selections(self, block, spans):
         selections = []
-        append = selections.append  # Reduce name look-ups for better speed
-        for items in checkers:
-            checker, color, _ = items
-            lines = list(checker.checks.keys())
-            lines.sort()
-            for line in lines[:self._MAX_CHECKER_SELECTIONS]:
-                cursor = self.textCursor()
-                # Scrollbar marker
-                self._scrollbar.add_marker("checker", line, color, priority=1)
-                ms = checker.checks[line]
-                for (col_start, col_end), _, _ in ms:
-                    selection = extra_selection.ExtraSelection(
-                        cursor,
-                        start_line=line,
-                        col_start=col_start,
-                        col_end=col_end
-                    )
-                    selection.set_underline(color)
-                    append(selection)
+        length = block.length() - 1
+        for col_start, col_end, color in spans:
+            selection = extra_selection.ExtraSelection(
+                self.textCursor(),
+                start_pos=block.position() + min(col_start, length),
+                end_pos=block.position() + min(col_end, length)
+            )
+            selection.set_underline(color)
+            selections.append(selection)
+        return selections
+
+    def _update_visible_checkers(self):
+        """Show the ExtraSelections of the checkers in the viewport, the
+        ones of the lines that didn't change are reused"""
+        if not len(self._checker_lines) and \
+                not self._extra_selections.get("checker"):
+            return
+        cached = self.__checker_selections
+        self.__checker_selections = {}
+        block = self.first_visible_block()
+        last = self.last_visible_block().blockNumber()
+        selections = []
+        while block.isValid() and block.blockNumber() <= last:
+            line = block.blockNumber()
+            results = self._checker_lines.get(line)
+            if results is not None:
+                line_selections = cached.get(line)
+                if line_selections is None:
+                    line_selections = self.__checker_line_selections(
+                        block, results[1])
+                self.__checker_selections[line] = line_selections
+                selections.extend(line_selections)
+            block = block.next()
         self._extra_selections.add("checker", selections)
 
     def show_indentation_guides(self, value):
@@ -463,6 +581,9 @@ class NEditor(base_editor.BaseEditor):
         self.side_widgets.resize()
         self.side_widgets.update_viewport()
         self.adjust_scrollbar_ranges()
+        self._update_visible_found_results()
+        self._update_visible_occurrences()
+        self._update_visible_checkers()
 
     def __smart_backspace(self):
         accepted = False
@@ -726,34 +847,6 @@ class NEditor(base_editor.BaseEditor):
             (self.viewport().rect().height() - offset) / line_spacing)
         self._scrollbar.set_range_offset(offset / line_spacing)
 
-    def _get_find_index_results(self, expr, cs, wo):
-
-        text = self.text
-        current_index = 0
-
-        if not cs:
-            text = text.lower()
-            expr = expr.lower()
-
-        expr = re.escape(expr)
-        if wo:
-            expr = r"\b" + re.escape(expr) + r"\b"
-
-        def find_all_iter(string, sub):
-            try:
-                reobj = re.compile(sub)
-            except sre_constants.error:
-                return
-            for match in reobj.finditer(string):
-                yield match.span()
-
-        matches = list(find_all_iter(text, expr))
-
-        if len(matches) > 0:
-            position = self.textCursor().position()
-            current_index = sum(1 for _ in re.finditer(expr, text[:position]))
-        return current_index, matches
-
     def show_run_cursor(self):
         """Highlight momentarily a piece of code"""
 
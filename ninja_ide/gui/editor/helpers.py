@@ -48,20 +48,21 @@ def get_leading_spaces(line):
     return ''
 
 
-def get_range(editor, line, col=-1):
-
-        lineno = line
-        line_text = editor.line_text(lineno)
-        col_end = len(line_text)
-        col_start = col if col > -1 else 0
-        if col > -1:
-            match = pat_word.match(line_text[col:])
-            if match:
-                col_end = col_start + match.end()
-        else:
-            col_start = editor.line_indent(lineno)
+def get_text_range(line_text, col=-1):
+    """Return the (col_start, col_end) to mark in line_text from col.
+
+    The word starting at col or the whole line (without indentation)
+    if col is -1."""
+    col_end = len(line_text)
+    col_start = col if col > -1 else 0
+    if col > -1:
+        match = pat_word.match(line_text[col:])
+        if match:
+            col_end = col_start + match.end()
+    else:
+        col_start = len(line_text) - len(line_text.lstrip())
 
-        return col_start, col_end
+    return col_start, col_end
 
 
 def add_line_increment(lines, lineModified, diference, atLineStart=False):
@@ -89,6 +90,29 @@ def add_line_increment_for_dict(data, lineModified, diference,
     return data
 
 
+def changed_lines(document, position, added, line_count):
+    """Return (first line, lines removed, text of the lines added) of a
+    contentsChange of document, line_count is the number of lines it had
+    before. None if the lines changed can't be known.
+
+    The chars removed reported by Qt aren't reliable, the lines removed
+    are known from the lines that the document had."""
+    block_count = document.blockCount()
+    first = document.findBlock(position).blockNumber()
+    last = document.findBlock(position + added).blockNumber()
+    if last < 0:
+        last = block_count - 1
+    removed = last - first + 1 - (block_count - line_count)
+    if removed < 0 or first < 0:
+        return None
+    texts = []
+    block = document.findBlockByNumber(first)
+    for _ in range(last - first + 1):
+        texts.append(block.text())
+        block = block.next()
+    return first, removed, texts
+
+
 def insert_horizontal_line(editorWidget):
     line, index = editorWidget.getCursorPosition()
     lang = file_manager.get_file_extension(editorWidget.file_path)
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of NINJA-IDE (http://ninja-ide.org).
+#
+# NINJA-IDE is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# any later version.
+#
+# NINJA-IDE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
+"""Search a text in an editor while it is typed.
+
+The search starts when the typing stops for SEARCH_DELAY ms and runs in
+a thread over a snapshot of the lines of the document. When the text
+searched is the previous one with more chars at the end (and the
+document didn't change), only the lines where the previous one was found
+are searched again. The number of matches is reported while the search
+goes on."""
+
+import itertools
+
+from PyQt5.QtCore import pyqtSignal
+
+from ninja_ide.gui.editor import background
+from ninja_ide.tools import text_search
+from ninja_ide.tools import text_replace
+from ninja_ide.tools.logger import NinjaLogger
+
+logger = NinjaLogger(__name__)
+
+# Time (ms) without typing before searching
+SEARCH_DELAY = 150
+# Lines searched between two reports of the matches found
+PROGRESS_LINES = 5000
+
+
+def compile_patterns(text, cs=False, wo=False):
+    """Return the pattern of the matches and the one of the lines that
+    can have them (the text without the whole word condition)"""
+    line_pattern = text_search.compile_pattern(text, cs)
+    if wo:
+        return text_search.compile_pattern(text, cs, whole_words=True), \
+            line_pattern
+    return line_pattern, line_pattern
+
+
+class _Snapshot(object):
+    """Lines of a revision of a document"""
+
+    def __init__(self, document):
+        self.document = document
+        self.revision = document.revision()
+        self.lines = document.toPlainText().split("\n")
+        self._offsets = None
+
+    def is_current(self, document):
+        return document is self.document and \
+            document.revision() == self.revision
+
+    def offsets(self):
+        """Return the position where each line starts, in UTF-16 code
+        units like the positions of the document"""
+        if self._offsets is None:
+            self._offsets = [0] + list(itertools.accumulate(
+                len(line.encode("utf-16-le")) // 2 + 1
+                for line in self.lines))
+        return self._offsets
+
+
+class _SearchRun(background.BackgroundRun):
+    """Find the matches of a text in some lines of a snapshot"""
+
+    progress = pyqtSignal(int)
+
+    def __init__(self, key, snapshot, candidates):
+        super().__init__(key)
+        self.snapshot = snapshot
+        self.candidates = candidates
+        # Lines where the text is and [(start, end)] of the matches
+        self.lines = None
+        self.results = None
+
+    def run(self):
+        text, cs, wo = self.key[1:]
+        try:
+            pattern, line_pattern = compile_patterns(text, cs, wo)
+            lines = self.snapshot.lines
+            offsets = self.snapshot.offsets()
+            candidates = self.candidates
+            if candidates is None:
+                candidates = range(len(lines))
+            found_lines = []
+            results = []
+            for count, lineno in enumerate(candidates, 1):
+                line = lines[lineno]
+                if line_pattern.search(line) is not None:
+                    found_lines.append(lineno)
+                    base = offsets[lineno]
+                    spans = text_replace.utf16_spans(
+                        line, [(match.start(), match.end(), None)
+                               for match in pattern.finditer(line)])
+                    results.extend(
+                        (base + start, base + end) for start, end, _ in spans)
+                if not count % PROGRESS_LINES:
+                    if self.cancelled:
+                        return
+                    self.progress.emit(len(results))
+            self.lines = found_lines
+            self.results = results
+        except Exception as reason:
+            logger.warning("Search failed: {}".format(reason))
+
+
+class IncrementalSearch(background.BackgroundScheduler):
+    """Search in the editor requested, one search at a time.
+
+    progress is emitted with the number of matches found so far and
+    finished with the editor, the (text, cs, wo) searched and the
+    [(start, end)] of the matches in the current text of the editor."""
+
+    progress = pyqtSignal(int)
+    finished = pyqtSignal('PyQt_PyObject', 'PyQt_PyObject', 'PyQt_PyObject')
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._editor = None
+        # (text, cs, wo) requested
+        self._latest = None
+        self._snapshot = None
+        # (text, cs, snapshot, lines where it is) of the last search
+        self._last = None
+
+    def search(self, editor, text, cs=False, wo=False, delay=SEARCH_DELAY):
+        """Search text in editor after delay ms without more requests"""
+        self._editor = editor
+        self._latest = (text, cs, wo)
+        self._cancel_run()
+        self.schedule(delay)
+
+    def cancel(self):
+        self._timer.stop()
+        self._latest = None
+        self._editor = None
+        self._cancel_run()
+
+    def _candidates(self, text, cs, snapshot):
+        """Return the lines that can have text or None for all of them"""
+        if self._last is None:
+            return None
+        last_text, last_cs, last_snapshot, lines = self._last
+        if last_snapshot is snapshot and last_cs == cs and last_text and \
+                text.startswith(last_text):
+            return lines
+        return None
+
+    def _start(self):
+        if self._latest is None or self._run is not None:
+            # Started again when the run finishes
+            return
+        document = self._editor.document()
+        snapshot = self._snapshot
+        if snapshot is None or not snapshot.is_current(document):
+            snapshot = self._snapshot = _Snapshot(document)
+        text, cs, wo = self._latest
+        run = _SearchRun((self._editor,) + self._latest, snapshot,
+                         self._candidates(text, cs, snapshot))
+        run.progress.connect(self.progress.emit)
+        self._launch(run)
+
+    def _run_finished(self, run):
+        editor, text, cs, wo = run.key
+        if run.results is not None:
+            self._last = (text, cs, run.snapshot, run.lines)
+        elif not run.cancelled:
+            # Failed, searching again would fail too
+            self._latest = None
+        if self._latest is None:
+            return
+        if run.cancelled or run.results is None or \
+                run.key != (self._editor,) + self._latest or \
+                not run.snapshot.is_current(editor.document()):
+            # Another search was requested or the text changed meanwhile
+            if not self._timer.isActive():
+                self._start()
+            return
+        self._latest = None
+        self.finished.emit(editor, (text, cs, wo), run.results)
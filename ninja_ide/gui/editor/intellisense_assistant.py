@@ -34,6 +34,9 @@ class IntelliSenseAssistant(QObject):
         # Proposal widget
         self._proposal_widget = None
         self.__kind = "completions"
+        self.__request_id = None
+        # Request id -> proposal item waiting for its detail
+        self.__details_requests = {}
 
         self.__handlers = {
             "completions": self._handle_completions,
@@ -46,6 +49,7 @@ class IntelliSenseAssistant(QObject):
             editor.neditable.language())
 
         # Connections
+        self._intellisense.resultAvailable.connect(self._on_result_available)
         self._editor.postKeyPressed.connect(self._on_post_key_pressed)
         self._editor.keyReleased.connect(self._on_key_released)
         self._editor.destroyed.connect(self.deleteLater)
@@ -80,15 +84,23 @@ class IntelliSenseAssistant(QObject):
 
     def invoke(self, kind):
         self.__kind = kind
-        self._intellisense.resultAvailable.connect(self._on_result_available)
         if kind == "completions":
             if self._proposal_widget is not None:
                 self._proposal_widget.abort()
-        self._intellisense.process(kind, self._editor)
+        self.__request_id = self._intellisense.process(kind, self._editor)
 
-    def _on_result_available(self, result):
-        self._intellisense.resultAvailable.disconnect(
-            self._on_result_available)
+    def _on_result_available(self, request_id, result):
+        item = self.__details_requests.pop(request_id, None)
+        if item is not None:
+            if self._proposal_widget is not None:
+                self._proposal_widget.set_item_detail(item, result)
+            return
+        if request_id != self.__request_id:
+            # A request of another editor or superseded
+            return
+        self.__request_id = None
+        # Request id -> proposal item waiting for its detail
+        self.__details_requests = {}
         try:
             handler = self.__handlers[self.__kind]
             handler(result)
@@ -126,7 +138,8 @@ class IntelliSenseAssistant(QObject):
             item = proposal_widget.ProposalItem(completion["text"])
             completion_type = completion["type"]
             item.type = completion_type
-            item.detail = completion["detail"]
+            item.detail = completion.get("detail")
+            item.completion = completion
             item.set_icon(completion_type)
             append(item)
         self._create_view(_completions)
@@ -155,14 +168,27 @@ class IntelliSenseAssistant(QObject):
         self._proposal_widget.destroyed.connect(self.finalize)
         self._proposal_widget.proposalItemActivated.connect(
             self._process_proposal_item)
+        self._proposal_widget.detailsRequested.connect(
+            self._request_details)
         model = proposal_widget.ProposalModel(self._proposal_widget)
         model.set_items(completions)
         self._proposal_widget.set_model(model)
         self._proposal_widget.show_proposal()
 
+    def _request_details(self, item):
+        if item in self.__details_requests.values():
+            return
+        # Only the detail of the latest item selected is needed
+        self.__details_requests.clear()
+        request_id = self._intellisense.resolve_details(
+            self._editor.neditable.language(), item.completion)
+        if request_id is not None:
+            self.__details_requests[request_id] = item
+
     def finalize(self):
         del self._proposal_widget
         self._proposal_widget = None
+        self.__details_requests.clear()
 
     def _process_proposal_item(self, item):
         prefix = self._editor.word_under_cursor().selectedText()
@@ -21,6 +21,8 @@ from PyQt5.QtCore import pyqtSignal
 
 from ninja_ide.core.file_handling import file_manager
 from ninja_ide.gui.editor import checkers
+from ninja_ide.gui.editor.checkers import scheduler
+from ninja_ide.gui.editor import outline
 from ninja_ide.gui.editor import helpers
 from ninja_ide.core import settings
 
@@ -29,6 +31,7 @@ class NEditable(QObject):
     """
     SIGNALS:
     @checkersUpdated(PyQt_PyObject)
+    @symbolsUpdated(PyQt_PyObject)
     @askForSaveFileClosing(PyQt_PyObject)
     @fileClosing(PyQt_PyObject)
     @fileSaved(PyQt_PyObject)
@@ -41,6 +44,7 @@ class NEditable(QObject):
     fileClosing = pyqtSignal('PyQt_PyObject')
     askForSaveFileClosing = pyqtSignal('PyQt_PyObject')
     checkersUpdated = pyqtSignal('PyQt_PyObject')
+    symbolsUpdated = pyqtSignal('PyQt_PyObject')
 
     def __init__(self, nfile=None):
         super(NEditable, self).__init__()
@@ -56,7 +60,13 @@ class NEditable(QObject):
         self._swap_file = nswapfile.NSwapFile(self)
         # Checkers:
         self.registered_checkers = []
-        self._checkers_executed = 0
+        self._checkers_scheduler = scheduler.CheckersScheduler(self)
+        self._checkers_scheduler.checkersFinished.connect(
+            lambda: self.checkersUpdated.emit(self))
+        # Symbols
+        self._outline_scheduler = outline.OutlineScheduler(self)
+        self._outline_scheduler.outlineUpdated.connect(
+            lambda: self.symbolsUpdated.emit(self))
 
         # Connect signals
         if self._nfile:
@@ -93,6 +103,7 @@ class NEditable(QObject):
             self.askForSaveFileClosing.emit(self)
         else:
             self._nfile.remove_watcher()
+            self._checkers_scheduler.cancel()
             self.fileClosing.emit(self)
 
     def clone(self):
@@ -215,19 +226,23 @@ class NEditable(QObject):
             Checker, color, priority = values
             check = Checker(self.__editor)
             self.registered_checkers[i] = (check, color, priority)
-            check.finished.connect(self.show_checkers_notifications)
+        self._checkers_scheduler.set_checkers(
+            [check for check, _, _ in self.registered_checkers])
+
+    @property
+    def symbols(self):
+        """(symbols, symbols simplified) of the last outline obtained, they
+        can be of an older text. None if there isn't one yet"""
+        return self._outline_scheduler.symbols
+
+    def update_symbols(self):
+        """Obtain the symbols of the current text in background,
+        symbolsUpdated is emitted when they are ready"""
+        self._outline_scheduler.request()
 
     def run_checkers(self, content, path=None, encoding=None):
-        for items in self.registered_checkers:
-            checker = items[0]
-            checker.run_checks()
-
-    def show_checkers_notifications(self):
-        """Show the notifications obtained for the proper checker."""
-        self._checkers_executed += 1
-        if self._checkers_executed == len(self.registered_checkers):
-            self._checkers_executed = 0
-            self.checkersUpdated.emit(self)
+        """Ask the scheduler to run the checkers for the current text"""
+        self._checkers_scheduler.request()
 
     def update_checkers_display(self):
         for items in self.registered_checkers:
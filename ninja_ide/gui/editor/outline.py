@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of NINJA-IDE (http://ninja-ide.org).
+#
+# NINJA-IDE is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# any later version.
+#
+# NINJA-IDE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
+"""Symbols of a document, obtained in background.
+
+The outline of a document remembers the top level statements of the
+last text parsed. When the text changes only the statements in the
+lines changed are parsed again, the symbols of the rest are moved to
+their new lines. The symbols are obtained once for each (revision, path)
+of the document."""
+
+import ast
+import bisect
+
+from PyQt5.QtCore import pyqtSignal
+
+from ninja_ide.extensions import handlers
+from ninja_ide.gui.editor import background
+from ninja_ide.tools.logger import NinjaLogger
+
+logger = NinjaLogger(__name__)
+
+
+def _shift(value, delta):
+    """Move the line numbers in the symbols (every int is one) by delta"""
+    if isinstance(value, int):
+        return value + delta
+    if isinstance(value, dict):
+        return {key: _shift(item, delta) for key, item in value.items()}
+    return value
+
+
+class _Segment(object):
+    """Top level statements that start in the same line and the lines
+    until the next ones"""
+
+    __slots__ = ("start", "end", "base", "symbols", "simplified")
+
+    def __init__(self, start, end, symbols, simplified):
+        self.start = start
+        self.end = end
+        # Start when the symbols were obtained
+        self.base = start
+        self.symbols = symbols
+        self.simplified = simplified
+
+
+class Outline(object):
+    """Symbols of a module, updated parsing only the statements changed.
+
+    The symbols handler must have symbols_from_body (as introspection),
+    for the other handlers all the text is given to obtain_symbols."""
+
+    def __init__(self, handler):
+        self._handler = handler
+        self._lines = []
+        self._segments = []
+
+    @property
+    def incremental(self):
+        return hasattr(self._handler, "symbols_from_body")
+
+    def update(self, source, encoding=None):
+        """Return (symbols, symbols simplified) of source, as
+        obtain_symbols, or None if it has syntax errors"""
+        if not self.incremental:
+            if encoding is not None:
+                source = source.encode(encoding)
+            return self._handler.obtain_symbols(source, simple=True)
+        lines = source.split("\n")
+        if self._segments:
+            segments = self._update_changed(lines)
+        else:
+            segments = None
+        if segments is None:
+            segments = self._parse(lines, 0, len(lines))
+            if segments is None:
+                return None
+        self._lines = lines
+        self._segments = segments
+        return self._symbols()
+
+    def _changed_range(self, lines):
+        """Return the lines (first, old end, new end) that changed"""
+        old = self._lines
+        common = min(len(old), len(lines))
+        first = 0
+        while first < common and old[first] == lines[first]:
+            first += 1
+        suffix = 0
+        while suffix < common - first and \
+                old[-1 - suffix] == lines[-1 - suffix]:
+            suffix += 1
+        return first, len(old) - suffix, len(lines) - suffix
+
+    def _update_changed(self, lines):
+        """Return the segments of lines, parsing again the ones in the
+        lines changed, None if that isn't enough"""
+        first, old_end, new_end = self._changed_range(lines)
+        delta = new_end - old_end
+        if not delta and first == old_end:
+            return self._segments
+        starts = [segment.start for segment in self._segments]
+        # A change can continue the statement of the previous line
+        index = max(bisect.bisect_right(starts, max(first - 1, 0)) - 1, 0)
+        last = max(bisect.bisect_right(starts, max(old_end - 1, first)) - 1,
+                   index)
+        start = self._segments[index].start
+        end = self._segments[last].end + delta
+        changed = self._parse(lines, start, end)
+        if changed is None:
+            return None
+        after = self._segments[last + 1:]
+        for segment in after:
+            segment.start += delta
+            segment.end += delta
+        return self._segments[:index] + changed + after
+
+    def _parse(self, lines, start, end):
+        """Return the segments of the lines from start to end, None if
+        they have syntax errors"""
+        try:
+            # The empty lines give the nodes their line numbers in lines
+            module = ast.parse("\n" * start + "\n".join(lines[start:end]))
+        except (SyntaxError, ValueError):
+            return None
+        groups = []
+        for node in module.body:
+            decorators = getattr(node, "decorator_list", None)
+            lineno = (decorators[0] if decorators else node).lineno - 1
+            if groups and groups[-1][0] == lineno:
+                groups[-1][1].append(node)
+            else:
+                groups.append((lineno, [node]))
+        segments = []
+        for number, (lineno, nodes) in enumerate(groups):
+            if number + 1 < len(groups):
+                segment_end = groups[number + 1][0]
+            else:
+                segment_end = end
+            symbols, simplified = self._handler.symbols_from_body(
+                nodes, simple=True)
+            segments.append(_Segment(
+                start if not number else lineno, segment_end,
+                symbols, simplified))
+        if not segments:
+            segments.append(_Segment(start, end, {}, {}))
+        return segments
+
+    def _symbols(self):
+        symbols = {}
+        simplified = {}
+        for segment in self._segments:
+            delta = segment.start - segment.base
+            for kind, values in segment.symbols.items():
+                symbols.setdefault(kind, {}).update(
+                    _shift(values, delta) if delta else values)
+            if delta:
+                simplified.update((lineno + delta, value) for lineno, value
+                                  in segment.simplified.items())
+            else:
+                simplified.update(segment.simplified)
+        return symbols, simplified
+
+
+class _OutlineRun(background.BackgroundRun):
+    """Update an Outline with a text"""
+
+    def __init__(self, key, outline, source, encoding):
+        super().__init__(key)
+        self.outline = outline
+        self.source = source
+        self.encoding = encoding
+        self.result = None
+
+    def run(self):
+        try:
+            self.result = self.outline.update(self.source, self.encoding)
+        except Exception as reason:
+            logger.warning("Symbols not obtained: {}".format(reason))
+
+
+class OutlineScheduler(background.BackgroundScheduler):
+    """Obtain the symbols of a NEditable when they are requested.
+
+    The symbols are kept for the last (revision, path) of the document,
+    they are given at once while the text doesn't change."""
+
+    outlineUpdated = pyqtSignal()
+
+    def __init__(self, neditable):
+        super().__init__()
+        self._neditable = neditable
+        self._outline = None
+        self._language = None
+        # (revision, path) of the last request and of the symbols
+        self._latest = None
+        self._key = None
+        self._symbols = None
+
+    @property
+    def symbols(self):
+        """(symbols, symbols simplified) of the last text parsed or None"""
+        return self._symbols
+
+    def request(self, delay=0):
+        """Obtain the symbols after delay ms without more requests"""
+        self.schedule(delay)
+
+    def _current_key(self):
+        editor = self._neditable.editor
+        return (editor.document().revision(), self._neditable.file_path)
+
+    def _start(self):
+        editor = self._neditable.editor
+        if editor is None:
+            return
+        language = self._neditable.language()
+        handler = handlers.get_symbols_handler(language)
+        if handler is None:
+            return
+        if self._outline is None or language != self._language:
+            self._outline = Outline(handler)
+            self._language = language
+            self._key = None
+        key = self._current_key()
+        if key == self._key:
+            # The symbols are of this same text
+            self.outlineUpdated.emit()
+            return
+        self._latest = key
+        if self._run is not None:
+            # Started again when the run finishes
+            return
+        self._launch(_OutlineRun(key, self._outline, editor.text,
+                                 getattr(editor, 'encoding', None)))
+
+    def _run_finished(self, run):
+        if run.outline is not self._outline:
+            # The language changed meanwhile
+            self._start()
+            return
+        if run.result is not None:
+            self._symbols = run.result
+        self._key = run.key
+        if run.key == self._latest:
+            self.outlineUpdated.emit()
+        else:
+            self._start()
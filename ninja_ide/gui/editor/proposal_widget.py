@@ -49,12 +49,15 @@ class ProposalItem(object):
     The ProposalItem class acts as an interface for representing an assist
     proposal item.
     """
-    __slots__ = ("text", "type", "detail", "__icon")
+    __slots__ = ("text", "type", "detail", "completion", "__icon")
 
     def __init__(self, text):
         self.text = text
         self.type = None
+        # None until it's known, see ProposalWidget.detailsRequested
         self.detail = None
+        # What the provider returned for this item
+        self.completion = None
         self.__icon = None
 
     @property
@@ -283,6 +286,8 @@ class ProposalWidget(QFrame):
     """
 
     proposalItemActivated = pyqtSignal("PyQt_PyObject")
+    # The detail of the item selected isn't known yet
+    detailsRequested = pyqtSignal("PyQt_PyObject")
 
     def __init__(self, parent):
         super().__init__(parent)
@@ -323,6 +328,9 @@ class ProposalWidget(QFrame):
         if not current.isValid():
             return
         info = current.data(Qt.WhatsThisRole)
+        if info is None:
+            # Shown when it arrives, with set_item_detail
+            self.detailsRequested.emit(self._model.item(current.row()))
         if not info:
             if self._info_frame is not None:
                 self._info_frame.close()
@@ -338,6 +346,12 @@ class ProposalWidget(QFrame):
         self._info_frame.raise_()
         self._info_timer.setInterval(0)
 
+    def set_item_detail(self, item, detail):
+        item.detail = detail or ""
+        current = self._proposal_view.currentIndex()
+        if current.isValid() and self._model.item(current.row()) is item:
+            self.show_info()
+
     def set_model(self, model):
         if self._model is not None:
             self._model.deleteLater()
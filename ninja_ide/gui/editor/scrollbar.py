@@ -15,6 +15,7 @@
 # You should have received a copy of the GNU General Public License
 # along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
 
+import bisect
 from collections import namedtuple
 from collections import defaultdict
 from PyQt5.QtWidgets import (
@@ -36,8 +37,17 @@ from PyQt5.QtCore import Qt
 
 Marker = namedtuple('Marker', 'position color priority')
 
+# Height (px) of the mark of a line
+MARKER_HEIGHT = 4
+
 
 class ScrollBarOverlay(QWidget):
+    """Paint the markers over the scrollbar.
+
+    The markers of each category are reduced to one per pixel row of the
+    scrollbar, so painting doesn't depend on the number of markers. The
+    rows of a category are computed again only when that category or the
+    geometry of the scrollbar change."""
 
     class Position:
         LEFT = 0
@@ -48,11 +58,23 @@ class ScrollBarOverlay(QWidget):
         super().__init__(nscrollbar)
         self._nscrollbar = nscrollbar
         self.__schedule_updated = False
-        self.markers = defaultdict(list)  # {'id': list of markers}
-        self.cache = {}  # {'position': marker}
+        self.markers = defaultdict(dict)  # {'id': {lineno: marker}}
+        # {'id': sorted line numbers}
+        self._lines = {}
+        # {'id': (geometry, {row: marker})}
+        self._rows = {}
+        self.cache = {}  # {row: marker}
+        self._cache_geometry = None
+        self._colors = {}
         self.range_offset = 0.0
         self.visible_range = 0.0
 
+    def _geometry(self):
+        rect = self._nscrollbar.overlay_rect()
+        sb_range = self._nscrollbar.get_scrollbar_range()
+        sb_range = max(self.visible_range, sb_range, 1)
+        return (rect.top(), rect.height(), sb_range, self.range_offset)
+
     def paintEvent(self, event):
         QWidget.paintEvent(self, event)
         self.update_cache()
@@ -60,46 +82,65 @@ class ScrollBarOverlay(QWidget):
             return
 
         rect = self._nscrollbar.overlay_rect()
-        sb_range = self._nscrollbar.get_scrollbar_range()
-        sb_range = max(self.visible_range, sb_range)
-        # horizontal_margin = 3
-        # result_width = rect.width() - 2 * horizontal_margin + 1
-        result_width = rect.width() / 3
-        result_height = min(rect.height() / sb_range + 1, 4)
-        # x = rect.left() + horizontal_margin
+        result_width = rect.width() // 3
         x = rect.center().x() - 1
-        offset = rect.height() / sb_range * self.range_offset
-        vertical_margin = ((rect.height() / sb_range) - result_height) / 2
 
         painter = QPainter(self)
-
-        for lineno in self.cache.keys():
-            marker = self.cache[lineno]
-            top = rect.top() + offset + vertical_margin + \
-                marker.position / sb_range * rect.height()
-            # bottom = top + result_height
-            painter.fillRect(
-                x,
-                top,
-                result_width,
-                4,
-                QColor(marker.color))
+        for row in sorted(self.cache):
+            color = self._colors.get(self.cache[row].color)
+            if color is None:
+                color = self._colors[self.cache[row].color] = QColor(
+                    self.cache[row].color)
+            painter.fillRect(x, row, result_width, MARKER_HEIGHT, color)
+
+    def category_changed(self, category):
+        """Forget what was computed for category"""
+        self._lines.pop(category, None)
+        self._rows.pop(category, None)
+        self._cache_geometry = None
+        self.schedule_update()
+
+    def _category_rows(self, category, geometry):
+        """Return {row: marker} of the markers of category"""
+        cached = self._rows.get(category)
+        if cached is not None and cached[0] == geometry:
+            return cached[1]
+        markers = self.markers[category]
+        lines = self._lines.get(category)
+        if lines is None:
+            lines = self._lines[category] = sorted(markers)
+        top, height, sb_range, range_offset = geometry
+        if height <= 0:
+            # Collapsed, there are no rows to paint
+            return {}
+        scale = height / sb_range
+        base = top + scale * range_offset + max(scale - MARKER_HEIGHT, 0) / 2
+        rows = {}
+        index = 0
+        while index < len(lines):
+            lineno = lines[index]
+            row = int(base + lineno * scale)
+            rows[row] = markers[lineno]
+            # Skip the lines that fall in the same row
+            index = bisect.bisect_left(
+                lines, (row + 1 - base) / scale, index + 1)
+        self._rows[category] = (geometry, rows)
+        return rows
 
     def update_cache(self):
-        if not self.__schedule_updated:
+        self.__schedule_updated = False
+        geometry = self._geometry()
+        if geometry == self._cache_geometry:
             return
         self.cache.clear()
-        categories = self.markers.keys()
-        for category in categories:
-            markers = self.markers[category]
-            for marker in markers:
-                old = self.cache.get(marker.position)
-                if old is not None and old.position == marker.position:
-                    if old.priority > marker.priority:
-                        self.cache[old.position] = old
-                        continue
-                self.cache[marker.position] = marker
-        self.__schedule_updated = False
+        for category in list(self.markers):
+            for row, marker in self._category_rows(
+                    category, geometry).items():
+                old = self.cache.get(row)
+                if old is not None and old.priority > marker.priority:
+                    continue
+                self.cache[row] = marker
+        self._cache_geometry = geometry
 
     def schedule_update(self):
         if self.__schedule_updated:
@@ -168,15 +209,45 @@ class NScrollBar(QScrollBar):
     def remove_marker(self, category):
         if category in self._overlay.markers:
             del self._overlay.markers[category]
-            self._overlay.schedule_update()
+            self._overlay.category_changed(category)
 
     def add_marker(self, category, lineno, color, priority=0):
-        marker = Marker(lineno, color, priority)
-        self._overlay.markers[category].append(marker)
-        self._overlay.schedule_update()
+        markers = self._overlay.markers[category]
+        old = markers.get(lineno)
+        if old is None or old.priority <= priority:
+            markers[lineno] = Marker(lineno, color, priority)
+            self._overlay.category_changed(category)
+
+    def add_markers(self, category, lines, color, priority=0):
+        """Add the same marker in each line of lines"""
+        markers = self._overlay.markers[category]
+        if not markers:
+            markers.update((lineno, Marker(lineno, color, priority))
+                           for lineno in lines)
+        else:
+            for lineno in lines:
+                old = markers.get(lineno)
+                if old is None or old.priority <= priority:
+                    markers[lineno] = Marker(lineno, color, priority)
+        self._overlay.category_changed(category)
+
+    def update_markers(self, category, changes, priority=0):
+        """Change the markers of some lines, changes is {lineno: color}
+        and a color None removes the marker of the line"""
+        if not changes:
+            return
+        markers = self._overlay.markers[category]
+        for lineno, color in changes.items():
+            if color is None:
+                markers.pop(lineno, None)
+            else:
+                markers[lineno] = Marker(lineno, color, priority)
+        self._overlay.category_changed(category)
 
     def link(self, scrollbar):
-        self._overlay.markers.update(scrollbar.markers().copy())
+        for category, markers in scrollbar.markers().items():
+            self._overlay.markers[category] = dict(markers)
+            self._overlay.category_changed(category)
 
     def markers(self):
         return self._overlay.markers
@@ -20,74 +20,60 @@ from PyQt5.QtGui import (
     QPainter,
     QColor
 )
+from PyQt5.QtCore import QSize
 from ninja_ide.gui.editor import side_area
 
 
-class LintArea(side_area.SideArea):
+class LintArea(side_area.SideWidget):
     """Shows markes with messages collected by checkers"""
 
-    def __init__(self, editor):
-        super().__init__(editor)
+    def __init__(self):
+        super().__init__()
         self.setMouseTracking(True)
-        self._editor = editor
-        self.__checkers = None
-        self._editor.highlight_checker_updated.connect(self.__update)
-        self.__messages = {}
+        self.__lines = None
+        self.__colors = {}
 
-    def __update(self, checkers):
-        # self.__checkers = checkers
-        # print(self.__checkers)
-        self.__checkers = checkers
+    def on_register(self):
+        self._neditor.highlight_checker_updated.connect(self.__update)
+        self.__lines = self._neditor.checker_lines
+
+    def __update(self, lines):
+        self.__lines = lines
+        self.update()
 
     def mouseMoveEvent(self, event):
-        if not self.__checkers:
+        if not self.__lines:
+            return
+        line = self._neditor.line_from_position(event.pos().y())
+        if line not in self.__lines:
             return
-        line = self._editor.line_from_position(event.pos().y())
-        for checker in self.__checkers:
-            obj, _, _ = checker
-            message = obj.message(line)
+        for checker, _, _ in self._neditor.neditable.sorted_checkers:
+            message = checker.message(line)
             if message is not None:
                 # Formatting text
-                text = "<div style='color: green'>Lint</div><hr>%s" % message
+                text = "<div style='color: green'>Lint</div><hr>%s" % (
+                    "<br>".join(text for _, text, _ in message))
                 QToolTip.showText(self.mapToGlobal(event.pos()), text, self)
+                break
 
-    def width(self):
-        return 15
-
-    def paintEvent(self, event):
-        super().paintEvent(event)
-        if self.__checkers is None:
-            return
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing, True)
-        for checker in self.__checkers:
-            checker_obj, color, _ = checker
-            lines = checker_obj.checks.keys()
-            painter.setPen(QColor(color))
-            painter.setBrush(QColor(color))
-            for top, block_number, _ in self._editor.visible_blocks:
-                for marker in lines:
-                    if marker == block_number:
-                        r = self.width() - 9
-                        painter.drawEllipse(5, top + 10, r, r)
-    """
-
-    """
-    """
+    def sizeHint(self):
+        return QSize(15, 15)
 
     def paintEvent(self, event):
         super().paintEvent(event)
-        if not self.__checks:
+        if not self.__lines:
             return
         painter = QPainter(self)
         painter.setRenderHint(QPainter.Antialiasing, True)
-        painter.setPen(QColor("#ffd66c"))
-        painter.setBrush(QColor("#ffd66c"))
-        if self.__checks is not None:
-            lines = self.__checks.keys()
-            for top, block_number, _ in self._editor.visible_blocks:
-                for marker in lines:
-                    if marker == block_number:
-                        r = self.width() - 9
-                        painter.drawEllipse(5, top + 10, r, r)
-    """
+        r = self.width() - 9
+        # Only the lines in the viewport are looked up
+        for top, block_number, _ in self._neditor.visible_blocks:
+            results = self.__lines.get(block_number)
+            if results is None:
+                continue
+            color = self.__colors.get(results[0])
+            if color is None:
+                color = self.__colors[results[0]] = QColor(results[0])
+            painter.setPen(color)
+            painter.setBrush(color)
+            painter.drawEllipse(5, int(top) + 10, r, r)
@@ -16,18 +16,97 @@
 # along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
 
 import difflib
+from array import array
 from PyQt5.QtGui import (
     QPainter,
     QColor
 )
 from PyQt5.QtCore import (
     pyqtSlot,
-    QSize,
-    QTimer
+    QSize
 )
+from ninja_ide.gui.editor import helpers
 from ninja_ide.gui.editor.side_area import SideWidget
 from ninja_ide import resources
 
+# State of each line
+CLEAN, UNSAVED, SAVED = 0, 1, 2
+
+# A change that adds or removes lines and touches more lines than this
+# (and than half of the document) is aligned with the saved text again
+REALIGN_LINES = 200
+
+
+class LineChanges(object):
+    """State of each line of a document against the text last saved.
+
+    It's updated with the lines replaced by each change, a line keeps the
+    index of the saved line it comes from so it's clean again if the text
+    goes back to the saved one."""
+
+    def __init__(self, lines):
+        self.states = bytearray(len(lines))
+        self._saved_lines = lines
+        self._saved_states = bytearray(len(lines))
+        # Current line -> saved line, -1 for the new lines
+        self._origins = array('i', range(len(lines)))
+
+    def __len__(self):
+        return len(self.states)
+
+    def state(self, lineno):
+        if 0 <= lineno < len(self.states):
+            return self.states[lineno]
+        return CLEAN
+
+    def _state_for(self, origin, text):
+        if origin >= 0 and self._saved_lines[origin] == text:
+            return self._saved_states[origin]
+        return UNSAVED
+
+    def replace(self, first, removed, lines):
+        """Replace the `removed` lines from `first` with the text lines"""
+        old_origins = self._origins[first:first + removed]
+        origins = array('i', [-1]) * len(lines)
+        if len(lines) == removed:
+            origins = old_origins
+        elif len(lines) == 1 and removed:
+            # The lines were merged, it keeps the origin with its text
+            origins[0] = next(
+                (origin for origin in old_origins if origin >= 0 and
+                 self._saved_lines[origin] == lines[0]), old_origins[0])
+        elif lines and removed:
+            # The change started in the first line and ended in the last
+            origins[0] = old_origins[0]
+            origins[-1] = old_origins[-1]
+        self._origins[first:first + removed] = origins
+        self.states[first:first + removed] = bytes(
+            self._state_for(origin, text)
+            for origin, text in zip(origins, lines))
+
+    def realign(self, lines):
+        """Compute the state of every line comparing with the saved text"""
+        self.states = bytearray([UNSAVED]) * len(lines)
+        self._origins = array('i', [-1]) * len(lines)
+        matcher = difflib.SequenceMatcher(None, self._saved_lines, lines,
+                                          autojunk=False)
+        for i, j, size in matcher.get_matching_blocks():
+            self._origins[j:j + size] = array('i', range(i, i + size))
+            self.states[j:j + size] = self._saved_states[i:i + size]
+
+    def revert_if_saved(self, lines):
+        """Clean the changes if lines is the saved text (undo/redo)"""
+        if lines == self._saved_lines:
+            self.states = bytearray(self._saved_states)
+            self._origins = array('i', range(len(lines)))
+
+    def save(self, lines):
+        """The current text (lines) was saved"""
+        self.states = self.states.replace(bytes([UNSAVED]), bytes([SAVED]))
+        self._saved_lines = lines
+        self._saved_states = bytearray(self.states)
+        self._origins = array('i', range(len(lines)))
+
 
 class TextChangeWidget(SideWidget):
 
@@ -51,67 +130,55 @@ class TextChangeWidget(SideWidget):
             color = QColor(color)
         self.__saved_color = color
 
-    @property
-    def delay(self):
-        return self.__delay
-
-    @delay.setter
-    def delay(self, ms):
-        if ms != self.__delay:
-            self.__delay = ms
-            self._timer.setInterval(self.__delay)
-
     def __init__(self):
         SideWidget.__init__(self)
-        self.__unsaved_markers = []
-        self.__saved_markers = []
-        self.__saved = False
+        self.__changes = LineChanges([''])
         # Default properties
         self.__unsaved_color = QColor(
             resources.COLOR_SCHEME.get("editor.markarea.modified"))
         self.__saved_color = QColor(
             resources.COLOR_SCHEME.get("editor.markarea.saved"))
-        self.__delay = 300
-        # Delay Timer
-        self._timer = QTimer(self)
-        self._timer.setInterval(self.__delay)
-        self._timer.setSingleShot(True)
-        self._timer.timeout.connect(self.__on_text_changed)
 
     def register(self, neditor):
         SideWidget.register(self, neditor)
-        self.__text = neditor.toPlainText()
-        self.__last_saved_text = neditor.toPlainText()
-        # Connect textChanged signal to the timer
-        # the __on_text_chaned slot is executed each '__delay' milliseconds
-        neditor.textChanged.connect(self._timer.start)
+        document = neditor.document()
+        self.__changes = LineChanges(neditor.toPlainText().split('\n'))
+        # Each change updates only the lines it touched
+        document.contentsChange.connect(self.__on_contents_change)
+        document.modificationChanged.connect(self.__on_modification_changed)
         neditor.updateRequest.connect(self.update)
         neditor.neditable.fileSaved.connect(self.__on_file_saved)
 
+    def __lines(self):
+        return self._neditor.toPlainText().split('\n')
+
     @pyqtSlot()
     def __on_file_saved(self):
-        self.__saved = True
-        self.__last_saved_text = self._neditor.toPlainText()
-        self.__saved_markers += list(self.__unsaved_markers)
+        self.__changes.save(self.__lines())
+        self.update()
 
-    @pyqtSlot()
-    def __on_text_changed(self):
-        if self.__saved:
-            self.__saved = False
+    @pyqtSlot(bool)
+    def __on_modification_changed(self, modified):
+        if not modified:
+            # Undo/redo back to the saved text
+            self.__changes.revert_if_saved(self.__lines())
+            self.update()
+
+    @pyqtSlot(int, int, int)
+    def __on_contents_change(self, position, removed, added):
+        document = self._neditor.document()
+        change = helpers.changed_lines(
+            document, position, added, len(self.__changes))
+        if change is None:
+            self.__changes.realign(self.__lines())
+            return
+        first, removed_lines, lines = change
+        if len(lines) != removed_lines and len(lines) > REALIGN_LINES and \
+                len(lines) * 2 > document.blockCount():
+            # setPlainText, a big paste...
+            self.__changes.realign(self.__lines())
             return
-        self.__unsaved_markers.clear()
-        old_text = self.__last_saved_text
-        actual_text = self._neditor.toPlainText()
-        matcher = difflib.SequenceMatcher(None,
-                                          old_text.splitlines(),
-                                          actual_text.splitlines())
-        for tag, _, _, j1, j2 in matcher.get_opcodes():
-            if tag in ('insert', 'replace'):
-                for lineno in range(j1, j2):
-                    if lineno not in self.__unsaved_markers:
-                        self.__unsaved_markers.append(lineno)
-                    if lineno in self.__saved_markers:
-                        self.__saved_markers.remove(lineno)
+        self.__changes.replace(first, removed_lines, lines)
 
     def sizeHint(self):
         return QSize(2, 0)
@@ -121,12 +188,12 @@ class TextChangeWidget(SideWidget):
         painter = QPainter(self)
         height = self._neditor.fontMetrics().height()
         width = self.sizeHint().width()
+        state = self.__changes.state
         for top, block_number, _ in self._neditor.visible_blocks:
-            for lineno in self.__unsaved_markers:
-                if block_number == lineno:
-                    painter.fillRect(0, top, width,
-                                     height + 1, self.__unsaved_color)
-            for lineno in self.__saved_markers:
-                if block_number == lineno:
-                    painter.fillRect(0, top, width,
-                                     height + 1, self.__saved_color)
+            line_state = state(block_number)
+            if line_state == UNSAVED:
+                painter.fillRect(0, top, width,
+                                 height + 1, self.__unsaved_color)
+            elif line_state == SAVED:
+                painter.fillRect(0, top, width,
+                                 height + 1, self.__saved_color)
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of NINJA-IDE (http://ninja-ide.org).
+#
+# NINJA-IDE is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# any later version.
+#
+# NINJA-IDE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
+"""Where each word of a document is.
+
+The index is kept up to date with the lines touched by each change of
+the document, so finding the lines of a word costs the number of lines
+that have it and finding the occurrences in some lines costs the number
+of those lines. The words are compared ignoring the case."""
+
+import re
+from collections import defaultdict
+
+from PyQt5.QtCore import QObject
+from PyQt5.QtCore import pyqtSlot
+
+from ninja_ide.gui.editor import helpers
+
+WORD = re.compile(r"\w+")
+
+
+def get_word_index(document):
+    """Return the WordIndex of document, it's built the first time"""
+    index = document.findChild(WordIndex)
+    if index is None:
+        index = WordIndex(document)
+    return index
+
+
+class _Line(object):
+    """Words of a line: {word: [(start, end)]}"""
+
+    __slots__ = ("number", "words")
+
+    def __init__(self, number, words):
+        self.number = number
+        self.words = words
+
+
+class WordIndex(QObject):
+
+    def __init__(self, document):
+        super().__init__(document)
+        self._document = document
+        self._lines = []
+        # word -> lines where it is
+        self._postings = defaultdict(set)
+        # False when a change added or removed lines, the numbers of the
+        # lines are updated the next time they are needed
+        self._numbered = True
+        self._rebuild()
+        document.contentsChange.connect(self._on_contents_change)
+
+    def __len__(self):
+        return len(self._lines)
+
+    def _rebuild(self):
+        self._lines = []
+        self._postings.clear()
+        block = self._document.begin()
+        texts = []
+        while block.isValid():
+            texts.append(block.text())
+            block = block.next()
+        self.replace(0, 0, texts)
+
+    def _index(self, number, text):
+        words = {}
+        for match in WORD.finditer(text):
+            words.setdefault(match.group().lower(), []).append(match.span())
+        line = _Line(number, words)
+        for word in words:
+            self._postings[word].add(line)
+        return line
+
+    def _unindex(self, line):
+        for word in line.words:
+            lines = self._postings[word]
+            lines.discard(line)
+            if not lines:
+                del self._postings[word]
+
+    def replace(self, first, removed, texts):
+        """Replace the `removed` lines from `first` with the text lines"""
+        for line in self._lines[first:first + removed]:
+            self._unindex(line)
+        self._lines[first:first + removed] = [
+            self._index(number, text)
+            for number, text in enumerate(texts, first)]
+        if len(texts) != removed:
+            self._numbered = False
+
+    @pyqtSlot(int, int, int)
+    def _on_contents_change(self, position, removed, added):
+        change = helpers.changed_lines(
+            self._document, position, added, len(self._lines))
+        if change is None:
+            self._rebuild()
+            return
+        self.replace(*change)
+
+    def _number(self):
+        if not self._numbered:
+            for number, line in enumerate(self._lines):
+                line.number = number
+            self._numbered = True
+
+    def lines_with(self, word):
+        """Return the sorted numbers of the lines that have word"""
+        lines = self._postings.get(word.lower())
+        if not lines:
+            return []
+        self._number()
+        return sorted(line.number for line in lines)
+
+    def occurrences(self, word, first, last):
+        """Return the (line number, start, end) of word between the lines
+        first and last"""
+        word = word.lower()
+        found = []
+        for number in range(max(first, 0), min(last + 1, len(self._lines))):
+            spans = self._lines[number].words.get(word)
+            if spans:
+                found.extend((number, start, end) for start, end in spans)
+        return found
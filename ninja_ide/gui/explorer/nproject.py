@@ -12,6 +12,7 @@ from ninja_ide import translations
 
 from ninja_ide.core import settings
 from ninja_ide.core.file_handling import file_manager
+from ninja_ide.core.file_handling import file_inventory
 from ninja_ide.tools import json_manager
 
 
@@ -56,6 +57,9 @@ class NProject(QObject):
         self.is_current = True
         # Model is a QFileSystemModel to be set on runtime
         self.__model = None
+        # Files of the project, listed when they are needed. Created here,
+        # in the GUI thread, it's used from the locator thread too
+        self.__inventory = file_inventory.FileInventory(self.path, self)
 
     def _get_name(self):
         return self._name
@@ -92,6 +96,7 @@ class NProject(QObject):
         if file_manager.file_exists(self.path, self._name + '.nja'):
             file_manager.delete_file(self.path, self._name + '.nja')
         json_manager.create_ninja_project(self.path, self._name, project)
+        self.__inventory.refresh()
         # TODO: update project tree on extensions changed
 
     @property
@@ -99,10 +104,20 @@ class NProject(QObject):
         '''
         Returns the full path of the project
         '''
-        project_file = json_manager.get_ninja_project_file(self.path)
-        if not project_file:  # FIXME: If we dont have a project file
-            project_file = ''  # we should do SOMETHING! like kill zombies!
-        return os.path.join(self.path, project_file)
+        project_files = self.inventory.folder_files(extensions=('.nja',))
+        if not project_files:  # FIXME: If we dont have a project file
+            return os.path.join(self.path, '')  # we should do SOMETHING!
+        return project_files[0]
+
+    @property
+    def inventory(self):
+        """FileInventory of the project folder, the files are listed
+        once and kept up to date while the project is open"""
+        return self.__inventory
+
+    def close(self):
+        """Stop watching the files of the project"""
+        self.__inventory.clear()
 
     @property
     def python_exec_command(self):
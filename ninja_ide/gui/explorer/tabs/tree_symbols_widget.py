@@ -15,6 +15,9 @@
 # You should have received a copy of the GNU General Public License
 # along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
 
+import difflib
+from collections import namedtuple
+
 from PyQt5.QtWidgets import (
     QDialog,
     QTreeWidget,
@@ -213,77 +216,94 @@ class TreeSymbolsWidget(QDialog):
     def clear(self):
         self.tree.clear()
 
-    def update_symbols_tree(self, symbols, filename='', parent=None):
-        """Method to Update the symbols on the Tree"""
-        TIP = "{} {}"
-        if not parent:
-            if filename == self.actualSymbols[0] and \
-                    self.actualSymbols[1] and not symbols:
-                return
+    def update_symbols_tree(self, symbols, filename=''):
+        """Method to Update the symbols on the Tree
 
-            if symbols == self.actualSymbols[1]:
-                # Nothing new then return
-                return
+        The items of the symbols that are still there are kept (with
+        their expansion), only the ones that changed are replaced."""
+        if filename == self.actualSymbols[0] and \
+                self.actualSymbols[1] and not symbols:
+            return
+
+        if symbols == self.actualSymbols[1]:
+            # Nothing new then return
+            return
 
-            # we have new symbols refresh it
+        if filename != self.actualSymbols[0]:
             self.tree.clear()
-            self.actualSymbols = (filename, symbols)
-            self.docstrings = symbols.get('docstrings', {})
-            parent = self.tree
-        if 'attributes' in symbols:
-            globalAttribute = ItemTree(parent, [translations.TR_ATTRIBUTES])
-            globalAttribute.isClickable = False
-            globalAttribute.isAttribute = True
-            globalAttribute.setExpanded(self._get_expand(globalAttribute))
-            globalAttribute.setToolTip(
-                0, TIP.format(len(symbols['attributes']),
-                              translations.TR_ATTRIBUTES))
-            for glob in sorted(symbols['attributes']):
-                globItem = ItemTree(globalAttribute, [glob],
-                                    lineno=symbols['attributes'][glob])
-                globItem.isAttribute = True
-                globItem.setIcon(0, self.__icons["attribute"])
-                globItem.setExpanded(self._get_expand(globItem))
+        self.actualSymbols = (filename, symbols)
+        self.docstrings = symbols.get('docstrings', {})
+        self._update_items(self.tree.invisibleRootItem(),
+                           self._symbol_items(symbols))
 
+    def _symbol_items(self, symbols):
+        """Return the _Item of the tree for symbols"""
+        TIP = "{} {}"
+        items = []
+        if 'attributes' in symbols:
+            items.append(_Item(
+                translations.TR_ATTRIBUTES, None, "attributes",
+                TIP.format(len(symbols['attributes']),
+                           translations.TR_ATTRIBUTES),
+                [_Item(glob, symbols['attributes'][glob], "attribute",
+                       None, [])
+                 for glob in sorted(symbols['attributes'])]))
         if 'functions' in symbols and symbols['functions']:
-            functionsItem = ItemTree(parent, [translations.TR_FUNCTIONS])
-            functionsItem.isClickable = False
-            functionsItem.isMethod = True
-            functionsItem.setExpanded(self._get_expand(functionsItem))
-            functionsItem.setToolTip(0, TIP.format(len(symbols['functions']),
-                                                   translations.TR_FUNCTIONS))
-            for func in sorted(symbols['functions']):
-                item = ItemTree(functionsItem, [func],
-                                lineno=symbols['functions'][func]['lineno'])
-                tooltip = self.create_tooltip(
-                    func, symbols['functions'][func]['lineno'])
-                item.isMethod = True
-                item.setIcon(0, self.__icons["function"])
-                # item.setIcon(
-                #    0, ui_tools.colored_icon(":img/function", "#9FA8DA"))
-                item.setToolTip(0, tooltip)
-                item.setExpanded(self._get_expand(item))
-                self.update_symbols_tree(
-                    symbols['functions'][func]['functions'], parent=item)
+            functions = symbols['functions']
+            items.append(_Item(
+                translations.TR_FUNCTIONS, None, "functions",
+                TIP.format(len(functions), translations.TR_FUNCTIONS),
+                [_Item(func, functions[func]['lineno'], "function",
+                       self.create_tooltip(func, functions[func]['lineno']),
+                       self._symbol_items(functions[func]['functions']))
+                 for func in sorted(functions)]))
         if 'classes' in symbols and symbols['classes']:
-            classItem = ItemTree(parent, [translations.TR_CLASSES])
-            classItem.isClickable = False
-            classItem.isClass = True
-            classItem.setExpanded(self._get_expand(classItem))
-            classItem.setToolTip(0, TIP.format(len(symbols['classes']),
-                                               translations.TR_CLASSES))
-            for claz in sorted(symbols['classes']):
-                line_number = symbols['classes'][claz]['lineno']
-                item = ItemTree(classItem, [claz], lineno=line_number)
-                item.isClass = True
-                tooltip = self.create_tooltip(claz, line_number)
-                item.setToolTip(0, tooltip)
-                # item.setIcon(0, ui_tools.colored_icon(":img/class", "#FFCC80"))
-                # item.setIcon(0, ui_tools.get_icon('class', '#FFCC80'))
-                item.setIcon(0, self.__icons["class"])
-                item.setExpanded(self._get_expand(item))
-                self.update_symbols_tree(symbols['classes'][claz]['members'],
-                                         parent=item)
+            classes = symbols['classes']
+            items.append(_Item(
+                translations.TR_CLASSES, None, "classes",
+                TIP.format(len(classes), translations.TR_CLASSES),
+                [_Item(claz, classes[claz]['lineno'], "class",
+                       self.create_tooltip(claz, classes[claz]['lineno']),
+                       self._symbol_items(classes[claz]['members']))
+                 for claz in sorted(classes)]))
+        return items
+
+    def _update_items(self, parent, items):
+        """Make the children of parent show items, reusing the ones with
+        the same name and kind"""
+        children = [parent.child(i) for i in range(parent.childCount())]
+        matcher = difflib.SequenceMatcher(
+            None, [(child.text(0), child.kind) for child in children],
+            [(item.text, item.kind) for item in items], autojunk=False)
+        for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+            if tag == 'equal':
+                for child, item in zip(children[i1:i2], items[j1:j2]):
+                    child.lineno = item.lineno
+                    if item.tooltip is not None:
+                        child.setToolTip(0, item.tooltip)
+                    self._update_items(child, item.children)
+                continue
+            for _ in range(i1, i2):
+                parent.takeChild(i1)
+            for position, item in enumerate(items[j1:j2], i1):
+                self._create_item(parent, position, item)
+
+    def _create_item(self, parent, position, item):
+        child = ItemTree(None, [item.text], lineno=item.lineno)
+        child.kind = item.kind
+        parent.insertChild(position, child)
+        if item.kind in ("attributes", "functions", "classes"):
+            child.isClickable = False
+        child.isAttribute = item.kind in ("attributes", "attribute")
+        child.isMethod = item.kind in ("functions", "function")
+        child.isClass = item.kind in ("classes", "class")
+        if item.kind in self.__icons:
+            child.setIcon(0, self.__icons[item.kind])
+        if item.tooltip is not None:
+            child.setToolTip(0, item.tooltip)
+        for number, grandchild in enumerate(item.children):
+            self._create_item(child, number, grandchild)
+        child.setExpanded(self._get_expand(child))
 
     def _go_to_definition(self, item):
         """ Takes and item object and goes to definition on the editor """
@@ -345,12 +365,20 @@ class TreeSymbolsWidget(QDialog):
         event.ignore()
 
 
+# An item of the tree: text, line number, kind ("attribute", "function",
+# "class" or the roots "attributes", "functions", "classes"), tool tip and
+# the _Item inside
+_Item = namedtuple('_Item', 'text lineno kind tooltip children')
+
+
 class ItemTree(QTreeWidgetItem):
     """Item Tree widget items"""
 
     def __init__(self, parent, name, lineno=None):
         super(ItemTree, self).__init__(parent, name)
         self.lineno = lineno
+        # As in _Item
+        self.kind = None
         self.isClickable = True
         self.isAttribute = False
         self.isClass = False
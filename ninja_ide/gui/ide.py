@@ -16,6 +16,7 @@
 # along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
 
 # import os
+import importlib
 import collections
 
 from PyQt5.QtWidgets import QMainWindow
@@ -57,6 +58,8 @@ from ninja_ide.gui.dialogs.preferences import preferences
 # from ninja_ide.gui.dialogs import python_detect_dialog
 # from ninja_ide.gui.dialogs import plugins_store
 from ninja_ide.tools import ui_tools
+from ninja_ide.tools import linter
+from ninja_ide.tools import startup_profiler
 # from ninja_ide.tools.completion import completion_daemon
 
 ###############################################################################
@@ -90,6 +93,8 @@ class IDE(QMainWindow):
     filesAndProjectsLoaded = pyqtSignal()
 
     __IDESERVICES = {}
+    # service name -> modules that register it when they are imported
+    __IDELAZYSERVICES = {}
     __IDECONNECTIONS = {}
     __IDESHORTCUTS = {}
     __IDEBARCATEGORIES = {}
@@ -279,6 +284,9 @@ class IDE(QMainWindow):
         """Return the instance of a registered service."""
 
         service = cls.__IDESERVICES.get(service_name, None)
+        if service is None and service_name in cls.__IDELAZYSERVICES:
+            cls.__load_lazy_service(service_name)
+            service = cls.__IDESERVICES.get(service_name, None)
         if service is None:
             logger.debug("Service '{}' unregistered".format(service_name))
         return service
@@ -302,6 +310,26 @@ class IDE(QMainWindow):
         if cls.__created:
             cls.__instance.install_service(service_name)
 
+    @classmethod
+    def register_lazy_service(cls, service_name, *modules):
+        """Register a service that is created the first time it is asked
+        for, importing the modules that register it."""
+        cls.__IDELAZYSERVICES[service_name] = modules
+
+    @classmethod
+    def __load_lazy_service(cls, service_name):
+        modules = cls.__IDELAZYSERVICES.pop(service_name)
+        with startup_profiler.phase("Service '{}'".format(service_name)):
+            for module in modules:
+                importlib.import_module(module)
+
+    @classmethod
+    def load_lazy_services(cls):
+        """Create the lazy services that weren't asked for yet"""
+        for service_name in list(cls.__IDELAZYSERVICES):
+            if service_name in cls.__IDELAZYSERVICES:
+                cls.__load_lazy_service(service_name)
+
     def install_service(self, service_name):
         """ Activate the registered service """
 
@@ -854,6 +882,8 @@ class IDE(QMainWindow):
         #     self._save_unsaved_files(_unsaved_files)
         self.save_settings()
         self.goingDown.emit()
+        # Stop the lint workers
+        linter.shutdown_pool()
         # close python documentation server (if running)
         # main_container.close_python_doc()
         # Shutdown PluginManager
@@ -18,6 +18,7 @@
 # from __future__ import unicode_literals
 
 import bisect
+import difflib
 
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtWidgets import QMessageBox
@@ -47,7 +48,6 @@ from PyQt5.QtCore import QModelIndex
 from PyQt5.QtCore import QAbstractItemModel
 
 from ninja_ide import translations
-from ninja_ide.extensions import handlers
 from ninja_ide.core import settings
 from ninja_ide.gui.ide import IDE
 from ninja_ide.tools import ui_tools
@@ -177,6 +177,7 @@ class ComboEditor(QWidget):
             # Connections
             neditable.fileClosing.connect(self._close_file)
             neditable.fileSaved.connect(self._update_symbols)
+            neditable.symbolsUpdated.connect(self._show_symbols)
             editor.editorFocusObtained.connect(self._editor_with_focus)
             editor.modificationChanged.connect(self._editor_modified)
             editor.cursor_position_changed[int, int].connect(
@@ -398,14 +399,18 @@ class ComboEditor(QWidget):
         self._main_container.current_editor_changed(neditable.file_path)
 
     def _load_symbols(self, neditable):
-        # Get symbols handler by language
-        symbols_handler = handlers.get_symbols_handler(neditable.language())
-        if symbols_handler is None:
+        # The symbols known are shown until the ones of the current text
+        # are obtained in background
+        self._show_symbols(neditable)
+        neditable.update_symbols()
+
+    def _show_symbols(self, neditable):
+        editor = self.current_editor()
+        # Check if it's current to avoid signals from other splits.
+        if editor is None or editor.neditable != neditable or \
+                neditable.symbols is None:
             return
-        source = neditable.editor.text
-        source = source.encode(neditable.editor.encoding)
-        symbols, symbols_simplified = symbols_handler.obtain_symbols(
-            source, simple=True)
+        symbols, symbols_simplified = neditable.symbols
         self._symbols_index = sorted(symbols_simplified.keys())
         symbols_simplified = sorted(
             list(symbols_simplified.items()), key=lambda x: x[0])
@@ -573,8 +578,7 @@ class ActionBar(QFrame):
     def add_symbols(self, symbols):
         """Add the symbols to thcurrente symbols's combo."""
 
-        mo = Model(symbols)
-        self.symbols_combo.setModel(mo)
+        self.symbols_combo.model().update(symbols)
         # self.symbols_combo.clear()
         # for symbol in symbols:
         #    data = symbol[1]
@@ -1002,7 +1006,28 @@ class InfoBar(QFrame):
 class Model(QAbstractItemModel):
     def __init__(self, data):
         QAbstractItemModel.__init__(self)
-        self.__data = data
+        self.__data = list(data)
+
+    def update(self, data):
+        """Replace the symbols, only the rows of the symbols that aren't
+        there anymore or are new are removed or inserted"""
+        matcher = difflib.SequenceMatcher(
+            None, [symbol for _, symbol in self.__data],
+            [symbol for _, symbol in data], autojunk=False)
+        for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+            # The first row is the title
+            if tag in ('replace', 'delete'):
+                self.beginRemoveRows(QModelIndex(), i1 + 1, i2)
+                del self.__data[i1:i2]
+                self.endRemoveRows()
+            if tag in ('replace', 'insert'):
+                self.beginInsertRows(QModelIndex(), i1 + 1, i1 + j2 - j1)
+                self.__data[i1:i1] = data[j1:j2]
+                self.endInsertRows()
+        # The line numbers of the same symbols can change
+        self.__data = list(data)
+        title = self.index(0, 0, QModelIndex())
+        self.dataChanged.emit(title, title)
 
     def rowCount(self, parent):
         return len(self.__data) + 1
@@ -36,6 +36,7 @@ from ninja_ide.core import settings
 from ninja_ide.tools import ui_tools
 from ninja_ide.gui import actions
 from ninja_ide.gui.ide import IDE
+from ninja_ide.gui.editor import incremental_search
 from ninja_ide.tools.logger import NinjaLogger
 
 logger = NinjaLogger('ninja_ide.gui.status_bar')
@@ -91,11 +92,11 @@ class _StatusBar(QWidget):
 
         self.hide()
         self._search_widget.setVisible(False)
+        self._search_widget.cancel_search()
         main_container = IDE.get_service("main_container")
         editor = main_container.get_current_editor()
         if editor is not None:
-            editor.extra_selections.remove("find")
-            editor.scrollbar().remove_marker("find")
+            editor.clear_found_results()
 
     def show_search(self):
         """Show the status bar with search widget"""
@@ -110,7 +111,7 @@ class _StatusBar(QWidget):
             if not text:
                 text = editor.word_under_cursor().selectedText()
             self._search_widget._line_search.setText(text)
-            self._search_widget.find()
+            self._search_widget.request_search(delay=0)
         self._search_widget._line_search.setFocus()
         self._search_widget._line_search.selectAll()
 
@@ -163,11 +164,15 @@ class SearchWidget(QWidget):
         hbox.addWidget(self._btn_find_previous)
         self._btn_find_next = QPushButton(translations.TR_FIND_NEXT)
         hbox.addWidget(self._btn_find_next)
+        # The matches are searched in background while typing
+        self._search = incremental_search.IncrementalSearch(self)
+        self._search.progress.connect(self._on_search_progress)
+        self._search.finished.connect(self._on_search_finished)
         # Connections
-        self._line_search.textChanged.connect(self.find)
+        self._line_search.textChanged.connect(self.request_search)
         self._line_search.returnPressed.connect(self.find_next)
-        self._btn_case_sensitive.toggled.connect(self.find)
-        self._btn_whole_word.toggled.connect(self.find)
+        self._btn_case_sensitive.toggled.connect(self.request_search)
+        self._btn_whole_word.toggled.connect(self.request_search)
         self._btn_find_next.clicked.connect(self.find_next)
         self._btn_highlight.toggled.connect(self._toggle_highlighting)
         self._btn_find_previous.clicked.connect(self.find_previous)
@@ -188,6 +193,41 @@ class SearchWidget(QWidget):
             self._btn_highlight.isChecked()
         )
 
+    def request_search(self, *args, delay=incremental_search.SEARCH_DELAY):
+        """Search the text entered in the current editor after delay ms
+        without more changes"""
+        main_container = IDE.get_service("main_container")
+        editor = main_container.get_current_editor()
+        if editor is None:
+            return
+        if not self.search_text:
+            self._search.cancel()
+            editor.clear_found_results()
+            self._line_search.counter.update_count(0, 0)
+            return
+        cs, wo, _ = self.search_flags
+        self._search.search(editor, self.search_text, cs, wo, delay)
+
+    def cancel_search(self):
+        self._search.cancel()
+
+    @pyqtSlot(int)
+    def _on_search_progress(self, matches):
+        self._line_search.counter.update_count("...", matches, True)
+
+    def _on_search_finished(self, editor, search, results):
+        main_container = IDE.get_service("main_container")
+        if editor is not main_container.get_current_editor():
+            return
+        text, cs, wo = search
+        if results:
+            editor.find_match(text, cs, wo)
+            editor.set_found_results(text, cs, wo, results)
+        else:
+            editor.clear_found_results()
+        index, matches = editor.found_results_index()
+        self._line_search.counter.update_count(index, matches, True)
+
     def find_next(self):
         self.find(forward=True, rehighlight=False)
 
@@ -198,9 +238,8 @@ class SearchWidget(QWidget):
         main_container = IDE.get_service("main_container")
         editor = main_container.get_current_editor()
         if editor is not None:
-            cs, wo, _ = self.search_flags
             if state:
-                editor.highlight_found_results(self.search_text, cs, wo)
+                self.request_search(delay=0)
             else:
                 editor.clear_found_results()
 
@@ -214,17 +253,14 @@ class SearchWidget(QWidget):
         cs, wo, highlight = self.search_flags
         index, matches = 0, 0
         found = editor.find_match(self.search_text, cs, wo, backward, forward)
-        if found:
-            if rehighlight:
-                editor.clear_found_results()
-                index, matches = editor.highlight_found_results(
-                    self.search_text, cs, wo)
-        else:
+        if found and rehighlight:
+            # The results and their count come from the incremental search
+            self.request_search(delay=0)
+            return
+        if not found:
             editor.clear_found_results()
-        if matches == 0 and found:
-            index, matches = editor._get_find_index_results(
-                self.search_text, cs, wo)
-            matches = len(matches)
+        else:
+            index, matches = editor.found_results_index()
             if index == 1:
                 ide = IDE.get_service("ide")
                 ide.show_message(translations.TR_SEARCH_FROM_TOP)
@@ -279,9 +315,12 @@ class ReplaceWidget(QWidget):
         cs, wo, highlight = status_search.search_flags
         main_container = IDE.get_service("main_container")
         editor_widget = main_container.get_current_editor()
-        editor_widget.replace_all(
-            status_search.search_text, self._line_replace.text(), cs, wo)
+        replaced = editor_widget.replace_all(
+            status_search.search_text, self._line_replace.text(), cs, wo,
+            selection=selected)
         editor_widget.extra_selections.remove("find")
+        ide = IDE.get_service("ide")
+        ide.show_message(translations.TR_OCCURRENCES_REPLACED.format(replaced))
 
 
 '''
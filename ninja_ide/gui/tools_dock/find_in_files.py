@@ -15,9 +15,12 @@
 # You should have received a copy of the GNU General Public License
 # along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
 
-import queue
-import re
 import os
+import re
+import time
+import fnmatch
+import itertools
+import concurrent.futures
 
 from PyQt5.QtWidgets import (
     QWidget,
@@ -34,91 +37,203 @@ from PyQt5.QtWidgets import (
     QTreeView,
     QFrame,
     QStyle,
-    QItemDelegate
+    QItemDelegate,
+    QMessageBox
 )
 from PyQt5.QtCore import (
     QObject,
-    QDir,
     QAbstractItemModel,
-    QFile,
-    QTextStream,
     pyqtSignal,
     pyqtSlot,
-    QRegExp,
     Qt,
     QRect,
     QThread,
-    QModelIndex
+    QModelIndex,
+    QFileSystemWatcher
 )
 from PyQt5.QtGui import QPalette, QColor
 from ninja_ide.gui.ide import IDE
 from ninja_ide.tools import ui_tools
+from ninja_ide.tools import text_search
+from ninja_ide.tools import text_replace
+from ninja_ide.tools import content_index
+from ninja_ide.tools.logger import NinjaLogger
 from ninja_ide.core import settings
 from ninja_ide import translations
 from ninja_ide.gui.tools_dock.tools_dock import _ToolsDock
 
+logger = NinjaLogger(__name__)
+
+# Max number of lines found in a search
+MAX_RESULTS = 10000
+# Min time (ms) between two batches of results sent to the view
+BATCH_INTERVAL = 150
+# Max number of chunks of files waiting in the pool
+MAX_PENDING_CHUNKS = text_search.WORKERS * 4
+
 
 class FindInFilesWorker(QObject):
+    """Search in the files of a folder using the text_search pool.
 
-    finished = pyqtSignal()
-    resultAvailable = pyqtSignal('PyQt_PyObject')
-
-    def find_in_files(self, dir_name, filters, regexp, recursive):
-        """Trigger the find in files thread and return the lines found"""
-
-        self._cancel = False
-        self.recursive = recursive
-        self.search_pattern = regexp
-        self.filters = filters
-        self.queue = queue.Queue()
-        self.queue.put(dir_name)
-        self.root_dir = dir_name
-        # Start!
-        self.start_worker()
-
-    def start_worker(self):
-        file_filter = QDir.Files | QDir.NoDotAndDotDot | QDir.Readable
-        dir_filter = QDir.Dirs | QDir.NoDotAndDotDot | QDir.Readable
-        while not self._cancel and not self.queue.empty():
-            current_dir = QDir(self.queue.get())
-            # Skip not readable dirs!
-            if not current_dir.isReadable():
+    The results are sent in batches with resultsAvailable, at most one
+    batch every BATCH_INTERVAL ms. Each search has an id, a search stops
+    as soon as another one is requested or it is cancelled. The pool also
+    replaces in the files, a replace is never stopped."""
+
+    finished = pyqtSignal(int, bool)
+    resultsAvailable = pyqtSignal(int, 'PyQt_PyObject')
+    searchRequested = pyqtSignal(
+        int, 'QString', 'PyQt_PyObject', 'PyQt_PyObject', bool)
+    replaceFinished = pyqtSignal('PyQt_PyObject', 'PyQt_PyObject')
+    replaceRequested = pyqtSignal(
+        'PyQt_PyObject', 'PyQt_PyObject', 'PyQt_PyObject', 'QString', bool)
+
+    def __init__(self):
+        super().__init__()
+        self._latest = 0
+        self.searchRequested.connect(self.find_in_files)
+        self.replaceRequested.connect(self.replace_in_files)
+
+    def request_search(self, dir_name, filters, pattern, recursive):
+        """Start a search in the worker thread and return its id"""
+        self._latest += 1
+        self.searchRequested.emit(
+            self._latest, dir_name, filters, pattern, recursive)
+        return self._latest
+
+    def cancel(self):
+        self._latest += 1
+
+    def request_replace(self, files, pattern, template, regex, scope=None):
+        """Replace pattern with template in files in the worker thread,
+        replaceFinished is emitted when done.
+
+        With scope, (dir_name, filters, recursive, files to skip), the
+        files are listed again like a search without a limit of results
+        does (a file without matches is not written)."""
+        self.replaceRequested.emit(files, scope, pattern, template, regex)
+
+    @pyqtSlot('PyQt_PyObject', 'PyQt_PyObject', 'PyQt_PyObject', 'QString',
+              bool)
+    def replace_in_files(self, files, scope, pattern, template, regex):
+        """Replace in the files, each chunk is written by a worker"""
+        if scope is not None:
+            dir_name, filters, recursive, skip = scope
+            files = [file_path for file_path in self._candidate_files(
+                dir_name, filters, text_search.required_literal(pattern),
+                recursive) if file_path not in skip]
+        replaced = []
+        failed = []
+        pool = text_search.get_pool()
+        futures = [pool.submit(text_replace.replace_files,
+                               files[i:i + text_search.CHUNK_SIZE],
+                               pattern, template, regex)
+                   for i in range(0, len(files), text_search.CHUNK_SIZE)]
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                chunk_replaced, chunk_failed = future.result()
+                replaced.extend(chunk_replaced)
+                failed.extend(chunk_failed)
+        except Exception as reason:
+            logger.error("Replace in files failed: %r" % reason)
+            text_search.shutdown_pool()
+        self.replaceFinished.emit(replaced, failed)
+
+    def _index_files(self, files):
+        pool = text_search.get_pool()
+        futures = [pool.submit(text_search.file_trigrams,
+                               files[i:i + text_search.CHUNK_SIZE])
+                   for i in range(0, len(files), text_search.CHUNK_SIZE)]
+        for future in concurrent.futures.as_completed(futures):
+            for result in future.result():
+                yield result
+
+    def _candidate_files(self, dir_name, filters, literal, recursive):
+        """Return the files of dir_name that could contain literal.
+
+        The content index of the folder is brought up to date first, the
+        folder is walked if the index can't be used."""
+        index = content_index.get_index(dir_name)
+        try:
+            index.refresh(self._index_files)
+        except Exception as reason:
+            logger.error("Content index not updated: %r" % reason)
+            text_search.shutdown_pool()
+            return text_search.walk_files(dir_name, filters, recursive)
+        files = index.candidates(literal)
+        if files is None:
+            files = index.files()
+        candidates = []
+        for file_path in sorted(files):
+            if not recursive and os.path.dirname(file_path) != dir_name:
                 continue
-            # Collect all sub dirs!
-            if self.recursive:
-                current_sub_dirs = current_dir.entryInfoList(dir_filter)
-                for one_dir in current_sub_dirs:
-                    self.queue.put(one_dir.absoluteFilePath())
-            # All files in sub_dir first apply the filters
-            current_files = current_dir.entryInfoList(
-                self.filters, file_filter)
-            # Process all files in current dir
-            for one_file in current_files:
-                self._grep_file(
-                    one_file.absoluteFilePath(), one_file.fileName())
-
-        self.finished.emit()
-
-    def _grep_file(self, file_path, file_name):
-        """Search for each line inside the file"""
-        file_obj = QFile(file_path)
-        if not file_obj.open(QFile.ReadOnly):
+            file_name = os.path.basename(file_path)
+            if any(fnmatch.fnmatch(file_name, f) for f in filters):
+                candidates.append(file_path)
+        return candidates
+
+    @pyqtSlot(int, 'QString', 'PyQt_PyObject', 'PyQt_PyObject', bool)
+    def find_in_files(self, search_id, dir_name, filters, pattern,
+                      recursive):
+        """Search pattern in the files of dir_name matching filters"""
+        if search_id != self._latest:
+            # Another search was requested while this one was queued
             return
-        stream = QTextStream(file_obj)
-        lines = []
-        append = lines.append
-        line_index = 0
-        line = stream.readLine()
-        while not self._cancel and not stream.atEnd():
-            column = self.search_pattern.indexIn(line)
-            if column != -1:
-                append((line_index, line))
-            # Take the next line
-            line = stream.readLine()
-            line_index += 1
-
-        p = os.path.join(self.root_dir, file_path)
-        self.resultAvailable.emit((p, lines))
+        if not dir_name:
+            self.finished.emit(search_id, False)
+            return
+        literal = text_search.required_literal(pattern)
+        files = iter(self._candidate_files(
+            dir_name, filters, literal, recursive))
+        pool = text_search.get_pool()
+        pending = set()
+        walking = True
+        batch = []
+        count = 0
+        truncated = False
+        last_batch = time.monotonic()
+        try:
+            while search_id == self._latest and not truncated:
+                # Keep the pool busy without sending the whole tree at once
+                while walking and len(pending) < MAX_PENDING_CHUNKS:
+                    chunk = list(itertools.islice(
+                        files, text_search.CHUNK_SIZE))
+                    if not chunk:
+                        walking = False
+                        break
+                    pending.add(pool.submit(
+                        text_search.search_files, chunk, pattern, literal))
+                if not pending:
+                    break
+                done, pending = concurrent.futures.wait(
+                    pending, timeout=BATCH_INTERVAL / 1000.0,
+                    return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    for file_path, lines in future.result():
+                        if count + len(lines) >= MAX_RESULTS:
+                            lines = lines[:MAX_RESULTS - count]
+                            truncated = True
+                        count += len(lines)
+                        batch.append((file_path, lines))
+                        if truncated:
+                            break
+                    if truncated:
+                        break
+                now = time.monotonic()
+                if batch and (now - last_batch) * 1000 >= BATCH_INTERVAL:
+                    self.resultsAvailable.emit(search_id, batch)
+                    batch = []
+                    last_batch = now
+        except Exception as reason:
+            # A worker died, start with a new pool the next time
+            logger.error("Find in files failed: %r" % reason)
+            text_search.shutdown_pool()
+        finally:
+            for future in pending:
+                future.cancel()
+        if batch:
+            self.resultsAvailable.emit(search_id, batch)
+        self.finished.emit(search_id, truncated)
 
 
 class SearchResultTreeView(QTreeView):
@@ -136,8 +251,8 @@ class SearchResultTreeView(QTreeView):
     def clear(self):
         self._model.clear()
 
-    def add_result(self, results):
-        self._model.add_result(results)
+    def add_results(self, results):
+        self._model.add_results(results)
 
 
 class FindInFilesWidget(QWidget):
@@ -177,17 +292,43 @@ class FindInFilesWidget(QWidget):
 
         self._main_container = IDE.get_service("main_container")
         # Search worker
+        self._search_id = 0
         self._search_worker = FindInFilesWorker()
-        search_thread = QThread()
-        self._search_worker.moveToThread(search_thread)
-        self._search_worker.resultAvailable.connect(self._on_worker_finished)
-        search_thread.finished.connect(search_thread.deleteLater)
+        self._search_thread = QThread()
+        self._search_worker.moveToThread(self._search_thread)
+        self._search_worker.resultsAvailable.connect(
+            self._on_results_available)
+        self._search_worker.finished.connect(self._on_search_finished)
+        self._search_worker.replaceFinished.connect(
+            self._on_replace_finished)
+        # (to_find, cs, regex, wo) and (pattern, regex) of the last search
+        # and the files found: [(file_path, [(line_index, line)])]
+        self._last_request = None
+        self._last_search = None
+        self._searching = False
+        self._found = []
+        # The search stopped at MAX_RESULTS, _found isn't complete
+        self._truncated = False
+        # (dir_name, filters, recursive) of the last search
+        self._last_scope = None
+        self._replaced_in_editors = 0
+        self._files_replaced_in_editors = 0
+        self._search_thread.start()
+        # Keep the content indexes current
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged['const QString&'].connect(
+            content_index.mark_changed)
+        ninjaide = IDE.get_service("ide")
+        ninjaide.goingDown.connect(self._on_ide_going_down)
 
         self._actions.searchRequested.connect(self._on_search_requested)
+        self._actions.replaceRequested.connect(self._on_replace_requested)
         self._tree_results.activated.connect(self._go_to)
 
     def _clear_results(self):
         self.__count = 0
+        self._found = []
+        self._truncated = False
         self._tree_results.clear()
 
     def _go_to(self, index):
@@ -199,33 +340,172 @@ class FindInFilesWidget(QWidget):
             # Open the file and jump to line
             self._main_container.open_file(file_name, line=lineno)
 
-    @pyqtSlot('PyQt_PyObject')
-    def _on_worker_finished(self, lines):
-        self.__count += len(lines[-1])
+    def _on_ide_going_down(self):
+        self._search_worker.cancel()
+        self._search_thread.quit()
+        self._search_thread.wait()
+        text_search.shutdown_pool()
+        content_index.save_all()
+
+    def _update_watcher(self):
+        """Sync the watched folders with the ones of the indexes"""
+        folders = content_index.watched_folders()
+        watched = set(self._watcher.directories())
+        removed = watched - folders
+        added = folders - watched
+        if removed:
+            self._watcher.removePaths(list(removed))
+        if added:
+            self._watcher.addPaths(list(added))
+
+    @pyqtSlot(int, 'PyQt_PyObject')
+    def _on_results_available(self, search_id, results):
+        if search_id != self._search_id:
+            # Results of a search cancelled
+            return
+        self.__count += sum(len(lines) for _, lines in results)
+        self._found.extend(results)
         self._message_frame.show()
         self._message_label.setText(
             translations.TR_MATCHES_FOUND.format(self.__count))
-        self._tree_results.add_result(lines)
+        self._tree_results.add_results(results)
+
+    @pyqtSlot(int, bool)
+    def _on_search_finished(self, search_id, truncated):
+        self._update_watcher()
+        if search_id != self._search_id:
+            return
+        self._searching = False
+        self._truncated = truncated
+        self._message_frame.show()
+        message = translations.TR_MATCHES_FOUND
+        if truncated:
+            message = translations.TR_MATCHES_FOUND_LIMITED
+        self._message_label.setText(message.format(self.__count))
 
     @pyqtSlot('QString', bool, bool, bool)
     def _on_search_requested(self, to_find, cs, regex, wo):
         self._clear_results()
-        type_ = QRegExp.FixedString
-        if regex:
-            type_ = QRegExp.RegExp
-        if wo:
-            type_ = QRegExp.RegExp
-            to_find = "|".join(["\\b" + word.strip() + "\\b"
-                                for word in to_find.split()])
-        filters = re.split(",", "*.py")
-        pattern = QRegExp(to_find, cs, type_)
-        self._search_worker.find_in_files(
+        self._last_request = (to_find, cs, regex, wo)
+        try:
+            pattern = text_search.compile_pattern(to_find, cs, regex, wo)
+        except re.error:
+            self._search_worker.cancel()
+            self._search_id = 0
+            self._last_search = None
+            return
+        self._last_search = (pattern, regex)
+        self._searching = True
+        filters = "*.py".split(",")
+        self._last_scope = (self._actions.current_project_path, filters,
+                            True)
+        self._search_id = self._search_worker.request_search(
             self._actions.current_project_path,
             filters,
             pattern,
-            recursive=True
+            True
         )
 
+    def _preview(self, pattern, template, regex):
+        """Return the text of the lines found as they will be"""
+        lines = []
+        for file_path, found in self._found:
+            for line_index, line in found:
+                if len(lines) >= text_replace.PREVIEW_LINES:
+                    lines.append("...")
+                    return "\n".join(lines)
+                spans = text_replace.replacements(
+                    line, pattern, template, regex=regex)
+                lines.append("%s:%d: %s" % (
+                    os.path.basename(file_path), line_index + 1,
+                    text_replace.apply(line, spans).strip()))
+        return "\n".join(lines)
+
+    @pyqtSlot('QString')
+    def _on_replace_requested(self, template):
+        """Replace in the files found by the last search, the files
+        opened are changed in their editor (it can be undone)"""
+        if self._last_search is None or self._searching or \
+                not self._found:
+            return
+        pattern, regex = self._last_search
+        try:
+            preview = self._preview(pattern, template, regex)
+        except re.error:
+            # Bad group reference in the template
+            return
+        box = QMessageBox(
+            QMessageBox.Question, translations.TR_REPLACE_FILES_CONTENTS,
+            translations.TR_ARE_YOU_SURE_WANT_TO_REPLACE,
+            QMessageBox.Yes | QMessageBox.No, self)
+        informative = translations.TR_REPLACE_PREVIEW.format(
+            self.__count, len(self._found))
+        if self._truncated:
+            informative = translations.TR_REPLACE_PREVIEW_LIMITED.format(
+                self.__count, len(self._found))
+        box.setInformativeText(informative)
+        box.setDetailedText(preview)
+        if box.exec_() != QMessageBox.Yes:
+            return
+        ninjaide = IDE.get_service("ide")
+        opened = {}
+        for nfile in ninjaide.opened_files:
+            neditable = ninjaide.get_editable(nfile)
+            if neditable is not None and neditable.editor is not None:
+                opened[nfile.file_path] = neditable.editor
+        scope = None
+        if self._truncated:
+            # The files after the last result are listed again, the
+            # opened ones are changed here
+            dir_name, filters, recursive = self._last_scope
+            scope = (dir_name, filters, recursive, set(opened))
+            files = [file_path for file_path in opened
+                     if self._in_scope(file_path)]
+        else:
+            files = [file_path for file_path, _ in self._found]
+        self._replaced_in_editors = 0
+        self._files_replaced_in_editors = 0
+        for file_path in files:
+            editor = opened.get(file_path)
+            if editor is not None:
+                spans = text_replace.replacements(
+                    editor.text, pattern, template, regex=regex)
+                if spans:
+                    editor.apply_replacements(spans)
+                    self._replaced_in_editors += len(spans)
+                    self._files_replaced_in_editors += 1
+        self._search_worker.request_replace(
+            [file_path for file_path in files if file_path not in opened],
+            pattern, template, regex, scope)
+
+    def _in_scope(self, file_path):
+        """Return True if the last search looked into file_path"""
+        dir_name, filters, recursive = self._last_scope
+        folder, file_name = os.path.split(file_path)
+        if recursive:
+            inside = folder == dir_name or \
+                folder.startswith(os.path.join(dir_name, ''))
+        else:
+            inside = folder == dir_name
+        return inside and any(fnmatch.fnmatch(file_name, f) for f in filters)
+
+    @pyqtSlot('PyQt_PyObject', 'PyQt_PyObject')
+    def _on_replace_finished(self, replaced, failed):
+        count = self._replaced_in_editors + sum(
+            number for _, number in replaced)
+        message = translations.TR_OCCURRENCES_REPLACED_IN_FILES.format(
+            count, self._files_replaced_in_editors + len(replaced))
+        for file_path, reason in failed:
+            logger.error("Can't replace in %s: %s" % (file_path, reason))
+        if failed:
+            message += " " + translations.TR_FILES_NOT_REPLACED.format(
+                len(failed))
+        # Search again to show what is left
+        if self._last_request is not None:
+            self._on_search_requested(*self._last_request)
+        self._message_frame.show()
+        self._message_label.setText(message)
+
     def showEvent(self, event):
         self._actions._line_search.setFocus()
         super().showEvent(event)
@@ -246,8 +526,10 @@ class TreeItem(object):
         self.result = result_item
         self.parent_item = parent
         self.child_items = []
+        self.row_index = 0
 
     def append_child(self, item):
+        item.row_index = len(self.child_items)
         self.child_items.append(item)
 
     def child(self, row):
@@ -260,9 +542,7 @@ class TreeItem(object):
         return self.result
 
     def row(self):
-        if self.parent_item is not None:
-            return self.parent_item.child_items.index(self)
-        return 0
+        return self.row_index
 
     def parent(self):
         return self.parent_item
@@ -324,25 +604,24 @@ class SearchResultModel(QAbstractItemModel):
         super().__init__()
         self.root_item = TreeItem(None)
 
-    def add_result(self, result):
-        file_path = result[0]
-        items = result[1]
-        if items:
+    def add_results(self, results):
+        """Add a batch of (file_path, [(line_index, line)]) found"""
+        if not results:
+            return
+        first = self.root_item.child_count()
+        self.beginInsertRows(QModelIndex(), first, first + len(results) - 1)
+        for file_path, items in results:
             parent = ResultItem()
             parent.file_path = file_path
             parent_item = TreeItem(parent, self.root_item)
-            self.beginInsertRows(QModelIndex(), 0, 0)
             self.root_item.append_child(parent_item)
-            self.endInsertRows()
             for item in items:
                 io = ResultItem()
                 io.parent = parent
                 io.lineno = item[0]
                 io.text = item[1]
-                item_tree = TreeItem(io, parent_item)
-                self.beginInsertRows(QModelIndex(), 0, 0)
-                parent_item.append_child(item_tree)
-                self.endInsertRows()
+                parent_item.append_child(TreeItem(io, parent_item))
+        self.endInsertRows()
 
     def parent(self, index=QModelIndex()):
         if not index.isValid():
@@ -401,6 +680,7 @@ class SearchResultModel(QAbstractItemModel):
 class FindInFilesActions(QWidget):
 
     searchRequested = pyqtSignal('QString', bool, bool, bool)
+    replaceRequested = pyqtSignal('QString')
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -421,7 +701,14 @@ class FindInFilesActions(QWidget):
         self._line_search = QLineEdit()
         self._line_search.setPlaceholderText(translations.TR_SEARCH_FOR)
         main_layout.addWidget(self._line_search)
-        # TODO: replace
+        replace_layout = QHBoxLayout()
+        self._line_replace = QLineEdit()
+        self._line_replace.setPlaceholderText(
+            translations.TR_REPLACE_RESULTS_WITH)
+        replace_layout.addWidget(self._line_replace)
+        self._btn_replace = QPushButton(translations.TR_REPLACE_ALL)
+        replace_layout.addWidget(self._btn_replace)
+        main_layout.addLayout(replace_layout)
         self._check_cs = QCheckBox(translations.TR_SEARCH_CASE_SENSITIVE)
         self._check_cs.setChecked(True)
         widgets_layout.addWidget(self._check_cs, 2, 0)
@@ -436,6 +723,8 @@ class FindInFilesActions(QWidget):
 
         # Connections
         self._line_search.returnPressed.connect(self.search_requested)
+        self._btn_replace.clicked.connect(
+            lambda: self.replaceRequested.emit(self._line_replace.text()))
 
     def _update_combo_projects(self):
         projects = self.ninjaide.get_projects()
@@ -15,7 +15,9 @@
 # You should have received a copy of the GNU General Public License
 # along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
 
+import os
 import re
+import codecs
 
 from PyQt5.QtWidgets import QPlainTextEdit
 from PyQt5.QtWidgets import QTabWidget
@@ -36,6 +38,8 @@ from PyQt5.QtCore import QObject
 from PyQt5.QtCore import QProcess
 from PyQt5.QtCore import QProcessEnvironment
 from PyQt5.QtCore import QTime
+from PyQt5.QtCore import QTimer
+from PyQt5.QtCore import QDateTime
 from PyQt5.QtCore import QElapsedTimer
 
 from ninja_ide import translations
@@ -44,11 +48,16 @@ from ninja_ide.core import settings
 from ninja_ide.core.file_handling import file_manager
 from ninja_ide.gui.ide import IDE
 from ninja_ide.gui.tools_dock.tools_dock import _ToolsDock
+from ninja_ide.tools.logger import NinjaLogger
 
+logger = NinjaLogger(__name__)
 
 # FIXME: tool buttons (clear, stop, re-start, etc)
 # FIXME: maybe improve the user input
 
+# Time (ms) between two updates of the text of an OutputWidget
+OUTPUT_FLUSH_INTERVAL = 50
+
 
 class Program(QObject):
 
@@ -61,6 +70,12 @@ class Program(QObject):
         self.post_script = kwargs.get("post_script")
         self.__params = kwargs.get("params")
         self.__elapsed = QElapsedTimer()
+        # Decoders of stdout and stderr, they keep the bytes of a
+        # character split between two reads
+        self.__decoders = {}
+        # Text of each channel not written yet (a partial line of stderr)
+        self.__partial = {}
+        self.__log = None
 
         self.outputw = None
 
@@ -83,13 +98,36 @@ class Program(QObject):
         self.post_process = QProcess(self)
         self.post_process.started.connect(self._process_started)
         self.post_process.finished.connect(self._process_finished)
+        self.post_process.finished.connect(self.close_log)
         self.post_process.readyReadStandardOutput.connect(self._refresh_output)
         self.post_process.readyReadStandardError.connect(self._refresh_error)
 
     def start(self):
+        self._open_log()
         self.__pre_execution()
         self.outputw.setFocus()
 
+    def _open_log(self):
+        """Start a file with all the output if the user wants it"""
+        self.close_log()
+        if not settings.OUTPUT_LOG:
+            return
+        name = "{}-{}.log".format(
+            self.display_name(),
+            QDateTime.currentDateTime().toString("yyyyMMdd-hhmmss"))
+        path = os.path.join(resources.OUTPUT_LOGS, name)
+        try:
+            self.__log = open(path, "w", encoding="utf-8")
+        except OSError as reason:
+            logger.warning("Output log not created: %r" % reason)
+            return
+        self.outputw.append_text(translations.TR_OUTPUT_LOG_SAVED.format(path))
+
+    def close_log(self):
+        if self.__log is not None:
+            self.__log.close()
+            self.__log = None
+
     def __pre_execution(self):
         """Execute a script before executing the project"""
         self.__current_process = self.pre_process
@@ -150,6 +188,8 @@ class Program(QObject):
             self.post_process.setProgram(program)
             self.post_process.setArguments(args)
             self.post_process.start()
+        else:
+            self.close_log()
 
     @property
     def process_name(self):
@@ -178,19 +218,26 @@ class Program(QObject):
         return running
 
     def _process_started(self):
+        for channel in ("stdout", "stderr"):
+            self.__decoders[channel] = codecs.getincrementaldecoder(
+                "utf-8")(errors="replace")
+            self.__partial[channel] = ""
         time_str = QTime.currentTime().toString("hh:mm:ss")
         text = time_str + " Running: " + self.process_name
-        self.outputw.append_text(text)
+        self._write_status(text)
         self.outputw.setReadOnly(False)
 
     def _process_finished(self, code, status):
+        # Whatever is left, even without a line end
+        self._read_output(b"", final=True)
+        self._read_error(b"", final=True)
         frmt = OutputWidget.Format.NORMAL
         if status == QProcess.NormalExit == code:
             text = translations.TR_PROCESS_EXITED_NORMALLY % code
         else:
             text = translations.TR_PROCESS_INTERRUPTED
             frmt = OutputWidget.Format.ERROR
-        self.outputw.append_text(text, frmt)
+        self._write_status(text, frmt)
         if self.__current_process is self.main_process:
             tformat = QTime(0, 0, 0, 0).addMSecs(
                 self.__elapsed.elapsed() + 500)
@@ -198,22 +245,58 @@ class Program(QObject):
             if time.startswith("0:"):
                 # Don't display zero hours
                 time = time[2:]
-            self.outputw.append_text(translations.TR_ELAPSED_TIME.format(time))
+            self._write_status(translations.TR_ELAPSED_TIME.format(time))
         self.outputw.setReadOnly(True)
 
+    def _write_status(self, text, text_format=None):
+        self.outputw.append_text(text, text_format)
+        if self.__log is not None:
+            self.__log.write(text + "\n")
+
+    def _write(self, text, text_format):
+        self.outputw.append_output(text, text_format)
+        if self.__log is not None:
+            self.__log.write(text)
+
+    def _decode(self, channel, data, final):
+        """Return the text of data with the line ends as '\\n'"""
+        text = self.__partial[channel] + self.__decoders[channel].decode(
+            data, final)
+        self.__partial[channel] = ""
+        if text.endswith("\r") and not final:
+            # It could be the start of a '\r\n'
+            text = text[:-1]
+            self.__partial[channel] = "\r"
+        return text.replace("\r\n", "\n").replace("\r", "\n")
+
     def _refresh_output(self):
-        data = self.__current_process.readAllStandardOutput().data().decode()
-        for line in data.splitlines():
-            self.outputw.append_text(
-                line, text_format=OutputWidget.Format.NORMAL)
+        self._read_output(
+            self.__current_process.readAllStandardOutput().data())
+
+    def _read_output(self, data, final=False):
+        # The output is written as it comes, a prompt is not a full line
+        text = self._decode("stdout", data, final)
+        if text:
+            self._write(text, OutputWidget.Format.NORMAL)
 
     def _refresh_error(self):
-        data = self.__current_process.readAllStandardError().data().decode()
-        for line_text in data.splitlines():
+        self._read_error(self.__current_process.readAllStandardError().data())
+
+    def _read_error(self, data, final=False):
+        # The format of the errors depends on the whole line
+        text = self._decode("stderr", data, final)
+        lines = text.split("\n")
+        last = lines.pop()
+        if final:
+            if last:
+                lines.append(last)
+        else:
+            self.__partial["stderr"] = last + self.__partial["stderr"]
+        for line_text in lines:
             frmt = OutputWidget.Format.ERROR
             if self.outputw.patLink.match(line_text):
                 frmt = OutputWidget.Format.ERROR_UNDERLINE
-            self.outputw.append_text(line_text, frmt)
+            self._write(line_text + "\n", frmt)
 
     def display_name(self):
         name = "New document"
@@ -340,6 +423,7 @@ class RunWidget(QWidget):
         self._tabs.removeTab(tab_index)
         # Close process and delete OutputWidget
         program.main_process.close()
+        program.close_log()
         program.outputw.deleteLater()
         del program.outputw
 
@@ -457,7 +541,10 @@ class RunWidget(QWidget):
 
 class OutputWidget(QPlainTextEdit):
 
-    """Widget to handle the output of the running process"""
+    """Widget to handle the output of the running process
+
+    The output is queued and inserted each OUTPUT_FLUSH_INTERVAL ms, only
+    the last settings.OUTPUT_MAX_LINES lines are kept."""
 
     inputRequested = pyqtSignal("QString")
 
@@ -478,6 +565,14 @@ class OutputWidget(QPlainTextEdit):
         self.patLink = re.compile(r'(\s)*File "(.*?)", line \d.+')
         # For user input
         self.__input = []
+        # [format, [texts]] of the output not inserted yet
+        self.__pending = []
+        self.__pending_lines = 0
+        self.setMaximumBlockCount(max(settings.OUTPUT_MAX_LINES, 0))
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(OUTPUT_FLUSH_INTERVAL)
+        self._flush_timer.timeout.connect(self.flush_output)
 
         self.setFont(settings.FONT)
         # Formats
@@ -500,9 +595,6 @@ class OutputWidget(QPlainTextEdit):
             self.Format.ERROR_UNDERLINE: error_format2
         }
 
-        self.blockCountChanged[int].connect(
-            lambda: self.moveCursor(QTextCursor.End))
-
         # Style
         palette = self.palette()
         palette.setColor(
@@ -551,11 +643,71 @@ class OutputWidget(QPlainTextEdit):
         return (file_name, lineno)
 
     def append_text(self, text, text_format=None):
-        cursor = self.textCursor()
+        """Insert the line text now, after the output queued"""
+        self.flush_output()
         if text_format is None:
             text_format = self.Format.PLAIN
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.End)
+        if cursor.block().length() > 1:
+            # The output finished without a line end
+            cursor.insertBlock()
         cursor.insertText(text, self._text_formats[text_format])
         cursor.insertBlock()
+        self.moveCursor(QTextCursor.End)
+
+    def append_output(self, text, text_format):
+        """Queue text (it can have many lines or only a part of one)"""
+        if not text:
+            return
+        if self.__pending and self.__pending[-1][0] == text_format:
+            self.__pending[-1][1].append(text)
+        else:
+            self.__pending.append([text_format, [text]])
+        self.__pending_lines += text.count("\n")
+        max_lines = self.maximumBlockCount()
+        if max_lines and self.__pending_lines > 2 * max_lines:
+            self._trim_pending(max_lines)
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def _trim_pending(self, max_lines):
+        """Drop the oldest output queued, it wouldn't be kept anyway"""
+        kept = []
+        lines = 0
+        for text_format, texts in reversed(self.__pending):
+            text = "".join(texts)
+            count = text.count("\n")
+            if lines + count > max_lines:
+                # Only the last lines of this text
+                cut = len(text)
+                for _ in range(max_lines - lines + 1):
+                    cut = text.rfind("\n", 0, cut)
+                text = text[cut + 1:]
+                if text:
+                    kept.append([text_format, [text]])
+                lines = max_lines
+                break
+            kept.append([text_format, [text]])
+            lines += count
+        kept.reverse()
+        self.__pending = kept
+        self.__pending_lines = lines
+
+    def flush_output(self):
+        """Insert the output queued"""
+        self._flush_timer.stop()
+        pending, self.__pending = self.__pending, []
+        self.__pending_lines = 0
+        if not pending:
+            return
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        for text_format, texts in pending:
+            cursor.insertText("".join(texts), self._text_formats[text_format])
+        cursor.endEditBlock()
+        self.moveCursor(QTextCursor.End)
 
     def wheelEvent(self, event):
         if event.modifiers() == Qt.ControlModifier:
@@ -597,6 +749,7 @@ class OutputWidget(QPlainTextEdit):
     def gray_out_old_text(self):
         """Puts the old text in gray"""
 
+        self.flush_output()
         cursor = self.textCursor()
         end_format = cursor.charFormat()
         cursor.select(QTextCursor.Document)
@@ -15,6 +15,7 @@
 # You should have received a copy of the GNU General Public License
 # along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
 
+import sys
 import time
 import abc
 from collections import namedtuple
@@ -23,55 +24,103 @@ from collections import Callable
 from PyQt5.QtCore import QObject
 from PyQt5.QtCore import QThread
 from PyQt5.QtCore import pyqtSignal
+from PyQt5.QtCore import pyqtSlot
 
 from ninja_ide.gui.ide import IDE
 from ninja_ide.tools.logger import NinjaLogger
 
 logger = NinjaLogger(__name__)
 
-CodeInfo = namedtuple("CodeInfo", "pservice source line col path")
+CodeInfo = namedtuple(
+    "CodeInfo", "pservice source line col path document sys_path")
 
 
-class IntelliSenseWorker(QThread):
+class IntelliSenseWorker(QObject):
+    """Run the requests of the providers in its own thread.
 
-    workerFailed = pyqtSignal(str)
+    The requests go by channel ("services" for the code_info requests,
+    "details" for the completion details). Only the latest request of a
+    channel is processed, the ones queued before it are dropped and the
+    one running is told to stop by Provider.is_cancelled."""
 
-    def __init__(self, parent):
-        super().__init__(parent)
-        self.__result = None
+    resultAvailable = pyqtSignal(int, "PyQt_PyObject")
+    requested = pyqtSignal(int, "PyQt_PyObject")
 
-    def request(self, runnable, *args, **kwargs):
-        self.__runnable = runnable
-        self.__args = args
-        self.__kwargs = kwargs
-        self.start()
-
-    @property
-    def result(self):
-        return self.__result
-
-    def run(self):
+    def __init__(self):
+        super().__init__()
+        self._request_id = 0
+        self._latest = {}
+        self.requested.connect(self.process)
+
+    def request(self, provider, service, args=(), code_info=None,
+                channel="services"):
+        """Call provider.service(*args) and return the request id"""
+        self._request_id += 1
+        self._latest[channel] = self._request_id
+        self.requested.emit(self._request_id,
+                            (channel, provider, service, args, code_info))
+        return self._request_id
+
+    def cancel(self):
+        self._latest.clear()
+
+    @pyqtSlot(int, "PyQt_PyObject")
+    def process(self, request_id, request):
+        channel, provider, service, args, code_info = request
+
+        def is_cancelled():
+            return self._latest.get(channel) != request_id
+
+        if is_cancelled():
+            # Superseded while it was queued
+            return
+        start = time.time()
+        if code_info is not None:
+            provider._code_info = code_info
+        provider._cancel_check = is_cancelled
         try:
-            self.__result = self.__runnable(*self.__args, **self.__kwargs)
+            result = getattr(provider, service)(*args)
         except Exception as reason:
-            self.workerFailed.emit(str(reason))
+            logger.error("'{}' failed: {}".format(service, reason))
+            result = None
+        finally:
+            provider._cancel_check = None
+        logger.debug("'{}' took {:.1f} ms".format(
+            service, (time.time() - start) * 1000))
+        if not is_cancelled():
+            self.resultAvailable.emit(request_id, result)
 
 
 class IntelliSense(QObject):
 
-    resultAvailable = pyqtSignal("PyQt_PyObject")
+    resultAvailable = pyqtSignal(int, "PyQt_PyObject")
 
     services = ("completions", "calltips")
 
     def __init__(self):
         QObject.__init__(self)
         self.__providers = {}
-        self.__thread = None
+        self.__worker = IntelliSenseWorker()
+        self.__thread = QThread()
+        self.__worker.moveToThread(self.__thread)
+        self.__worker.resultAvailable.connect(self.resultAvailable)
+        self.__thread.start()
         # self._main_container = IDE.get_service("main_container")
 
         # Register service
         IDE.register_service("intellisense", self)
 
+    def install(self):
+        ninjaide = IDE.get_service("ide")
+        ninjaide.goingDown.connect(self._on_ide_going_down)
+
+    def _on_ide_going_down(self):
+        self.__worker.cancel()
+        self.__thread.quit()
+        self.__thread.wait()
+        for provider in self.__providers.values():
+            provider.shutdown()
+
     def providers(self):
         return self.__providers.keys()
 
@@ -83,6 +132,21 @@ class IntelliSense(QObject):
     def provider(self, language):
         return self.__providers.get(language)
 
+    def _sys_path(self, editor):
+        """Return the sys.path to use for the file of editor"""
+        sys_path = list(sys.path)
+        ninjaide = IDE.get_service("ide")
+        project = None
+        if ninjaide is not None:
+            project = ninjaide.get_project_for_file(editor.file_path)
+        if project is not None:
+            paths = [project.path]
+            paths.extend(path.strip() for path in
+                         project.python_path.splitlines() if path.strip())
+            sys_path = paths + [path for path in sys_path
+                                if path not in paths]
+        return sys_path
+
     def _code_info(self, editor, kind):
         line, col = editor.cursor_position
         return CodeInfo(
@@ -90,32 +154,42 @@ class IntelliSense(QObject):
             editor.text,
             line + 1,
             col,
-            editor.file_path
+            editor.file_path,
+            editor.file_path or "untitled-{}".format(id(editor.neditable)),
+            self._sys_path(editor)
         )
 
     def process(self, kind, neditor):
-        """Handle request from IntelliSense Assistant"""
-        if self.__thread is not None:
-            if self.__thread.isRunning():
-                logger.debug("Waiting...")
-                return
-        code_info = self._code_info(neditor, kind)
-        logger.debug("Running '{}'".format(code_info.pservice))
+        """Handle request from IntelliSense Assistant.
+
+        Returns the id of the request, it is sent with resultAvailable.
+        A new request supersedes the one running."""
         provider = self.__providers.get(neditor.neditable.language())
-        setattr(provider, "_code_info", code_info)
         provider_service = getattr(provider, kind, None)
-        if isinstance(provider_service, Callable):
-            self.__thread = IntelliSenseWorker(self)
-            self.__thread.finished.connect(self._on_worker_finished)
-            self.__thread.finished.connect(self.__thread.deleteLater)
-            self.__thread.request(provider_service)
-
-    def _on_worker_finished(self):
-        if self.__thread is None:
-            return
-        result = self.__thread.result
-        self.__thread = None
-        self.resultAvailable.emit(result)
+        if not isinstance(provider_service, Callable):
+            return None
+        code_info = self._code_info(neditor, kind)
+        logger.debug("Running '{}'".format(code_info.pservice))
+        return self.__worker.request(provider, kind, code_info=code_info)
+
+    def resolve_details(self, language, completion):
+        """Ask the detail of a completion, returns the id of the request.
+
+        The detail (or None) is sent with resultAvailable."""
+        provider = self.__providers.get(language)
+        if provider is None:
+            return None
+        return self.__worker.request(
+            provider, "details", (completion,), channel="details")
+
+    def request_stats(self, language):
+        """Ask the stats of the caches of a provider, returns the id of
+        the request. The stats (a dict or None) are sent with
+        resultAvailable."""
+        provider = self.__providers.get(language)
+        if provider is None:
+            return None
+        return self.__worker.request(provider, "stats", channel="stats")
 
     def provider_services(self, language):
         """Returns the services available for a provider"""
@@ -144,6 +218,16 @@ class Provider(abc.ABC):
         """This will load things before it is used."""
         pass
 
+    def shutdown(self):
+        """Release what the provider started, the IDE is closing."""
+        pass
+
+    def is_cancelled(self):
+        """True if the request being processed was superseded by a newer
+        one, a slow service should check it and stop."""
+        check = getattr(self, "_cancel_check", None)
+        return check is not None and check()
+
     @abc.abstractmethod
     def completions(self):
         """
@@ -158,9 +242,18 @@ class Provider(abc.ABC):
         The "text" key is the text that will be displayed in the list.
         The "type" key can be: function, class, instance.
         The "detail" key is a text that will be displayed next to the list
-        as a tool tip.
+        as a tool tip. It can be left out when it's slow to get, then it
+        is asked with Provider.details when the completion is selected.
         """
 
+    def details(self, completion):
+        """Return the detail of a completion returned without it"""
+        return completion.get("detail")
+
+    def stats(self):
+        """Return a dict with the stats of the caches of the provider"""
+        return None
+
     def calltips(self):
         pass
 
@@ -0,0 +1,488 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of NINJA-IDE (http://ninja-ide.org).
+#
+# NINJA-IDE is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# any later version.
+#
+# NINJA-IDE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
+"""Long lived process that answers the jedi requests of the editors.
+
+The server imports jedi and preloads the common modules once, it keeps
+the text of the documents (the client only sends the lines that changed
+since the last request) and, because it lives as long as the IDE, the
+parso caches of the modules and the diff parser of each document path.
+
+Messages sent to the server:
+    ('sys_path', paths)
+    ('cache_limits', memory_bytes, disk_bytes)
+    ('stats', request_id)
+    ('update', document, first, removed, lines)
+    ('close', document)
+    ('request', request_id, kind, document, path, line, col)
+    ('details', request_id, completions_id, index)
+    ('cancel', request_id)
+Responses: (request_id, status, value, elapsed) where status is 'ok',
+'error', 'cancelled' or 'superseded' and elapsed is the time (seconds)
+the server spent on the request. (None, 'ready', None, 0) is sent once
+the modules are preloaded, the client doesn't count the time waiting
+before it in the TIMEOUT of a request.
+
+The completions are only (name, type), the details (docstring) of one
+of the completions of the last request are asked with 'details'.
+
+A request waiting in the server is superseded by a newer one and the
+request running is interrupted when it is cancelled.
+
+The parsed modules kept in memory are limited by an estimate of their
+size (least recently used are evicted) and the pickles of the modules,
+written to a folder of their own, are collected when the server starts
+and when the limits change."""
+
+import os
+import sys
+import time
+import queue
+import signal
+import _thread
+import threading
+import multiprocessing
+from collections import OrderedDict
+
+from ninja_ide.tools.logger import NinjaLogger
+
+logger = NinjaLogger(__name__)
+
+# Modules parsed when the server starts
+PRELOAD_MODULES = ("PyQt4", "PyQt5", "numpy")
+# Max time (seconds) to wait for a response, once the server is ready,
+# before restarting it
+TIMEOUT = 30
+# Number of documents whose text is kept in the server
+MAX_DOCUMENTS = 32
+# Number of completion details (by full name) kept in the server
+DETAILS_CACHE_SIZE = 256
+# Default max bytes of the pickled modules in the cache folder
+DISK_CACHE_SIZE = 256 * 1024 * 1024
+# Time (seconds) between two checks of the cancellation of a request
+_POLL_INTERVAL = 0.05
+
+
+def _import_jedi():
+    """Return the jedi module and the parso cache module it uses"""
+    jedi_path = os.path.dirname(__file__)
+    sys.path.insert(0, jedi_path)
+    try:
+        from ninja_ide.intellisensei import jedi
+        from parso import cache as parso_cache
+    finally:
+        sys.path.remove(jedi_path)
+    return jedi, parso_cache
+
+
+def _top_definition(definition):
+    for _def in definition.goto_assignments():
+        if _def == definition:
+            continue
+        if _def.type == "import":
+            return _top_definition(_def)
+        return _def
+    return definition
+
+
+def _definitions(script):
+    definitions = []
+    for definition in script.goto_assignments():
+        if definition.type == "import":
+            definition = _top_definition(definition)
+        definitions.append({
+            "text": definition.name,
+            "filename": definition.module_path,
+            "line": definition.line,
+            "column": definition.column,
+        })
+    return definitions
+
+
+def _params(params):
+    params_list = []
+    for pos, param in enumerate(params):
+        name = param.full_name
+        if not name:
+            continue
+        if name == "self" and pos == 0:
+            continue
+        if not name.startswith("..."):
+            name = name.split(".")[-1]
+        params_list.append(name)
+    return params_list
+
+
+def _calltips(script):
+    results = {}
+    for signature in script.call_signatures():
+        name = signature.name
+        if not name:
+            continue
+        results["signature.name"] = name
+        results["signature.params"] = _params(signature.params)
+        results["signature.index"] = signature.index
+    return results
+
+
+_COMMANDS = {
+    "definitions": _definitions,
+    "calltips": _calltips,
+}
+
+
+class _Server(object):
+    """State of the server process"""
+
+    def __init__(self, conn, cache_directory):
+        self.conn = conn
+        self.cache_directory = cache_directory
+        self.messages = queue.Queue()
+        self.documents = {}
+        self.sys_path = list(sys.path)
+        # Id of the request running (only while in jedi) and cancelled
+        self.running = None
+        self.cancelled = None
+        self.jedi = None
+        self.parso_cache = None
+        # (request id, jedi completions) of the last completions request
+        self.completions = (None, [])
+        self.details = OrderedDict()
+
+    def read_messages(self):
+        """Receive the messages, in its own thread to see the cancels"""
+        while True:
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                message = None
+            if message is None:
+                self.messages.put(None)
+                return
+            if message[0] == 'cancel':
+                self.cancelled = message[1]
+                if self.running == self.cancelled:
+                    _thread.interrupt_main()
+                continue
+            self.messages.put(message)
+
+    def on_interrupt(self, signum, frame):
+        # Only the request cancelled is interrupted, a late interrupt
+        # is ignored
+        if self.running is not None and self.running == self.cancelled:
+            raise KeyboardInterrupt
+
+    def handle(self, message):
+        command = message[0]
+        if command == 'update':
+            _, document, first, removed, lines = message
+            text_lines = self.documents.setdefault(document, [])
+            text_lines[first:first + removed] = lines
+        elif command == 'close':
+            self.documents.pop(message[1], None)
+        elif command == 'sys_path':
+            self.sys_path = message[1]
+        elif command == 'cache_limits':
+            self.set_cache_limits(*message[1:])
+        elif command == 'stats':
+            stats = self.parso_cache.get_stats()
+            stats['documents'] = len(self.documents)
+            stats['details'] = len(self.details)
+            self.conn.send((message[1], 'ok', stats, 0))
+
+    def set_cache_limits(self, memory_bytes, disk_bytes):
+        """Evict the parsed modules and the pickles over the limits"""
+        self.parso_cache.set_memory_budget(memory_bytes)
+        try:
+            self.parso_cache.collect_disk_cache(
+                disk_bytes, self.cache_directory)
+        except OSError:
+            pass
+
+    def run_script(self, request_id, kind, document, path, line, col):
+        script = self.jedi.Script(
+            source='\n'.join(self.documents.get(document, [])),
+            line=line,
+            column=col,
+            path=path,
+            sys_path=self.sys_path
+        )
+        if kind != 'completions':
+            return _COMMANDS[kind](script)
+        completions = script.completions()
+        self.completions = (request_id, completions)
+        return [(completion.name, completion.type)
+                for completion in completions]
+
+    def completion_details(self, completions_id, index):
+        """Return the docstring of a completion of the last request"""
+        request_id, completions = self.completions
+        if request_id != completions_id or index >= len(completions):
+            return None
+        completion = completions[index]
+        name = completion.full_name
+        if name is not None and name in self.details:
+            self.details.move_to_end(name)
+            return self.details[name]
+        detail = completion.docstring()
+        if name is not None:
+            self.details[name] = detail
+            if len(self.details) > DETAILS_CACHE_SIZE:
+                self.details.popitem(last=False)
+        return detail
+
+    def run_request(self, request):
+        request_id = request[1]
+        start = time.time()
+        if request_id == self.cancelled:
+            # Cancelled while waiting, the preload for instance
+            self.conn.send((request_id, 'cancelled', None, 0))
+            return
+        try:
+            self.running = request_id
+            if request[0] == 'details':
+                result = self.completion_details(*request[2:])
+            else:
+                result = self.run_script(request_id, *request[2:])
+            self.running = None
+            response = (request_id, 'ok', result)
+        except KeyboardInterrupt:
+            response = (request_id, 'cancelled', None)
+        except Exception as reason:
+            response = (request_id, 'error', repr(reason))
+        self.running = None
+        self.conn.send(response + (time.time() - start,))
+
+    def serve(self):
+        while True:
+            message = self.messages.get()
+            if message is None:
+                return
+            # Apply everything received, only the latest request runs
+            request = None
+            while message is not None:
+                if message[0] in ('request', 'details'):
+                    if request is not None:
+                        self.conn.send((request[1], 'superseded', None, 0))
+                    request = message
+                else:
+                    self.handle(message)
+                try:
+                    message = self.messages.get_nowait()
+                except queue.Empty:
+                    break
+            if request is not None:
+                self.run_request(request)
+            if message is None:
+                return
+
+
+def _server_main(conn, cache_directory, cache_limits):
+    server = _Server(conn, cache_directory)
+    # The cancels are delivered as an interrupt of the main thread
+    signal.signal(signal.SIGINT, server.on_interrupt)
+    reader = threading.Thread(target=server.read_messages, daemon=True)
+    reader.start()
+    server.jedi, server.parso_cache = _import_jedi()
+    server.jedi.settings.case_insensitive_completion = False
+    # Our own pickles, so they can be collected
+    server.jedi.settings.cache_directory = cache_directory
+    server.set_cache_limits(*cache_limits)
+    for module in PRELOAD_MODULES:
+        try:
+            server.jedi.preload_module(module)
+        except Exception:
+            pass
+    try:
+        conn.send((None, 'ready', None, 0))
+        server.serve()
+    except (EOFError, OSError):
+        pass
+
+
+def _common_lines(old, new):
+    """Return the number of lines equal at the start and the end"""
+    size = min(len(old), len(new))
+    first = 0
+    while first < size and old[first] == new[first]:
+        first += 1
+    last = 0
+    while last < size - first and old[-1 - last] == new[-1 - last]:
+        last += 1
+    return first, last
+
+
+class JediServer(object):
+    """Client of the server process, used from the intellisense worker.
+
+    The process is started again if it dies or, once it preloaded the
+    modules, doesn't answer in TIMEOUT seconds."""
+
+    def __init__(self, cache_directory, memory_bytes=None,
+                 disk_bytes=DISK_CACHE_SIZE):
+        self._conn = None
+        self._process = None
+        # True when the server has preloaded the modules
+        self._ready = False
+        self._request_id = 0
+        self._sys_path = None
+        self._cache_directory = cache_directory
+        self._cache_limits = (memory_bytes, disk_bytes)
+        self._cache_limits_sent = None
+        # document -> lines that the server has
+        self._documents = OrderedDict()
+
+    def start(self):
+        """Start the server process, it preloads the modules meanwhile"""
+        if self._process is not None and self._process.is_alive():
+            return
+        self.shutdown()
+        self._conn, child_conn = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(
+            target=_server_main,
+            args=(child_conn, self._cache_directory, self._cache_limits),
+            daemon=True)
+        self._process.start()
+        child_conn.close()
+        self._ready = False
+        self._sys_path = None
+        self._cache_limits_sent = self._cache_limits
+        self._documents.clear()
+
+    def _sync_document(self, document, source):
+        lines = source.split('\n')
+        old = self._documents.pop(document, [])
+        first, last = _common_lines(old, lines)
+        if first != len(old) or first != len(lines):
+            self._conn.send(('update', document, first,
+                             len(old) - first - last,
+                             lines[first:len(lines) - last]))
+        self._documents[document] = lines
+        while len(self._documents) > MAX_DOCUMENTS:
+            closed, _ = self._documents.popitem(last=False)
+            self._conn.send(('close', closed))
+
+    def request(self, kind, code_info, is_cancelled=None):
+        """Run kind ('completions', 'definitions', 'calltips') for
+        code_info in the server and return the result.
+
+        is_cancelled is checked while waiting, the request is cancelled
+        when it returns True and None is returned. The completions don't
+        have their "detail", it's resolved with details()."""
+        self.start()
+        self._request_id += 1
+        request_id = self._request_id
+        try:
+            self._send_cache_limits()
+            if code_info.sys_path != self._sys_path:
+                self._sys_path = code_info.sys_path
+                self._conn.send(('sys_path', self._sys_path))
+            self._sync_document(code_info.document, code_info.source)
+        except OSError as reason:
+            logger.warning("Jedi server restarted: %r" % reason)
+            self.shutdown(kill=True)
+            return None
+        result = self._call(kind, ('request', request_id, kind,
+                                   code_info.document, code_info.path,
+                                   code_info.line, code_info.col),
+                            is_cancelled)
+        if kind == 'completions' and result is not None:
+            result = [{"text": name, "type": type_,
+                       "details_key": (request_id, index)}
+                      for index, (name, type_) in enumerate(result)]
+        return result
+
+    def set_cache_limits(self, memory_bytes, disk_bytes):
+        """Change the limits of the caches, they're sent with the next
+        request. memory_bytes can be None (no limit)."""
+        self._cache_limits = (memory_bytes, disk_bytes)
+
+    def _send_cache_limits(self):
+        limits = self._cache_limits
+        if limits != self._cache_limits_sent:
+            self._cache_limits_sent = limits
+            self._conn.send(('cache_limits',) + limits)
+
+    def stats(self):
+        """Return the stats of the caches of the server: hits, misses,
+        disk_loads, evictions, modules, bytes (estimated), documents and
+        details. None if the server isn't running."""
+        if self._process is None:
+            return None
+        self._request_id += 1
+        return self._call('stats', ('stats', self._request_id), None)
+
+    def details(self, details_key, is_cancelled=None):
+        """Return the docstring of a completion (by its "details_key").
+
+        Only the completions of the last request can be resolved."""
+        if self._process is None:
+            return None
+        self._request_id += 1
+        return self._call('details', ('details', self._request_id) +
+                          tuple(details_key), is_cancelled)
+
+    def _call(self, kind, message, is_cancelled):
+        request_id = message[1]
+        start = time.time()
+        # The time of the preload isn't counted
+        waiting_since = start if self._ready else None
+        try:
+            self._conn.send(message)
+            cancelled = False
+            while True:
+                if not self._conn.poll(_POLL_INTERVAL):
+                    if waiting_since is not None and \
+                            time.time() - waiting_since > TIMEOUT:
+                        raise TimeoutError(
+                            "%s timed out after %ss" % (kind, TIMEOUT))
+                    if not cancelled and is_cancelled is not None and \
+                            is_cancelled():
+                        cancelled = True
+                        self._conn.send(('cancel', request_id))
+                    continue
+                response_id, status, value, elapsed = self._conn.recv()
+                if status == 'ready':
+                    self._ready = True
+                    waiting_since = time.time()
+                elif response_id == request_id:
+                    break
+        except (TimeoutError, EOFError, OSError) as reason:
+            logger.warning("Jedi server restarted: %r" % reason)
+            self.shutdown(kill=True)
+            return None
+        logger.debug("%s %s in %.1f ms (server %.1f ms)" % (
+            kind, status, (time.time() - start) * 1000, elapsed * 1000))
+        if status == 'error':
+            logger.debug("Jedi error: '%s'" % value)
+        if status != 'ok':
+            return None
+        return value
+
+    def shutdown(self, kill=False):
+        if self._process is None:
+            return
+        try:
+            if kill:
+                self._process.terminate()
+            else:
+                self._conn.send(None)
+        except OSError:
+            pass
+        self._conn.close()
+        self._process.join(1)
+        self._process = None
+        self._conn = None
@@ -7,6 +7,7 @@ import shutil
 import platform
 import errno
 import logging
+from collections import OrderedDict
 
 try:
     import cPickle as pickle
@@ -66,6 +67,66 @@ On Linux, if environment variable ``$XDG_CACHE_HOME`` is set,
 
 parser_cache = {}
 
+# Rough size in memory of a module tree per char of its source
+_BYTES_PER_CHAR = 40
+
+_memory_budget = None
+"""
+Max bytes (estimated) of the modules kept in ``parser_cache``, the least
+recently used are evicted. ``None`` keeps every module.
+"""
+
+# (hashed_grammar, path) -> estimated bytes, least recently used first
+_lru = OrderedDict()
+_stats = {'hits': 0, 'misses': 0, 'disk_loads': 0, 'evictions': 0,
+          'bytes': 0}
+
+
+def set_memory_budget(max_bytes):
+    global _memory_budget
+    _memory_budget = max_bytes
+    _evict()
+
+
+def get_stats():
+    """
+    Returns a dict with the hits, misses, disk loads and evictions of the
+    parser cache, the number of modules and their estimated bytes.
+    """
+    stats = dict(_stats)
+    stats['modules'] = len(_lru)
+    return stats
+
+
+def note_hit(hashed_grammar, path):
+    key = (hashed_grammar, path)
+    if key in _lru:
+        _lru.move_to_end(key)
+    _stats['hits'] += 1
+
+
+def note_miss():
+    _stats['misses'] += 1
+
+
+def _track(hashed_grammar, path, lines):
+    key = (hashed_grammar, path)
+    size = sum(map(len, lines)) * _BYTES_PER_CHAR
+    _stats['bytes'] += size - _lru.pop(key, 0)
+    _lru[key] = size
+    _evict()
+
+
+def _evict():
+    if _memory_budget is None:
+        return
+    # The module just used is never evicted
+    while _stats['bytes'] > _memory_budget and len(_lru) > 1:
+        (hashed_grammar, path), size = _lru.popitem(last=False)
+        _stats['bytes'] -= size
+        _stats['evictions'] += 1
+        parser_cache.get(hashed_grammar, {}).pop(path, None)
+
 
 class _NodeCacheItem(object):
     def __init__(self, node, lines, change_time=None):
@@ -88,8 +149,11 @@ def load_module(hashed_grammar, path, cache_path=None):
     try:
         module_cache_item = parser_cache[hashed_grammar][path]
         if p_time <= module_cache_item.change_time:
+            note_hit(hashed_grammar, path)
             return module_cache_item.node
+        note_miss()
     except KeyError:
+        note_miss()
         return _load_from_file_system(hashed_grammar, path, p_time, cache_path=cache_path)
 
 
@@ -117,6 +181,8 @@ def _load_from_file_system(hashed_grammar, path, p_time, cache_path=None):
         return None
     else:
         parser_cache.setdefault(hashed_grammar, {})[path] = module_cache_item
+        _stats['disk_loads'] += 1
+        _track(hashed_grammar, path, module_cache_item.lines)
         LOG.debug('pickle loaded: %s', path)
         return module_cache_item.node
 
@@ -130,6 +196,7 @@ def save_module(hashed_grammar, path, module, lines, pickling=True, cache_path=N
 
     item = _NodeCacheItem(module, lines, p_time)
     parser_cache.setdefault(hashed_grammar, {})[path] = item
+    _track(hashed_grammar, path, lines)
     if pickling and path is not None:
         _save_to_file_system(hashed_grammar, path, item, cache_path=cache_path)
 
@@ -144,6 +211,50 @@ def clear_cache(cache_path=None):
         cache_path = _default_cache_path
     shutil.rmtree(cache_path)
     parser_cache.clear()
+    _lru.clear()
+    _stats['bytes'] = 0
+
+
+def collect_disk_cache(max_bytes, cache_path=None):
+    """
+    Removes the pickles of other parso/python versions and the oldest ones
+    until the cache uses at most ``max_bytes``. Returns the bytes removed.
+    """
+    if cache_path is None:
+        cache_path = _default_cache_path
+    removed = 0
+    files = []
+    try:
+        tags = os.listdir(cache_path)
+    except OSError:
+        return removed
+    for tag in tags:
+        directory = os.path.join(cache_path, tag)
+        if not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            file_path = os.path.join(directory, name)
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            if tag != _VERSION_TAG:
+                files.append((0, stat.st_size, file_path))
+            else:
+                files.append((stat.st_mtime, stat.st_size, file_path))
+    total = sum(size for _, size, _ in files)
+    # Stale versions go first, then the least recently written
+    files.sort()
+    for mtime, size, file_path in files:
+        if mtime and total <= max_bytes:
+            break
+        try:
+            os.remove(file_path)
+        except OSError:
+            continue
+        total -= size
+        removed += size
+    return removed
 
 
 def _get_hashed_path(hashed_grammar, path, cache_path=None):
@@ -7,7 +7,8 @@ from parso.utils import split_lines, python_bytes_to_unicode, parse_version_stri
 from parso.python.diff import DiffParser
 from parso.python.tokenize import tokenize_lines, tokenize
 from parso.python import token
-from parso.cache import parser_cache, load_module, save_module
+from parso.cache import parser_cache, load_module, save_module, \
+    note_hit, note_miss
 from parso.parser import BaseParser
 from parso.python.parser import Parser as PythonParser
 from parso.python.errors import ErrorFinderConfig
@@ -112,8 +113,9 @@ class Grammar(object):
             try:
                 module_cache_item = parser_cache[self._hashed][path]
             except KeyError:
-                pass
+                note_miss()
             else:
+                note_hit(self._hashed, path)
                 module_node = module_cache_item.node
                 old_lines = module_cache_item.lines
                 if old_lines == lines:
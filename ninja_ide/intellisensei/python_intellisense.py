@@ -16,108 +16,52 @@
 # along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
 
 import os
-import sys
 
+from ninja_ide import resources
+from ninja_ide.core import settings
 from ninja_ide.intellisensei import intellisense_registry
-from ninja_ide.tools.logger import NinjaLogger
+from ninja_ide.intellisensei import jedi_server
 
-jedi_path = os.path.join(os.path.dirname(__file__))
-sys.path.insert(0, jedi_path)
-try:
-    from ninja_ide.intellisensei import jedi
-except ImportError:
-    jedi = None
-finally:
-    sys.path.remove(jedi_path)
-
-logger = NinjaLogger(__name__)
+MEGABYTE = 1024 * 1024
 
 
 class PythonProvider(intellisense_registry.Provider):
+    """Jedi runs in a long lived server process, see jedi_server"""
 
     def load(self):
-        jedi.settings.case_insensitive_completion = False
-        for module in ("PyQt4", "PyQt5", "numpy"):
-            jedi.preload_module(module)
-
-    def __get_script(self):
-        info = self._code_info
-        try:
-            script = jedi.Script(
-                source=info.source,
-                line=info.line,
-                column=info.col,
-                path=info.path,
-                sys_path=sys.path
-            )
-        except Exception as reason:
-            logger.debug("Jedi error: '%s'" % reason)
-        return script
+        self._server = jedi_server.JediServer(
+            os.path.join(resources.NINJA_KNOWLEDGE_PATH, 'jedi_cache'),
+            *self.__cache_limits())
+        self._server.start()
+
+    def __cache_limits(self):
+        return (settings.COMPLETION_MEMORY_CACHE * MEGABYTE,
+                settings.COMPLETION_DISK_CACHE * MEGABYTE)
+
+    def shutdown(self):
+        self._server.shutdown()
+
+    def __request(self, kind):
+        # The limits could have changed in the preferences
+        self._server.set_cache_limits(*self.__cache_limits())
+        return self._server.request(kind, self._code_info,
+                                    self.is_cancelled)
 
     def completions(self):
-        script = self.__get_script()
-        completions = []
-        append = completions.append
-        for completion in script.completions():
-            append({
-                "text": completion.name,
-                "type": completion.type,
-                "detail": completion.docstring()
-            })
-
-        return completions
+        return self.__request("completions")
 
     def definitions(self):
-        script = self.__get_script()
-        func = getattr(script, "goto_assignments", None)
-        _definitions = []
-        if func is not None:
-            definitions = func()
-            for definition in definitions:
-                if definition.type == "import":
-                    definition = self._get_top_definitions(definition)
-                _definitions.append({
-                    "text": definition.name,
-                    "filename": definition.module_path,
-                    "line": definition.line,
-                    "column": definition.column,
-                })
-        return _definitions
-
-    def __get_top_definitions(self, definition):
-        for _def in definition.goto_assignments():
-            if _def == definition:
-                continue
-            if _def.type == "import":
-                return self.__get_top_definitions(_def)
-            return _def
-        return definition
+        return self.__request("definitions")
 
     def calltips(self):
-        script = self.__get_script()
-        signatures = script.call_signatures()
-        results = {}
-        for signature in signatures:
-            name = signature.name
-            if not name:
-                continue
-            results["signature.name"] = name
-            results["signature.params"] = self._get_params(signature.params)
-            results["signature.index"] = signature.index
-        return results
-
-    def _get_params(self, params):
-        params_list = []
-        for pos, param in enumerate(params):
-            name = param.full_name
-            if not name:
-                continue
-            if name == "self" and pos == 0:
-                continue
-            if not name.startswith("..."):
-                name = name.split(".")[-1]
-            params_list.append(name)
-        return params_list
+        return self.__request("calltips")
+
+    def stats(self):
+        return self._server.stats()
+
+    def details(self, completion):
+        return self._server.details(completion["details_key"],
+                                    self.is_cancelled)
 
 
 PythonProvider.register()
@@ -65,6 +65,8 @@ PLUGINS = os.path.join(HOME_NINJA_PATH, "extensions", "plugins")
 
 BACKUP_FILES = os.path.join(HOME_NINJA_PATH, "backups")
 
+OUTPUT_LOGS = os.path.join(HOME_NINJA_PATH, "output_logs")
+
 PLUGINS_DESCRIPTOR = os.path.join(EXTENSIONS_PATH,
                                   "plugins", "descriptor.json")
 
@@ -262,7 +264,7 @@ def create_home_dir_structure():
     """
     for directory in (HOME_NINJA_PATH, EXTENSIONS_PATH, PLUGINS, EDITOR_SKINS,
                       LANGS, NINJA_THEMES_DOWNLOAD, NINJA_KNOWLEDGE_PATH,
-                      BACKUP_FILES):
+                      BACKUP_FILES, OUTPUT_LOGS):
         if not os.path.isdir(directory):
             os.mkdir(directory)
 
@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of NINJA-IDE (http://ninja-ide.org).
+#
+# NINJA-IDE is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# any later version.
+#
+# NINJA-IDE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
+"""Trigram index of the content of the files of each project.
+
+For each lowercase trigram the index keeps the files that contain it, so
+a search only needs to read the files that contain all the trigrams of
+the literal part of the pattern. The indexes are saved in the knowledge
+folder. When they are refreshed the folders changed are walked again and
+the stamps of the files known are checked (a file saved in place doesn't
+change its folder).
+
+It also keeps the offset of each line of the last files used, to read a
+line of a file without scanning it."""
+
+import os
+import re
+import pickle
+import hashlib
+import threading
+import collections
+from array import array
+
+from ninja_ide import resources
+from ninja_ide.tools import text_search
+from ninja_ide.tools.logger import NinjaLogger
+
+logger = NinjaLogger('ninja_ide.tools.content_index')
+
+index_folder = os.path.join(resources.NINJA_KNOWLEDGE_PATH, 'content_index')
+
+# Bump it when the format of the index changes
+INDEX_VERSION = 1
+# Compact an index when there are more dead files than this (and than live)
+MAX_DEAD_FILES = 1000
+# Number of files with their line offsets kept in memory
+LINE_TABLES_CACHE_SIZE = 64
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+_line_tables = collections.OrderedDict()
+_line_tables_lock = threading.Lock()
+
+
+def get_index(project_path):
+    """Return the ContentIndex of project_path, loading it if needed"""
+    with _indexes_lock:
+        index = _indexes.get(project_path)
+        if index is None:
+            index = _indexes[project_path] = ContentIndex(project_path)
+            index.load()
+        return index
+
+
+def mark_changed(folder):
+    """Tell the indexes containing folder that its content changed"""
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        if index.contains(folder):
+            index.mark_dirty(folder)
+
+
+def watched_folders():
+    """Return the folders that have to be watched to keep indexes current"""
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    folders = set()
+    for index in indexes:
+        folders.update(index.folders())
+    return folders
+
+
+def save_all():
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        index.save()
+
+
+class ContentIndex(object):
+    """Trigram index of the text files of a project.
+
+    refresh and candidates must be used from a single thread, the other
+    methods can be used from any thread."""
+
+    def __init__(self, project_path):
+        self.project_path = project_path
+        self._lock = threading.Lock()
+        # file id -> path, None when the file was removed
+        self._paths = []
+        self._ids = {}
+        self._stamps = {}
+        # Files too big to be indexed, they are always candidates
+        self._unindexed = set()
+        # trigram -> array of file ids
+        self._postings = {}
+        self._dead = 0
+        self._folders = set()
+        self._dirty = set()
+        # The stored index must be checked with a full walk once
+        self._walked = False
+        self._changed = False
+
+    @property
+    def file_path(self):
+        name = hashlib.sha1(self.project_path.encode('utf-8')).hexdigest()
+        return os.path.join(index_folder, name + '.idx')
+
+    def load(self):
+        try:
+            with open(self.file_path, 'rb') as f:
+                data = pickle.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as reason:
+            logger.warning("Content index of %s not loaded: %r" %
+                           (self.project_path, reason))
+            return
+        if data.get('version') != INDEX_VERSION or \
+                data.get('project') != self.project_path:
+            return
+        self._paths = data['paths']
+        self._stamps = data['stamps']
+        self._unindexed = data['unindexed']
+        self._postings = data['postings']
+        self._ids = dict((path, file_id)
+                         for file_id, path in enumerate(self._paths)
+                         if path is not None)
+        self._dead = len(self._paths) - len(self._ids)
+
+    def save(self):
+        if not self._changed:
+            return
+        data = {
+            'version': INDEX_VERSION,
+            'project': self.project_path,
+            'paths': self._paths,
+            'stamps': self._stamps,
+            'unindexed': self._unindexed,
+            'postings': self._postings,
+        }
+        temp_path = self.file_path + '.tmp'
+        try:
+            os.makedirs(index_folder, exist_ok=True)
+            with open(temp_path, 'wb') as f:
+                pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.file_path)
+            self._changed = False
+        except OSError as reason:
+            logger.warning("Content index of %s not saved: %r" %
+                           (self.project_path, reason))
+
+    def contains(self, folder):
+        return folder == self.project_path or \
+            folder.startswith(os.path.join(self.project_path, ''))
+
+    def mark_dirty(self, folder):
+        with self._lock:
+            self._dirty.add(folder)
+
+    def folders(self):
+        with self._lock:
+            return set(self._folders)
+
+    def files(self):
+        """Return the paths of all the text files of the project"""
+        return list(self._stamps)
+
+    def refresh(self, index_files):
+        """Index the files that changed since the last refresh.
+
+        index_files receives a list of (file_path, stamp) and yields the
+        (file_path, stamp, trigrams) of each one, see
+        text_search.file_trigrams."""
+        with self._lock:
+            dirty = self._dirty
+            self._dirty = set()
+        visited = set()
+        found = {}
+        removed = set()
+        if not self._walked:
+            found.update(text_search.walk(
+                self.project_path, ['*'], visited=visited))
+            removed.update(path for path in self._stamps
+                           if path not in found)
+            folders = visited
+        else:
+            folders = self.folders()
+            gone = set()
+            for folder in sorted(dirty):
+                if not os.path.isdir(folder):
+                    gone.add(folder)
+                    continue
+                gone.update(known for known in folders
+                            if os.path.dirname(known) == folder and
+                            not os.path.isdir(known))
+                gitignore = None
+                if folder != self.project_path:
+                    gitignore = text_search.gitignore_for(
+                        self.project_path, os.path.dirname(folder))
+                files = dict(text_search.walk(
+                    folder, ['*'], visited=visited, skip=folders,
+                    gitignore=gitignore))
+                removed.update(path for path in self._stamps
+                               if os.path.dirname(path) == folder and
+                               path not in files)
+                found.update(files)
+            for folder in gone:
+                prefix = os.path.join(folder, '')
+                folders = set(known for known in folders
+                              if known != folder and
+                              not known.startswith(prefix))
+                removed.update(path for path in self._stamps
+                               if path.startswith(prefix))
+            folders = folders | visited
+            # A file saved in place doesn't change its folder, the stamps
+            # of the files known are checked
+            for path, stamp in list(self._stamps.items()):
+                if path in found or path in removed:
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    removed.add(path)
+                    continue
+                current = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+                if current != tuple(stamp):
+                    found[path] = current
+        with self._lock:
+            self._folders = folders
+        self._walked = True
+        for path in removed:
+            self._remove_file(path)
+        changed = [(path, stamp) for path, stamp in found.items()
+                   if self._stamps.get(path) != stamp]
+        if changed:
+            for path, stamp, trigrams in index_files(changed):
+                self._set_file(path, stamp, trigrams)
+        if changed or removed:
+            self._changed = True
+            if self._dead > MAX_DEAD_FILES and \
+                    self._dead > len(self._ids):
+                self._compact()
+
+    def _set_file(self, path, stamp, trigrams):
+        self._remove_file(path)
+        self._stamps[path] = stamp
+        if trigrams is None:
+            self._unindexed.add(path)
+            return
+        file_id = self._ids[path] = len(self._paths)
+        self._paths.append(path)
+        postings = self._postings
+        for i in range(0, len(trigrams), 3):
+            trigram = trigrams[i:i + 3]
+            ids = postings.get(trigram)
+            if ids is None:
+                ids = postings[trigram] = array('I')
+            ids.append(file_id)
+
+    def _remove_file(self, path):
+        self._stamps.pop(path, None)
+        self._unindexed.discard(path)
+        file_id = self._ids.pop(path, None)
+        if file_id is not None:
+            self._paths[file_id] = None
+            self._dead += 1
+
+    def _compact(self):
+        """Drop the removed files from the postings"""
+        new_ids = {}
+        paths = []
+        for file_id, path in enumerate(self._paths):
+            if path is not None:
+                new_ids[file_id] = len(paths)
+                paths.append(path)
+        postings = {}
+        for trigram, ids in self._postings.items():
+            ids = array('I', (new_ids[i] for i in ids if i in new_ids))
+            if ids:
+                postings[trigram] = ids
+        self._paths = paths
+        self._ids = dict((path, file_id)
+                         for file_id, path in enumerate(paths))
+        self._postings = postings
+        self._dead = 0
+
+    def candidates(self, literal):
+        """Return the files that could contain literal (bytes).
+
+        Returns None if the literal is too short to use the index."""
+        if literal is None or len(literal) < 3:
+            return None
+        literal = literal.lower()
+        trigrams = set(literal[i:i + 3] for i in range(len(literal) - 2))
+        postings = sorted((self._postings.get(trigram, ())
+                           for trigram in trigrams), key=len)
+        ids = set(postings[0])
+        for other in postings[1:]:
+            if not ids:
+                break
+            ids.intersection_update(other)
+        paths = [self._paths[file_id] for file_id in ids
+                 if self._paths[file_id] is not None]
+        paths.extend(self._unindexed)
+        return paths
+
+
+def _line_table(file_path):
+    """Return the line offsets of file_path and the content if it was read"""
+    stat = os.stat(file_path)
+    stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    with _line_tables_lock:
+        table = _line_tables.get(file_path)
+        if table is not None and table[0] == stamp:
+            _line_tables.move_to_end(file_path)
+            return table[1], None
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    offsets = array('Q', [0])
+    offsets.extend(match.end() for match in re.finditer(b'\n', data))
+    with _line_tables_lock:
+        _line_tables[file_path] = (stamp, offsets)
+        while len(_line_tables) > LINE_TABLES_CACHE_SIZE:
+            _line_tables.popitem(last=False)
+    return offsets, data
+
+
+def get_line(file_path, line_index):
+    """Return the line line_index (starting at 0) of file_path.
+
+    Returns None if the file can't be read or doesn't have that line."""
+    try:
+        offsets, data = _line_table(file_path)
+        if line_index < 0 or line_index >= len(offsets):
+            return None
+        start = offsets[line_index]
+        if data is not None:
+            end = data.find(b'\n', start)
+            line = data[start:] if end == -1 else data[start:end]
+        else:
+            with open(file_path, 'rb') as f:
+                f.seek(start)
+                line = f.readline()
+    except OSError:
+        return None
+    return line.decode('utf-8', 'replace').rstrip('\r\n')
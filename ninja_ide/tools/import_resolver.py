@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of NINJA-IDE (http://ninja-ide.org).
+#
+# NINJA-IDE is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# any later version.
+#
+# NINJA-IDE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
+"""Find if the imports of a file can be resolved, without importing them.
+
+The modules are looked up like the import system does (find_spec) in the
+sys.path of the interpreter selected, which is taken from the
+interpreter inventory. The listing of each folder is cached until its mtime
+changes and the modules found are cached until a folder of the sys.path
+(a package was installed or removed) or of the packages looked into
+changes."""
+
+import os
+import ast
+import sys
+import zipfile
+import threading
+
+from ninja_ide.core import interpreter_service
+from ninja_ide.tools.logger import NinjaLogger
+
+logger = NinjaLogger('ninja_ide.tools.import_resolver')
+
+# Extensions of the files that can be imported as a module
+_MODULE_SUFFIXES = ('.py', '.pyc', '.pyw', '.so', '.pyd')
+
+_resolvers = {}
+_resolvers_lock = threading.Lock()
+
+
+def get_resolver(interpreter=None):
+    """Return the ImportResolver of interpreter (the IDE one by default)"""
+    if interpreter is None:
+        interpreter = sys.executable
+    with _resolvers_lock:
+        resolver = _resolvers.get(interpreter)
+        if resolver is None:
+            resolver = _resolvers[interpreter] = ImportResolver(interpreter)
+        return resolver
+
+
+def _interpreter_info(interpreter):
+    """Return (sys.path, builtin module names) of interpreter"""
+    if interpreter == sys.executable:
+        return list(sys.path), set(sys.builtin_module_names)
+    info = interpreter_service.get_info(interpreter)
+    if info is None:
+        logger.warning("Can't know the sys.path of %s" % interpreter)
+        return list(sys.path), set(sys.builtin_module_names)
+    return info["sysPath"], set(info["builtinModules"])
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class _Folder(object):
+    """Names in a folder (or zip file) that can be imported"""
+
+    def __init__(self, path):
+        self.mtime = _mtime(path)
+        # name -> path of the module, folder for the packages
+        self.modules = {}
+        if os.path.isdir(path):
+            self._list_folder(path)
+        elif zipfile.is_zipfile(path):
+            self._list_zip(path)
+
+    def _list_folder(self, path):
+        try:
+            entries = list(os.scandir(path))
+        except OSError:
+            return
+        for entry in entries:
+            name = entry.name
+            try:
+                if entry.is_dir():
+                    if name.isidentifier():
+                        # Package or namespace package
+                        self.modules.setdefault(name, entry.path)
+                    continue
+            except OSError:
+                continue
+            base, ext = os.path.splitext(name)
+            if ext in _MODULE_SUFFIXES:
+                # 'mod.cpython-36m-x86_64-linux-gnu.so' -> 'mod'
+                base = base.split('.')[0]
+                if base.isidentifier():
+                    self.modules[base] = entry.path
+
+    def _list_zip(self, path):
+        try:
+            with zipfile.ZipFile(path) as zip_file:
+                names = zip_file.namelist()
+        except (OSError, zipfile.BadZipFile):
+            return
+        for name in names:
+            first = name.split('/')[0]
+            base = os.path.splitext(first)[0]
+            if base.isidentifier():
+                # Inside a zip there is no file to read
+                self.modules.setdefault(base, None)
+
+
+class ImportResolver(object):
+    """Resolve modules in the sys.path of an interpreter, it can be used
+    from any thread."""
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.sys_path, self.builtins = _interpreter_info(interpreter)
+        self.sys_path = [os.path.abspath(path) if path else os.getcwd()
+                         for path in self.sys_path]
+        self._lock = threading.Lock()
+        self._folders = {}
+        # (folder of the file, its mtime, module) ->
+        # ([paths of the module], ((package folder looked into, mtime),))
+        self._modules = {}
+        # module path -> (mtime, names defined or None if unknown)
+        self._names = {}
+        self._generation = self._sys_path_mtimes()
+
+    def _sys_path_mtimes(self):
+        return tuple(_mtime(path) for path in self.sys_path)
+
+    def generation(self, file_folder=None):
+        """Return a value that changes when a folder of sys.path (or
+        file_folder) changes"""
+        mtimes = self._sys_path_mtimes()
+        with self._lock:
+            if mtimes != self._generation:
+                # Something was installed or removed
+                self._generation = mtimes
+                self._modules.clear()
+        return hash((mtimes, file_folder and _mtime(file_folder)))
+
+    def _folder(self, path):
+        with self._lock:
+            folder = self._folders.get(path)
+        if folder is None or folder.mtime != _mtime(path):
+            folder = _Folder(path)
+            with self._lock:
+                self._folders[path] = folder
+        return folder
+
+    def _find_in(self, folders, name):
+        """Return the paths where the module name is in folders"""
+        found = []
+        for path in folders:
+            folder = self._folder(path)
+            if name in folder.modules:
+                found.append(folder.modules[name])
+        return found
+
+    def find_module(self, module, file_folder=None):
+        """Return the paths where module ('a.b.c') is found.
+
+        A package can be in more than one path (namespace packages), a
+        module inside a zip file has None as path. Returns an empty list
+        if the module can't be found."""
+        key = (file_folder, file_folder and _mtime(file_folder), module)
+        with self._lock:
+            cached = self._modules.get(key)
+        if cached is not None and all(_mtime(path) == mtime
+                                      for path, mtime in cached[1]):
+            return cached[0]
+        parts = module.split('.')
+        packages = []
+        if parts[0] in self.builtins:
+            found = [None]
+        else:
+            folders = self.sys_path
+            if file_folder is not None:
+                # The script folder goes first in sys.path
+                folders = [file_folder] + folders
+            found = self._find_in(folders, parts[0])
+            for part in parts[1:]:
+                current = [path for path in found
+                           if path is not None and os.path.isdir(path)]
+                if len(current) < len(found):
+                    # A module or a zip, can't look inside
+                    found = [None]
+                    break
+                packages.extend(current)
+                found = self._find_in(current, part)
+                if not found:
+                    break
+        # A sub module added or removed changes the folder of its package
+        checked = tuple((path, _mtime(path)) for path in packages)
+        with self._lock:
+            self._modules[key] = (found, checked)
+        return found
+
+    def _module_source(self, path):
+        if os.path.isdir(path):
+            path = os.path.join(path, '__init__.py')
+        if path.endswith('.py') and os.path.isfile(path):
+            return path
+        return None
+
+    def defined_names(self, path):
+        """Return the names defined at the top of the module in path.
+
+        Returns None if they can't be known (not a source file, star
+        imports or a module __getattr__)."""
+        source_path = self._module_source(path)
+        if source_path is None:
+            return None
+        mtime = _mtime(source_path)
+        with self._lock:
+            cached = self._names.get(source_path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        try:
+            with open(source_path, 'rb') as f:
+                tree = ast.parse(f.read(), source_path)
+            names = _top_level_names(tree)
+        except (OSError, SyntaxError, ValueError):
+            names = None
+        with self._lock:
+            self._names[source_path] = (mtime, names)
+        return names
+
+    def has_name(self, module_paths, name):
+        """Return True if name could be imported from the module found"""
+        for path in module_paths:
+            if path is None:
+                return True
+            if os.path.isdir(path):
+                # A sub module of the package
+                if self._find_in([path], name):
+                    return True
+            names = self.defined_names(path)
+            if names is None or name in names:
+                return True
+        return False
+
+    def missing_imports(self, tree, file_path):
+        """Return the imports of tree that can't be resolved.
+
+        The result has the format of notimportchecker:
+        {module: {'mod_name': name, 'lineno': lineno}}"""
+        file_folder = os.path.dirname(file_path) or None
+        self.generation()
+        missing = {}
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    if not self.find_module(alias.name, file_folder):
+                        missing.setdefault(alias.name, {
+                            'mod_name': alias.name,
+                            'lineno': node.lineno})
+            elif isinstance(node, ast.ImportFrom):
+                if node.level:
+                    found = self._relative_module(node, file_folder)
+                    module = '.' * node.level + (node.module or '')
+                else:
+                    found = self.find_module(node.module, file_folder)
+                    module = node.module
+                if found is None:
+                    continue
+                if not found:
+                    missing.setdefault(module, {
+                        'mod_name': module, 'lineno': node.lineno})
+                    continue
+                for alias in node.names:
+                    if alias.name != '*' and \
+                            not self.has_name(found, alias.name):
+                        missing.setdefault(module, {
+                            'mod_name': alias.name,
+                            'lineno': node.lineno})
+        return missing
+
+    def dependencies(self, tree, file_path):
+        """Return the sorted (path, mtime) of the modules and packages that
+        the imports of tree resolve to.
+
+        With generation() they decide the result of missing_imports, a
+        module edited in place (a name added) changes its mtime but not
+        the one of its folder."""
+        file_folder = os.path.dirname(file_path) or None
+        stamps = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and not node.level:
+                modules = [node.module]
+            elif isinstance(node, ast.ImportFrom):
+                modules = []
+                found = self._relative_module(node, file_folder) or []
+                stamps.update((path, _mtime(path)) for path in found
+                              if path is not None)
+            else:
+                continue
+            for module in modules:
+                parts = module.split('.')
+                # The packages on the way too, a sub module can be added
+                for end in range(1, len(parts) + 1):
+                    found = self.find_module('.'.join(parts[:end]),
+                                             file_folder)
+                    stamps.update((path, _mtime(path)) for path in found
+                                  if path is not None)
+        for path, _ in list(stamps):
+            source_path = self._module_source(path)
+            if source_path is not None and source_path != path:
+                stamps.add((source_path, _mtime(source_path)))
+        return sorted(stamps, key=lambda stamp: (stamp[0], stamp[1] or 0))
+
+    def _relative_module(self, node, file_folder):
+        """Return the paths of the module of a relative import or None"""
+        if file_folder is None:
+            return None
+        base = file_folder
+        for _ in range(node.level - 1):
+            base = os.path.dirname(base)
+        if not node.module:
+            return [base]
+        found = [base]
+        for part in node.module.split('.'):
+            found = self._find_in(
+                [path for path in found if os.path.isdir(path)], part)
+            if not found:
+                break
+        return found
+
+
+def _top_level_names(tree):
+    """Return the names bound at module level in tree, None if unknown"""
+    names = set()
+    nodes = list(tree.body)
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef,
+                             ast.ClassDef)):
+            names.add(node.name)
+            continue
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                if alias.name == '*':
+                    return None
+                names.add((alias.asname or alias.name).split('.')[0])
+            continue
+        if isinstance(node, (ast.Lambda, ast.ListComp, ast.SetComp,
+                             ast.DictComp, ast.GeneratorExp)):
+            continue
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            names.add(node.id)
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            names.add(node.name)
+        nodes.extend(ast.iter_child_nodes(node))
+    if '__getattr__' in names:
+        return None
+    return names
@@ -175,6 +175,14 @@ def obtain_symbols(source, with_docstrings=False, filename='',
             return {}, {}
         else:
             return {}
+    return symbols_from_body(module.body, with_docstrings, simple,
+                             only_simple)
+
+
+def symbols_from_body(body, with_docstrings=False, simple=False,
+                      only_simple=False):
+    """Obtain the symbols of some statements of a module, in the format
+    of obtain_symbols."""
     symbols = {}
     symbols_simplified = {}
     globalAttributes = {}
@@ -182,7 +190,7 @@ def obtain_symbols(source, with_docstrings=False, filename='',
     classes = {}
     docstrings = {}
 
-    for symbol in module.body:
+    for symbol in body:
         if isinstance(symbol, ast.Assign) and not only_simple:
             result = _parse_assign(symbol)
             globalAttributes.update(result[0])
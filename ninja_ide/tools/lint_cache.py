@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of NINJA-IDE (http://ninja-ide.org).
+#
+# NINJA-IDE is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# any later version.
+#
+# NINJA-IDE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
+"""Lint Knowledge: the checks found for each content already checked.
+
+The results are stored by (content hash, checker, checker config), a
+checker gives the same results for the same content so they are reused
+between sessions. The least recently used results are removed when the
+cache is bigger than MAX_CACHE_SIZE."""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import defaultdict
+
+from ninja_ide import resources
+from ninja_ide.tools.logger import NinjaLogger
+
+logger = NinjaLogger('ninja_ide.tools.lint_cache')
+
+db_path = os.path.join(resources.NINJA_KNOWLEDGE_PATH, 'lint_cache.db')
+
+# Bump it when the format of the stored results changes
+DB_VERSION = 1
+# Max bytes of results stored
+MAX_CACHE_SIZE = 16 * 1024 * 1024
+# Number of results stored between each check of the size of the cache
+_EVICTION_INTERVAL = 50
+
+_initialized = False
+_init_lock = threading.Lock()
+_stores = 0
+
+
+def _connect():
+    global _initialized
+    conn = sqlite3.connect(db_path, timeout=5)
+    with _init_lock:
+        if not _initialized:
+            cur = conn.cursor()
+            cur.execute("PRAGMA journal_mode=WAL")
+            cur.execute("PRAGMA user_version")
+            if cur.fetchone()[0] != DB_VERSION:
+                cur.execute("drop table if exists checks")
+                cur.execute("PRAGMA user_version = %d" % DB_VERSION)
+            cur.execute("create table if not exists "
+                        "checks(key text PRIMARY KEY, checker text, "
+                        "value text, size integer, last_used real)")
+            cur.execute("create index if not exists "
+                        "checks_last_used on checks(last_used)")
+            conn.commit()
+            _initialized = True
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def make_key(checker, config, source):
+    """Return the key of the results of checker for source"""
+    digest = hashlib.sha1()
+    digest.update(checker.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(config.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(source.encode('utf-8', 'surrogatepass'))
+    return digest.hexdigest()
+
+
+def _encode(checks):
+    return json.dumps([[lineno, items] for lineno, items in checks.items()])
+
+
+def _decode(value):
+    checks = defaultdict(list)
+    for lineno, items in json.loads(value):
+        checks[lineno] = [(tuple(range_), message, text)
+                          for range_, message, text in items]
+    return checks
+
+
+def get(key):
+    """Return the checks stored with key or None"""
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                row = conn.execute("SELECT value FROM checks WHERE key=?",
+                                   (key,)).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE checks SET last_used=? WHERE key=?",
+                             (time.time(), key))
+        finally:
+            conn.close()
+        return _decode(row[0])
+    except (sqlite3.Error, ValueError) as reason:
+        logger.warning("Lint cache not read: %r" % reason)
+        return None
+
+
+def put(key, checker, checks):
+    """Store the checks found by checker with key"""
+    global _stores
+    value = _encode(checks)
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO checks "
+                             "values (?, ?, ?, ?, ?)",
+                             (key, checker, value, len(value), time.time()))
+            _stores += 1
+            if _stores % _EVICTION_INTERVAL == 1:
+                _evict(conn)
+        finally:
+            conn.close()
+    except sqlite3.Error as reason:
+        logger.warning("Lint cache not written: %r" % reason)
+
+
+def _evict(conn):
+    """Remove the least recently used results over MAX_CACHE_SIZE"""
+    total = conn.execute("SELECT total(size) FROM checks").fetchone()[0]
+    if total <= MAX_CACHE_SIZE:
+        return
+    excess = total - MAX_CACHE_SIZE * 0.8
+    removed = []
+    for key, size in conn.execute(
+            "SELECT key, size FROM checks ORDER BY last_used"):
+        removed.append((key,))
+        excess -= size
+        if excess <= 0:
+            break
+    with conn:
+        conn.executemany("DELETE FROM checks WHERE key=?", removed)
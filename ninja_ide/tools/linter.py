@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of NINJA-IDE (http://ninja-ide.org).
+#
+# NINJA-IDE is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# any later version.
+#
+# NINJA-IDE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
+"""Pool of long lived processes to run pyflakes and pycodestyle.
+
+Each worker imports the linters when it starts and then answers the
+requests received through its pipe: a request is (command, args) and the
+response is (ok, value). A worker that takes more than the timeout of a
+request or that dies is discarded, a new one is started when needed."""
+
+import _ast
+import queue
+import threading
+import multiprocessing
+
+from ninja_ide.dependencies import pycodestyle
+from ninja_ide.dependencies.pyflakes_mod import checker
+
+
+# Number of processes used to lint
+WORKERS = 2
+# Max time (seconds) to wait for the response of a request
+TIMEOUT = 20
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class LintError(Exception):
+    """The request failed: the linter raised, timed out or its worker died"""
+
+
+def run_pyflakes(source, path):
+    """Return the [(lineno, col, text)] of the messages of pyflakes.
+
+    The source must not have syntax errors."""
+    tree = compile(source, path, "exec", _ast.PyCF_ONLY_AST)
+    lint_checker = checker.Checker(tree, path)
+    lint_checker.messages.sort(key=lambda msg: msg.lineno)
+    return [(message.lineno, message.col,
+             message.message % message.message_args)
+            for message in lint_checker.messages]
+
+
+class CustomReport(pycodestyle.StandardReport):
+
+    def get_file_results(self):
+        data = []
+        for line_number, offset, code, text, doc in self._deferred_print:
+            col = offset + 1
+            data.append((line_number, col, code, text))
+        return data
+
+
+class CustomChecker(pycodestyle.Checker):
+
+    def __init__(self, *args, **kw):
+        super().__init__(*args, report=CustomReport(kw.pop("options")), **kw)
+
+
+def run_pycodestyle(source, path):
+    """Return the [(lineno, col, code, text)] of the pycodestyle errors"""
+    pep8_style = pycodestyle.StyleGuide(
+        parse_argv=False,
+        config_file='',
+        checker_class=CustomChecker
+    )
+    return pep8_style.input_file(path, lines=source.splitlines(True))
+
+
+_COMMANDS = {
+    'pyflakes': run_pyflakes,
+    'pycodestyle': run_pycodestyle,
+}
+
+
+def _worker_main(conn):
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            break
+        if request is None:
+            break
+        command, args = request
+        try:
+            response = (True, _COMMANDS[command](*args))
+        except Exception as reason:
+            response = (False, repr(reason))
+        conn.send(response)
+
+
+class _Worker(object):
+
+    def __init__(self):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def call(self, command, args, timeout):
+        self.conn.send((command, args))
+        if not self.conn.poll(timeout):
+            raise LintError("%s timed out after %ss" % (command, timeout))
+        return self.conn.recv()
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.conn.close()
+
+    def kill(self):
+        self.process.terminate()
+        self.process.join(1)
+        self.conn.close()
+
+
+class LintPool(object):
+    """Processes that run the lint requests, it can be used from any thread.
+
+    Each request blocks the calling thread until its response arrives."""
+
+    def __init__(self, workers=WORKERS):
+        self._size = workers
+        self._workers = []
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        while True:
+            # Start a worker if all are busy and there are less than
+            # expected (not started yet or some died)
+            with self._lock:
+                if self._idle.empty() and len(self._workers) < self._size:
+                    worker = _Worker()
+                    self._workers.append(worker)
+                    return worker
+            try:
+                worker = self._idle.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if worker.process.is_alive():
+                return worker
+            # It died while idle
+            self._discard(worker)
+
+    def _discard(self, worker):
+        worker.kill()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+
+    def request(self, command, *args, **kwargs):
+        """Run command(*args) in a worker and return its result"""
+        timeout = kwargs.get('timeout', TIMEOUT)
+        worker = self._acquire()
+        try:
+            ok, value = worker.call(command, args, timeout)
+        except (LintError, EOFError, OSError) as reason:
+            # Killed, the next request starts a new worker
+            self._discard(worker)
+            raise LintError("%s failed: %r" % (command, reason))
+        self._idle.put(worker)
+        if not ok:
+            raise LintError(value)
+        return value
+
+    def shutdown(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close()
+
+
+def get_pool():
+    """Return the lint pool, the workers are started lazily"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = LintPool()
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def request(command, *args, **kwargs):
+    return get_pool().request(command, *args, **kwargs)
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of NINJA-IDE (http://ninja-ide.org).
+#
+# NINJA-IDE is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# any later version.
+#
+# NINJA-IDE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
+"""Helpers used by the locator to index the symbols of the projects.
+
+The parsing of the files is done in a pool of processes."""
+
+import os
+import concurrent.futures
+
+from ninja_ide.extensions import handlers
+
+
+# Number of processes used to parse the files of the projects
+WORKERS = max(1, (os.cpu_count() or 2) - 1)
+# Number of files sent to a worker in each request
+CHUNK_SIZE = 32
+
+_pool = None
+
+
+def file_stamp(file_path):
+    """Return the (mtime, size, inode) stamp of the file.
+
+    A file only needs to be parsed again when its stamp changed."""
+    stat = os.stat(file_path)
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def _init_worker():
+    # Spawned workers don't run the settings loading, each one loads the
+    # handlers with its first request (the pool initializer needs 3.7)
+    if not handlers.SYMBOLS_HANDLER:
+        handlers.init_basic_handlers()
+
+
+def obtain_files_symbols(files):
+    """Parse each (file_path, language) in files.
+
+    Returns a list of (file_path, symbols, error), symbols is None when
+    this process doesn't have a symbols handler for that language."""
+    _init_worker()
+    results = []
+    for file_path, lang in files:
+        symbols_handler = handlers.get_symbols_handler(lang)
+        if symbols_handler is None:
+            results.append((file_path, None, None))
+            continue
+        try:
+            with open(file_path) as f:
+                content = f.read()
+            symbols = symbols_handler.obtain_symbols(
+                content, filename=file_path)
+            results.append((file_path, symbols, None))
+        except Exception as reason:
+            results.append((file_path, {}, repr(reason)))
+    return results
+
+
+def get_pool():
+    """Return the pool of processes used to parse files, create it lazily"""
+    global _pool
+    if _pool is None:
+        _pool = concurrent.futures.ProcessPoolExecutor(max_workers=WORKERS)
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False)
+        _pool = None
+
+
+def submit(files):
+    """Split files in chunks and send them to the pool.
+
+    Returns the list of futures, one per chunk."""
+    pool = get_pool()
+    return [pool.submit(obtain_files_symbols, files[i:i + CHUNK_SIZE])
+            for i in range(0, len(files), CHUNK_SIZE)]
@@ -19,36 +19,40 @@ from __future__ import unicode_literals
 from __future__ import print_function
 
 import os
-import sqlite3
-import pickle
-try:
-    import Queue
-except:
-    import queue as Queue  # lint:ok
+import weakref
+import concurrent.futures
 
 from PyQt5.QtWidgets import QMessageBox
 from PyQt5.QtCore import (
     QObject,
     QThread,
-    QDir,
-    QFile,
-    QTextStream
+    QTimer,
+    pyqtSignal
 )
 
-from ninja_ide import resources
 from ninja_ide import translations
 from ninja_ide.extensions import handlers
 from ninja_ide.gui.ide import IDE
 from ninja_ide.core.file_handling import file_manager
 from ninja_ide.core import settings
+from ninja_ide.tools import content_index
+from ninja_ide.tools.locator import indexer
+from ninja_ide.tools.locator import locator_db
+from ninja_ide.tools.locator import matcher
+from ninja_ide.tools.locator import symbol_table
+from ninja_ide.tools.locator.symbol_table import ResultItem  # noqa
 
 from ninja_ide.tools.logger import NinjaLogger
 
 
 logger = NinjaLogger('ninja_ide.tools.locator')
 
-mapping_symbols = {}
-files_paths = {}
+symbols_table = symbol_table.SymbolTable()
+# (mtime, size, inode) of each file when its symbols were loaded
+files_stamps = {}
+
+# Time to wait (ms) for more changes in the file system before indexing
+REFRESH_DELAY = 500
 
 
 # @ FILES
@@ -70,23 +74,8 @@ FILTERS = {
     'lines': ':'}
 
 
-db_path = os.path.join(resources.NINJA_KNOWLEDGE_PATH, 'locator.db')
-
-
-def _initialize_db():
-    locator_db = sqlite3.connect(db_path)
-    cur = locator_db.cursor()
-    cur.execute("create table if not exists "
-                "locator(path text PRIMARY KEY, stat integer, data blob)")
-    locator_db.commit()
-    locator_db.close()
-
-
-# Initialize Database and open connection
-_initialize_db()
-
-
-# TODO: Clean non existent paths from the DB
+# Initialize Database
+locator_db.initialize_db()
 
 
 class GoToDefinition(QObject):
@@ -127,51 +116,42 @@ class GoToDefinition(QObject):
             tool_dock.show_results(self._thread.results)
 
 
-class ResultItem(object):
-    """The Representation of each item found with the locator."""
-
-    def __init__(self, symbol_type='', name='', path='', lineno=-1):
-        if name:
-            self.type = symbol_type  # Function, Class, etc
-            self.name = name
-            self.path = path
-            self.lineno = lineno
-            self.comparison = self.name
-            index = self.name.find('(')
-            if index != -1:
-                self.comparison = self.name[:index]
-        else:
-            raise TypeError("name is not a string or unicode.")
-
-    def __str__(self):
-        return self.name
-
-    def __len__(self):
-        return len(self.name)
-
-    def __iter__(self):
-        for i in self.name:
-            yield i
-
-    def __getitem__(self, index):
-        return self.name[index]
+class LocateSymbolsThread(QThread):
+    """Index the symbols of the projects in background.
 
+    The files are listed by the FileInventory of each project, they are
+    parsed in a pool of processes and only when their stamp changed since
+    the last time they were indexed. After the first crawl only the
+    folders that the inventories report as changed are indexed again."""
 
-class LocateSymbolsThread(QThread):
+    # Files processed, total of files
+    indexProgress = pyqtSignal(int, int)
 
     def __init__(self):
         super(LocateSymbolsThread, self).__init__()
         self.results = []
         self._cancel = False
-        self.locations = []
+        self.locations = symbols_table.view()
         self.execute = None
         self.dirty = False
         self._search = None
         self._isVariable = None
+        self._matcher = None
+        self._matcher_locations = None
 
         # Locator Knowledge
         self._locator_db = None
 
+        # Incremental updates
+        self._pending_paths = set()
+        self._paths_to_update = set()
+        # Inventories whose changes are followed
+        self._inventories = weakref.WeakSet()
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.setInterval(REFRESH_DELAY)
+        self._refresh_timer.timeout.connect(self._process_pending_paths)
+
     def find(self, search, filePath, isVariable):
         self.cancel()
         self.execute = self.go_to_definition
@@ -185,11 +165,15 @@ class LocateSymbolsThread(QThread):
         self.cancel()
         self.wait()
         self._cancel = False
+        ide = IDE.get_service('ide')
+        for nproject in ide.filesystem.get_projects().values():
+            if nproject.inventory not in self._inventories:
+                self._inventories.add(nproject.inventory)
+                nproject.inventory.inventoryChanged.connect(
+                    self._path_changed)
         if not self.isRunning():
-            global mapping_symbols
-            global files_paths
-            mapping_symbols = {}
-            files_paths = {}
+            # A full crawl already covers the pending changes
+            self._pending_paths.clear()
             self.execute = self.locate_code
             self.start()
 
@@ -200,14 +184,31 @@ class LocateSymbolsThread(QThread):
         if not self.isRunning():
             self.execute = self.locate_file_code
             self.start()
+        else:
+            self._path_changed(path)
+
+    def _path_changed(self, path):
+        self._pending_paths.add(path)
+        self._refresh_timer.start()
+
+    def _process_pending_paths(self):
+        if self.isRunning():
+            # Try again when the current job is done
+            self._refresh_timer.start()
+            return
+        self._paths_to_update = self._pending_paths
+        self._pending_paths = set()
+        self._cancel = False
+        self.execute = self.locate_paths_code
+        self.start()
 
     def run(self):
         self.results = []
-        self.locations = []
         self.execute()
         if self._cancel:
             self.results = []
-            self.locations = []
+            # Keep what was indexed, the view is built again when needed
+            self.dirty = True
         self._cancel = False
         self._search = None
         self._isVariable = None
@@ -216,81 +217,182 @@ class LocateSymbolsThread(QThread):
             self._locator_db.close()
             self._locator_db = None
 
-    def _save_file_symbols(self, path, stat, data):
-        if self._locator_db is not None:
-            pdata = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
-            cur = self._locator_db.cursor()
-            cur.execute("INSERT OR REPLACE INTO locator values (?, ?, ?)",
-                        (path, stat, sqlite3.Binary(pdata)))
-            self._locator_db.commit()
+    def _open_db(self):
+        self._locator_db = locator_db.LocatorDB()
 
-    def _get_file_symbols(self, path):
-        if self._locator_db is not None:
-            cur = self._locator_db.cursor()
-            cur.execute("SELECT * FROM locator WHERE path=:path",
-                        {'path': path})
-            return cur.fetchone()
+    def _load_stored_symbols(self, file_path, stamp, stored):
+        """Return the symbols in stored for file_path if they are current"""
+        data = stored.get(file_path)
+        if data is not None and tuple(data[0]) == stamp:
+            return data[1]
+        return None
 
     def locate_code(self):
-        self._locator_db = sqlite3.connect(db_path)
+        self._open_db()
         ide = IDE.get_service('ide')
-        projects = ide.filesystem.get_projects()
-        if not projects:
-            return
-        projects = list(projects.values())
+        projects = list(ide.filesystem.get_projects().values())
+        found = {}
+        stored = {}
         for nproject in projects:
             if self._cancel:
-                break
-            current_dir = QDir(nproject.path)
-            # Skip not readable dirs!
-            if not current_dir.isReadable():
-                continue
+                return
+            # Listed again, the stamps of the files changed in place too
+            nproject.inventory.rescan()
+            project_files = {
+                entry.path: entry.stamp
+                for entry in nproject.inventory.entries(nproject.extensions)}
+            found.update(project_files)
+            stored.update(self._locator_db.load_project(nproject.path))
+            # Clean non existent paths from the DB
+            self._locator_db.prune(nproject.path, set(project_files))
+        # Forget the files that are not part of the projects anymore
+        self._forget_files(set(symbols_table.files()) - set(found))
+        self._index_files(found, stored)
+        self.dirty = True
+        self.get_matcher()
 
-            queue_folders = Queue.Queue()
-            queue_folders.put(current_dir)
-            files_paths[nproject.path] = list()
-            self.__locate_code_in_project(queue_folders, nproject)
+    def locate_paths_code(self):
+        """Index again the files and folders reported as changed"""
+        self._open_db()
+        ide = IDE.get_service('ide')
+        projects = ide.filesystem.get_projects()
+        found = {}
+        removed = set()
+        for path in self._paths_to_update:
+            nproject = self._get_project_for_path(projects, path)
+            if os.path.isdir(path):
+                if nproject is None:
+                    continue
+                # The inventory listed the folder again (and the new sub
+                # folders), the files not changed are skipped later
+                prefix = path + os.sep
+                scanned = {
+                    entry.path: entry.stamp
+                    for entry in nproject.inventory.entries(
+                        nproject.extensions, path)}
+                removed.update(
+                    p for p in symbols_table.files()
+                    if p.startswith(prefix) and p not in scanned)
+                found.update(scanned)
+            elif os.path.isfile(path):
+                try:
+                    found[path] = indexer.file_stamp(path)
+                except OSError:
+                    continue
+            else:
+                # The file or the folder was deleted
+                prefix = path + os.sep
+                removed.add(path)
+                removed.update(p for p in symbols_table.files()
+                               if p.startswith(prefix))
+        self._forget_files(removed)
+        self._locator_db.remove_files(removed)
+        self._index_files(found, self._locator_db.load_files(found))
         self.dirty = True
-        self.get_locations()
-
-    def __locate_code_in_project(self, queue_folders, nproject):
-        file_filter = QDir.Files | QDir.NoDotAndDotDot | QDir.Readable
-        dir_filter = QDir.Dirs | QDir.NoDotAndDotDot | QDir.Readable
-        while not self._cancel and not queue_folders.empty():
-            current_dir = QDir(queue_folders.get())
-            # Skip not readable dirs!
-            if not current_dir.isReadable():
+        self.get_matcher()
+
+    @staticmethod
+    def _get_project_for_path(projects, path):
+        for project_path in sorted(projects, reverse=True):
+            if path == project_path or \
+                    path.startswith(project_path + os.sep):
+                return projects[project_path]
+        return None
+
+    def _forget_files(self, file_paths):
+        for file_path in file_paths:
+            symbols_table.remove_file(file_path)
+            files_stamps.pop(file_path, None)
+
+    def _index_files(self, files, stored):
+        """Load the symbols for files ({path: stamp}).
+
+        Files not changed since the last time are skipped, the ones
+        with a current entry in stored are loaded from there and the rest
+        are parsed in the indexer pool."""
+        total = len(files)
+        done = 0
+        to_parse = []
+        for file_path, stamp in files.items():
+            if self._cancel:
+                return
+            if files_stamps.get(file_path) == stamp and \
+                    file_path in symbols_table:
+                done += 1
+                continue
+            header = self._file_header(file_path)
+            results = self._load_stored_symbols(file_path, stamp, stored)
+            if results is not None:
+                symbols_table.set_file(file_path, header + results)
+                files_stamps[file_path] = stamp
+                done += 1
                 continue
+            symbols_table.set_file(file_path, header)
+            file_ext = file_manager.get_file_extension(file_path)
+            lang = settings.LANGUAGE_MAP.get(file_ext)
+            if handlers.get_symbols_handler(lang) is None:
+                files_stamps[file_path] = stamp
+                done += 1
+                continue
+            to_parse.append((file_path, lang))
+        self.indexProgress.emit(done, total)
+        if not to_parse:
+            return
+        languages = dict(to_parse)
+        futures = indexer.submit(to_parse)
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                if self._cancel:
+                    break
+                for file_path, symbols, error in future.result():
+                    done += 1
+                    if error is not None:
+                        logger.error('_index_files fail for file: %r, '
+                                     'error: %s' % (file_path, error))
+                        continue
+                    try:
+                        if symbols is None:
+                            # The workers don't know this language
+                            symbols = self._obtain_symbols(
+                                file_path, languages[file_path])
+                        self._add_file_symbols(
+                            file_path, files[file_path], symbols)
+                    except Exception as reason:
+                        logger.error('_index_files fail for file: %r, '
+                                     'error: %r' % (file_path, reason))
+                self.indexProgress.emit(done, total)
+        except Exception as reason:
+            # Most likely a worker died, start with a new pool next time
+            logger.error('_index_files, error: %r' % reason)
+            indexer.shutdown_pool()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _add_file_symbols(self, file_path, stamp, symbols):
+        results = []
+        self.__parse_symbols(symbols, results)
+        if self._locator_db is not None:
+            self._locator_db.add_file(file_path, stamp, results)
+        symbols_table.set_file(
+            file_path, self._file_header(file_path) + results)
+        files_stamps[file_path] = stamp
 
-            # Collect all sub dirs!
-            current_sub_dirs = current_dir.entryInfoList(dir_filter)
-            for one_dir in current_sub_dirs:
-                queue_folders.put(one_dir.absoluteFilePath())
-
-            # all files in sub_dir first apply the filters
-            current_files = current_dir.entryInfoList(
-                ['*{0}'.format(x) for x in nproject.extensions], file_filter)
-            # process all files in current dir!
-            global files_paths
-            for one_file in current_files:
-                try:
-                    self._grep_file_symbols(one_file.absoluteFilePath(),
-                                            one_file.fileName())
-                    files_paths[nproject.path].append(
-                        one_file.absoluteFilePath())
-                except Exception as reason:
-                    logger.error(
-                        '__locate_code_in_project, error: %r' % reason)
-                    logger.error(
-                        '__locate_code_in_project fail for file: %r' %
-                        one_file.absoluteFilePath())
+    def _obtain_symbols(self, file_path, lang):
+        symbols_handler = handlers.get_symbols_handler(lang)
+        if symbols_handler is None:
+            return {}
+        with open(file_path) as f:
+            content = f.read()
+        return symbols_handler.obtain_symbols(content, filename=file_path)
 
     def locate_file_code(self):
-        self._locator_db = sqlite3.connect(db_path)
+        self._open_db()
         file_name = file_manager.get_basename(self._file_path)
         try:
             self._grep_file_symbols(self._file_path, file_name)
             self.dirty = True
+            self.get_matcher()
         except Exception as reason:
             logger.error('locate_file_code, error: %r' % reason)
 
@@ -298,34 +400,25 @@ class LocateSymbolsThread(QThread):
         self.dirty = True
         self.results = []
         locations = self.get_locations()
+        search = self._search
         if self._isVariable:
-            preResults = [
-                [file_manager.get_basename(x.path), x.path, x.lineno, '']
-                for x in locations
-                if (x.type == FILTERS['attribs']) and (x.name == self._search)]
+            found = locations.select(
+                (FILTERS['attribs'],), lambda name: name == search)
         else:
-            preResults = [
-                [file_manager.get_basename(x.path), x.path, x.lineno, '']
-                for x in locations
-                if ((x.type == FILTERS['functions']) or
-                    (x.type == FILTERS['classes'])) and
-                   (x.name.startswith(self._search))]
+            found = locations.select(
+                (FILTERS['functions'], FILTERS['classes']),
+                lambda name: name.startswith(search))
+        preResults = [
+            [file_manager.get_basename(x.path), x.path, x.lineno, '']
+            for x in found]
         for data in preResults:
-            file_object = QFile(data[1])
-            if not file_object.open(QFile.ReadOnly):
-                return
-
-            stream = QTextStream(file_object)
-            line_index = 0
-            line = stream.readLine()
-            while not self._cancel and not stream.atEnd():
-                if line_index == data[2]:
-                    data[3] = line
-                    self.results.append(data)
-                    break
-                # take the next line!
-                line = stream.readLine()
-                line_index += 1
+            if self._cancel:
+                break
+            # A seek in the file, with the offsets of its lines
+            line = content_index.get_line(data[1], data[2])
+            if line is not None:
+                data[3] = line
+                self.results.append(data)
 
     def get_locations(self):
         if self.dirty:
@@ -333,116 +426,104 @@ class LocateSymbolsThread(QThread):
             self.dirty = False
         return self.locations
 
+    def get_matcher(self):
+        """Return the locations and the matcher to search between them.
+
+        The index of the matcher is built again when the locations change,
+        it's done in this thread after indexing so it's usually ready."""
+        locations = self.get_locations()
+        if self._matcher_locations is not locations:
+            self._matcher = matcher.SymbolMatcher(
+                locations.comparisons(), locations.kinds())
+            self._matcher_locations = locations
+        return locations, self._matcher
+
     def get_this_file_symbols(self, path):
-        global mapping_symbols
-        symbols = mapping_symbols.get(path, ())
+        symbols = symbols_table.file_items(path)
         try:
             if not symbols:
                 file_name = file_manager.get_basename(path)
                 self._grep_file_symbols(path, file_name)
-                symbols = mapping_symbols.get(path, ())
+                symbols = symbols_table.file_items(path)
             symbols = sorted(symbols[1:], key=lambda item: item.name)
         except Exception as reason:
             logger.error('get_this_file_symbols, error: %r' % reason)
         return symbols
 
     def convert_map_to_array(self):
-        global mapping_symbols
-        self.locations = [x for location in mapping_symbols
-                          for x in mapping_symbols[location]]
-        self.locations = sorted(self.locations, key=lambda item: item.name)
+        self.locations = symbols_table.view()
 
-    def _grep_file_symbols(self, file_path, file_name):
-        # type - file_name - file_path
-        global mapping_symbols
+    def _file_header(self, file_path, file_name=None):
+        if file_name is None:
+            file_name = file_manager.get_basename(file_path)
         exts = settings.SYNTAX.get('python')['extension']
         file_ext = file_manager.get_file_extension(file_path)
         if file_ext not in exts:
-            mapping_symbols[file_path] = [
-                ResultItem(symbol_type=FILTERS['non-python'], name=file_name,
-                           path=file_path, lineno=-1)]
-        else:
-            mapping_symbols[file_path] = [
-                ResultItem(symbol_type=FILTERS['files'], name=file_name,
-                           path=file_path, lineno=-1)]
-        data = self._get_file_symbols(file_path)
-        # FIXME: stat not int
-        mtime = int(os.stat(file_path).st_mtime)
-        if data is not None and (mtime == int(data[1])):
-            try:
-                results = pickle.loads(data[2])
-                mapping_symbols[file_path] += results
-                return
-            except:
-                print("ResultItem couldn't be loaded, let's analyze it again'")
-        # obtain a symbols handler for this file extension
-        lang = settings.LANGUAGE_MAP.get(file_ext)
-        symbols_handler = handlers.get_symbols_handler(lang)
-        if symbols_handler is None:
-            return
-        results = []
-        with open(file_path) as f:
-            content = f.read()
-            symbols = symbols_handler.obtain_symbols(
-                content,
-                filename=file_path)
-            self.__parse_symbols(symbols, results, file_path)
+            return [(FILTERS['non-python'], file_name, -1)]
+        return [(FILTERS['files'], file_name, -1)]
 
-        if results:
-            self._save_file_symbols(file_path, mtime, results)
-            mapping_symbols[file_path] += results
+    def _grep_file_symbols(self, file_path, file_name):
+        # type - file_name - file_path
+        stamp = indexer.file_stamp(file_path)
+        if files_stamps.get(file_path) == stamp and \
+                file_path in symbols_table:
+            return
+        header = self._file_header(file_path, file_name)
+        symbols_table.set_file(file_path, header)
+        stored = {}
+        if self._locator_db is not None:
+            stored = self._locator_db.load_files([file_path])
+        results = self._load_stored_symbols(file_path, stamp, stored)
+        if results is not None:
+            symbols_table.set_file(file_path, header + results)
+            files_stamps[file_path] = stamp
+            return
+        file_ext = file_manager.get_file_extension(file_path)
+        lang = settings.LANGUAGE_MAP.get(file_ext)
+        symbols = self._obtain_symbols(file_path, lang)
+        self._add_file_symbols(file_path, stamp, symbols)
 
-    def __parse_symbols(self, symbols, results, file_path):
+    def __parse_symbols(self, symbols, results):
+        # results: [(type, name, lineno)]
         if "classes" in symbols:
-            self.__parse_class(symbols, results, file_path)
+            self.__parse_class(symbols, results)
         if 'attributes' in symbols:
-            self.__parse_attributes(symbols, results, file_path)
+            self.__parse_attributes(symbols, results)
         if 'functions' in symbols:
-            self.__parse_functions(symbols, results, file_path)
+            self.__parse_functions(symbols, results)
 
-    def __parse_class(self, symbols, results, file_path):
+    def __parse_class(self, symbols, results):
         clazzes = symbols['classes']
         for claz in clazzes:
             line_number = clazzes[claz]['lineno'] - 1
             members = clazzes[claz]['members']
-            results.append(ResultItem(symbol_type=FILTERS['classes'],
-                           name=claz, path=file_path,
-                           lineno=line_number))
+            results.append((FILTERS['classes'], claz, line_number))
             if 'attributes' in members:
                 for attr in members['attributes']:
                     line_number = members['attributes'][attr] - 1
-                    results.append(ResultItem(symbol_type=FILTERS['attribs'],
-                                   name=attr, path=file_path,
-                                   lineno=line_number))
+                    results.append((FILTERS['attribs'], attr, line_number))
             if 'functions' in members:
                 for func in members['functions']:
                     line_number = members['functions'][func]['lineno'] - 1
-                    results.append(ResultItem(
-                        symbol_type=FILTERS['functions'], name=func,
-                        path=file_path, lineno=line_number))
+                    results.append(
+                        (FILTERS['functions'], func, line_number))
                     self.__parse_symbols(
-                        members['functions'][func]['functions'],
-                        results, file_path)
+                        members['functions'][func]['functions'], results)
             if 'classes' in members:
-                self.__parse_class(members, results, file_path)
+                self.__parse_class(members, results)
 
-    def __parse_attributes(self, symbols, results, file_path):
+    def __parse_attributes(self, symbols, results):
         attributes = symbols['attributes']
         for attr in attributes:
             line_number = attributes[attr] - 1
-            results.append(ResultItem(symbol_type=FILTERS['attribs'],
-                           name=attr, path=file_path,
-                           lineno=line_number))
+            results.append((FILTERS['attribs'], attr, line_number))
 
-    def __parse_functions(self, symbols, results, file_path):
+    def __parse_functions(self, symbols, results):
         functions = symbols['functions']
         for func in functions:
             line_number = functions[func]['lineno'] - 1
-            results.append(ResultItem(
-                symbol_type=FILTERS['functions'], name=func,
-                path=file_path, lineno=line_number))
-            self.__parse_symbols(functions[func]['functions'],
-                                 results, file_path)
+            results.append((FILTERS['functions'], func, line_number))
+            self.__parse_symbols(functions[func]['functions'], results)
 
     def get_symbols_for_class(self, file_path, clazzName):
         results = []
@@ -453,8 +534,9 @@ class LocateSymbolsThread(QThread):
             symbols_handler = handlers.get_symbols_handler(ext)
             symbols = symbols_handler.obtain_symbols(content,
                                                      filename=file_path)
-            self.__parse_symbols(symbols, results, file_path)
-        return results
+            self.__parse_symbols(symbols, results)
+        return [ResultItem(symbol_type=kind, name=name, path=file_path,
+                           lineno=lineno) for kind, name, lineno in results]
 
     def cancel(self):
         self._cancel = True
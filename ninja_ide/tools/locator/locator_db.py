@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of NINJA-IDE (http://ninja-ide.org).
+#
+# NINJA-IDE is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# any later version.
+#
+# NINJA-IDE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
+"""Locator Knowledge: the symbols of the files indexed by the locator.
+
+Each file is stored with its (mtime, size, inode) stamp and each symbol
+as a (kind, name, lineno) row, the writes are queued and sent to the
+database in a single transaction when commit is called."""
+
+import os
+import sqlite3
+
+from ninja_ide import resources
+
+
+db_path = os.path.join(resources.NINJA_KNOWLEDGE_PATH, 'locator.db')
+
+# Bump it when the schema of the database changes
+DB_VERSION = 2
+
+# Max number of variables in a sqlite query
+_MAX_VARIABLES = 900
+
+
+def initialize_db():
+    locator_db = sqlite3.connect(db_path)
+    cur = locator_db.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA user_version")
+    if cur.fetchone()[0] != DB_VERSION:
+        # The knowledge stored with an old schema is useless
+        cur.execute("drop table if exists locator")
+        cur.execute("drop table if exists symbols")
+        cur.execute("drop table if exists files")
+        cur.execute("PRAGMA user_version = %d" % DB_VERSION)
+    cur.execute("create table if not exists "
+                "files(id integer PRIMARY KEY, path text UNIQUE, "
+                "mtime integer, size integer, inode integer)")
+    cur.execute("create table if not exists "
+                "symbols(file_id integer REFERENCES files(id) "
+                "ON DELETE CASCADE, kind text, name text, lineno integer)")
+    cur.execute("create index if not exists "
+                "symbols_file_id on symbols(file_id)")
+    locator_db.commit()
+    locator_db.close()
+
+
+def _prefix_range(folder):
+    """Return the bounds of the paths inside folder, to use the index"""
+    prefix = os.path.join(folder, '')
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return prefix, upper
+
+
+def _group_rows(rows):
+    files = {}
+    for path, mtime, size, inode, kind, name, lineno in rows:
+        entry = files.get(path)
+        if entry is None:
+            entry = files[path] = ((mtime, size, inode), [])
+        if kind is not None:
+            entry[1].append((kind, name, lineno))
+    return files
+
+
+class LocatorDB(object):
+    """Connection to the locator knowledge.
+
+    It must be used only from the thread that created it."""
+
+    _SELECT = ("SELECT f.path, f.mtime, f.size, f.inode, "
+               "s.kind, s.name, s.lineno FROM files f "
+               "LEFT JOIN symbols s ON s.file_id = f.id ")
+
+    def __init__(self):
+        self._conn = sqlite3.connect(db_path)
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._pending_files = {}
+        self._pending_removals = set()
+
+    def load_project(self, project_path):
+        """Return {path: (stamp, symbols)} for all the files in project"""
+        cur = self._conn.cursor()
+        cur.execute(self._SELECT + "WHERE f.path > ? AND f.path < ?",
+                    _prefix_range(project_path))
+        return _group_rows(cur)
+
+    def load_files(self, paths):
+        """Return {path: (stamp, symbols)} for the stored files in paths"""
+        paths = list(paths)
+        files = {}
+        cur = self._conn.cursor()
+        for i in range(0, len(paths), _MAX_VARIABLES):
+            chunk = paths[i:i + _MAX_VARIABLES]
+            cur.execute(self._SELECT + "WHERE f.path IN (%s)" %
+                        ', '.join('?' * len(chunk)), chunk)
+            files.update(_group_rows(cur))
+        return files
+
+    def add_file(self, path, stamp, symbols):
+        """Queue the symbols ([(kind, name, lineno)]) of path to be saved"""
+        self._pending_removals.discard(path)
+        self._pending_files[path] = (stamp, symbols)
+
+    def remove_files(self, paths):
+        for path in paths:
+            self._pending_files.pop(path, None)
+            self._pending_removals.add(path)
+
+    def prune(self, project_path, existing):
+        """Remove the files of project_path that are not in existing"""
+        cur = self._conn.cursor()
+        cur.execute("SELECT path FROM files WHERE path > ? AND path < ?",
+                    _prefix_range(project_path))
+        self.remove_files([row[0] for row in cur
+                           if row[0] not in existing])
+
+    def commit(self):
+        """Write all the queued changes in one transaction"""
+        if not self._pending_files and not self._pending_removals:
+            return
+        with self._conn:
+            cur = self._conn.cursor()
+            # The symbols go away with their file (ON DELETE CASCADE)
+            removed = self._pending_removals.union(self._pending_files)
+            cur.executemany("DELETE FROM files WHERE path=?",
+                            ((path,) for path in removed))
+            for path, (stamp, symbols) in self._pending_files.items():
+                cur.execute("INSERT INTO files(path, mtime, size, inode) "
+                            "values (?, ?, ?, ?)", (path,) + tuple(stamp))
+                file_id = cur.lastrowid
+                cur.executemany("INSERT INTO symbols values (?, ?, ?, ?)",
+                                ((file_id,) + tuple(symbol)
+                                 for symbol in symbols))
+        self._pending_files = {}
+        self._pending_removals = set()
+
+    def close(self):
+        self._conn.close()
@@ -33,6 +33,8 @@ from ninja_ide.tools import ui_tools
 from ninja_ide.tools import utils
 from ninja_ide.gui.ide import IDE
 from ninja_ide.tools.locator import locator
+from ninja_ide.tools.locator import indexer
+from ninja_ide.tools.locator import matcher
 from ninja_ide.tools.logger import NinjaLogger
 
 logger = NinjaLogger(__name__)
@@ -63,6 +65,8 @@ class LocatorWidget(QDialog):
 
         self.locate_symbols = locator.LocateSymbolsThread()
         self.locate_symbols.finished.connect(self._cleanup)
+        if parent is not None:
+            parent.goingDown.connect(self._on_ide_going_down)
         # FIXME: invalid signal
         # self.locate_symbols.terminated.connect(self._cleanup)
         # Hide locator with Escape key
@@ -121,6 +125,11 @@ class LocatorWidget(QDialog):
     def _cleanup(self):
         self.locate_symbols.wait()
 
+    def _on_ide_going_down(self):
+        self.locate_symbols.cancel()
+        self.locate_symbols.wait()
+        indexer.shutdown_pool()
+
     def explore_code(self):
         self.locate_symbols.find_code_location()
 
@@ -188,9 +197,7 @@ class LocatorWidget(QDialog):
         if len(filterOptions) == 0:
             self.tempLocations = self.locate_symbols.get_locations()
         elif len(filterOptions) == 1:
-            self.tempLocations = [
-                x for x in self.locate_symbols.get_locations()
-                if x.comparison.lower().find(filterOptions[0].lower()) > -1]
+            self.tempLocations = self._match(filterOptions[0])
         else:
             index = 0
             if not self.tempLocations and (self.__pre_filters == filterOptions):
@@ -207,13 +214,16 @@ class LocatorWidget(QDialog):
                 self.__pre_results = self.tempLocations
         return self._create_list_items(self.tempLocations)
 
+    def _match(self, search, kind=None):
+        """Return the best locations for search using the symbols index"""
+        locations, symbol_matcher = self.locate_symbols.get_matcher()
+        return [locations[i] for i in symbol_matcher.match(search, kind)]
+
     def _filter_generic(self, filterOptions, index):
         at_start = (index == 0)
         if at_start:
-            self.tempLocations = [
-                x for x in self.locate_symbols.get_locations()
-                if x.type == filterOptions[0] and
-                x.comparison.lower().find(filterOptions[1].lower()) > -1]
+            self.tempLocations = self._match(
+                filterOptions[1], kind=filterOptions[0])
         else:
             currentItem = self._root.currentItem()
             if currentItem is not None:
@@ -224,13 +234,12 @@ class LocatorWidget(QDialog):
                         currentItem[2], currentItem[1])
                     self.tempLocations = symbols
                 elif currentItem:
-                    global mapping_symbols
-                    self.tempLocations = locator.mapping_symbols.get(
-                        currentItem[2], [])
-                self.tempLocations = [x for x in self.tempLocations
-                                      if x.type == filterOptions[index] and
-                                      x.comparison.lower().find(
-                                        filterOptions[index + 1].lower()) > -1]
+                    self.tempLocations = locator.symbols_table.file_items(
+                        currentItem[2])
+                self.tempLocations = matcher.filter_items(
+                    [x for x in self.tempLocations
+                     if x.type == filterOptions[index]],
+                    filterOptions[index + 1])
         return index + 2
 
     def _filter_this_file(self, filterOptions, index):
@@ -253,9 +262,9 @@ class LocatorWidget(QDialog):
                 self.tempLocations = \
                     self.locate_symbols.get_this_file_symbols(
                         editorWidget.file_path)
-                search = filterOptions[index + 1].lstrip().lower()
-                self.tempLocations = [x for x in self.tempLocations
-                                      if x.comparison.lower().find(search) > -1]
+                search = filterOptions[index + 1].lstrip()
+                self.tempLocations = matcher.filter_items(
+                    self.tempLocations, search)
         else:
             del filterOptions[index + 1]
             del filterOptions[index]
@@ -270,10 +279,9 @@ class LocatorWidget(QDialog):
                 locator.ResultItem(
                     locator.FILTERS['files'],
                     opened[f].file_name, opened[f].file_path) for f in opened]
-            search = filterOptions[index + 1].lstrip().lower()
-            self.tempLocations = [
-                x for x in self.tempLocations
-                if x.comparison.lower().find(search) > -1]
+            search = filterOptions[index + 1].lstrip()
+            self.tempLocations = matcher.filter_items(
+                self.tempLocations, search)
             index += 2
         else:
             del filterOptions[index + 1]
@@ -298,17 +306,16 @@ class LocatorWidget(QDialog):
                     filterOptions.insert(0, locator.FILTERS['non-python'])
                 filterOptions.insert(1, editorWidget.file_path)
             self.tempLocations = [
-                x for x in self.locate_symbols.get_locations()
-                if x.type == filterOptions[0] and
-                x.path == filterOptions[1]]
+                x for x in locator.symbols_table.file_items(filterOptions[1])
+                if x.type == filterOptions[0]]
         else:
             currentItem = self._root.currentItem()
             if currentItem is not None:
                 currentItem = currentItem.toVariant()
                 self.tempLocations = [
-                    x for x in self.locate_symbols.get_locations()
-                    if x.type == currentItem[0] and
-                    x.path == currentItem[2]]
+                    x for x in locator.symbols_table.file_items(
+                        currentItem[2])
+                    if x.type == currentItem[0]]
         if filterOptions[index + 1].isdigit():
             self._line_jump = int(filterOptions[index + 1]) - 1
         return index + 2
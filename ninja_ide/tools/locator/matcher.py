@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of NINJA-IDE (http://ninja-ide.org).
+#
+# NINJA-IDE is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# any later version.
+#
+# NINJA-IDE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
+"""Fuzzy matching of symbol names for the locator.
+
+A name matches a query when the query is a substring of the name or a
+prefix of its camel humps ('LocateSymbolsThread' -> 'lst'), the results
+are ranked by: prefix > word boundary > camel humps > substring."""
+
+import re
+import heapq
+import bisect
+from array import array
+
+
+# Max number of results returned by a search
+MAX_RESULTS = 300
+
+# Score of each kind of match, the rest of the score breaks the ties
+_PREFIX = 4000
+_WORD_BOUNDARY = 3000
+_HUMPS = 2000
+_SUBSTRING = 1000
+
+# First letter of each word: after a separator or a lowercase -> uppercase
+_HUMPS_PATTERN = re.compile(
+    r'(?:^|(?<=[^A-Za-z0-9]))[A-Za-z0-9]|(?<=[a-z0-9])[A-Z]')
+
+
+def get_humps(name):
+    """Return the initials of the words in name: 'get_locations' -> 'gl'"""
+    return ''.join(_HUMPS_PATTERN.findall(name)).lower()
+
+
+def _is_word_boundary(name, index):
+    previous = name[index - 1]
+    if not previous.isalnum():
+        return True
+    return name[index].isupper() and not previous.isupper()
+
+
+def score(query, name, lower, humps):
+    """Return the score of name for query (lowercase) or None"""
+    index = lower.find(query)
+    if index == 0:
+        return _PREFIX - len(lower)
+    if index > 0 and _is_word_boundary(name, index):
+        return _WORD_BOUNDARY - index
+    if humps.startswith(query):
+        return _HUMPS - len(humps)
+    if index > 0:
+        return _SUBSTRING - index
+    return None
+
+
+def filter_items(items, query, limit=None):
+    """Rank the items (with a comparison attribute) matching query.
+
+    To be used on small lists, without an index."""
+    query = query.lower()
+    if not query:
+        return list(items)
+    scored = []
+    for item in items:
+        name = item.comparison
+        value = score(query, name, name.lower(), get_humps(name))
+        if value is not None:
+            scored.append((value, item))
+    if limit is None:
+        scored.sort(key=lambda each: each[0], reverse=True)
+    else:
+        scored = heapq.nlargest(limit, scored, key=lambda each: each[0])
+    return [item for _, item in scored]
+
+
+def _trigrams(text):
+    return set(text[i:i + 3] for i in range(len(text) - 2))
+
+
+class SymbolMatcher(object):
+    """Index over the names of the symbols to rank them for a query.
+
+    The searches return the position of the symbols in the sequence
+    used to build the index. Each distinct name is indexed once, and when
+    a query extends the previous one the names are looked up only between
+    the ones that matched before."""
+
+    def __init__(self, names, kinds):
+        self._kinds = kinds
+        # Distinct names and the positions where each one is used
+        self._names = []
+        self._positions = []
+        ids = {}
+        for position, name in enumerate(names):
+            name_id = ids.get(name)
+            if name_id is None:
+                ids[name] = len(self._names)
+                self._names.append(name)
+                self._positions.append([position])
+            else:
+                self._positions[name_id].append(position)
+        self._lower = [name.lower() for name in self._names]
+        self._humps = [get_humps(name) for name in self._names]
+        # Lowercase names sorted, to find the prefix matches by bisection
+        self._sorted_ids = sorted(range(len(self._lower)),
+                                  key=self._lower.__getitem__)
+        self._sorted_lower = [self._lower[i] for i in self._sorted_ids]
+        self._chars = {}
+        self._trigrams = {}
+        self._humps_trigrams = {}
+        for i, lower in enumerate(self._lower):
+            for char in set(lower):
+                self._postings(self._chars, char).append(i)
+            for trigram in _trigrams(lower):
+                self._postings(self._trigrams, trigram).append(i)
+            for trigram in _trigrams(self._humps[i]):
+                self._postings(self._humps_trigrams, trigram).append(i)
+        # (query, matched name ids) of the last search
+        self._last = None
+
+    @staticmethod
+    def _postings(index, key):
+        ids = index.get(key)
+        if ids is None:
+            ids = index[key] = array('I')
+        return ids
+
+    def __len__(self):
+        return len(self._kinds)
+
+    def _candidates(self, query):
+        """Return the name ids that could match query"""
+        last = self._last
+        if last is not None and query.startswith(last[0]):
+            return last[1]
+        if len(query) < 3:
+            postings = [self._chars.get(char, ()) for char in set(query)]
+            return min(postings, key=len)
+        # Any substring match is in the postings of each query trigram
+        trigrams = _trigrams(query)
+        in_names = min([self._trigrams.get(t, ()) for t in trigrams],
+                       key=len)
+        in_humps = min([self._humps_trigrams.get(t, ()) for t in trigrams],
+                       key=len)
+        if not in_humps:
+            return in_names
+        return set(in_names).union(in_humps)
+
+    def _prefix_ids(self, query):
+        begin = bisect.bisect_left(self._sorted_lower, query)
+        end = bisect.bisect_left(self._sorted_lower, query + '\uffff')
+        return self._sorted_ids[begin:end]
+
+    def _expand(self, scored_ids, kind):
+        """Return (score, position) for the symbols of the names scored"""
+        positions, kinds = self._positions, self._kinds
+        return [(value, position) for value, i in scored_ids
+                for position in positions[i]
+                if kind is None or kinds[position] == kind]
+
+    def _best(self, scored, limit):
+        # Same score: keep the order of the symbols
+        best = heapq.nlargest(limit, scored,
+                              key=lambda each: (each[0], -each[1]))
+        return [position for _, position in best]
+
+    def match(self, query, kind=None, limit=MAX_RESULTS):
+        """Return the positions of the best limit symbols for query"""
+        query = query.lower()
+        if not query:
+            positions = range(len(self._kinds))
+            if kind is not None:
+                positions = [i for i in positions if self._kinds[i] == kind]
+            return list(positions)[:limit]
+        # The prefix matches are always the best ones, if there are enough
+        # of them there is no need to look at the rest of the names
+        lower = self._lower
+        scored = self._expand(
+            [(_PREFIX - len(lower[i]), i) for i in self._prefix_ids(query)],
+            kind)
+        if len(scored) >= limit:
+            self._last = None
+            return self._best(scored, limit)
+        names, humps = self._names, self._humps
+        matched = []
+        for i in self._candidates(query):
+            value = score(query, names[i], lower[i], humps[i])
+            if value is not None:
+                matched.append((value, i))
+        self._last = (query, [i for _, i in matched])
+        return self._best(self._expand(matched, kind), limit)
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of NINJA-IDE (http://ninja-ide.org).
+#
+# NINJA-IDE is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# any later version.
+#
+# NINJA-IDE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
+"""Columnar storage for the symbols found by the locator.
+
+Each symbol is a row: the kind code, the line number, the id of the path
+and the id of the name are kept in arrays, and the paths and names are
+interned in pools. ResultItem objects are only created for the rows
+that are going to be shown."""
+
+from array import array
+
+
+# Compact the table when there are more dead rows than this
+_MAX_DEAD_ROWS = 50000
+
+
+class ResultItem(object):
+    """The Representation of each item found with the locator."""
+
+    __slots__ = ('type', 'name', 'path', 'lineno', 'comparison')
+
+    def __init__(self, symbol_type='', name='', path='', lineno=-1,
+                 comparison=None):
+        if name:
+            self.type = symbol_type  # Function, Class, etc
+            self.name = name
+            self.path = path
+            self.lineno = lineno
+            if comparison is None:
+                comparison = get_comparison(name)
+            self.comparison = comparison
+        else:
+            raise TypeError("name is not a string or unicode.")
+
+    def __str__(self):
+        return self.name
+
+    def __len__(self):
+        return len(self.name)
+
+    def __iter__(self):
+        for i in self.name:
+            yield i
+
+    def __getitem__(self, index):
+        return self.name[index]
+
+
+def get_comparison(name):
+    """Return the part of the name used to search: 'Foo(Bar)' -> 'Foo'"""
+    index = name.find('(')
+    if index != -1:
+        return name[:index]
+    return name
+
+
+class SymbolsView(object):
+    """Read only sequence of ResultItem over some rows of a SymbolTable.
+
+    It keeps working while the table is updated, the rows are only
+    added or moved to new arrays by the table."""
+
+    __slots__ = ('_rows', '_paths', '_names', '_comparisons', '_kinds',
+                 '_lines', '_row_paths', '_row_names')
+
+    def __init__(self, table, rows):
+        self._rows = rows
+        (self._paths, self._names, self._comparisons, self._kinds,
+         self._lines, self._row_paths, self._row_names) = table.columns()
+
+    def _item(self, row):
+        name_id = self._row_names[row]
+        return ResultItem(symbol_type=chr(self._kinds[row]),
+                          name=self._names[name_id],
+                          path=self._paths[self._row_paths[row]],
+                          lineno=self._lines[row],
+                          comparison=self._comparisons[name_id])
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._item(row) for row in self._rows[index]]
+        return self._item(self._rows[index])
+
+    def __iter__(self):
+        for row in self._rows:
+            yield self._item(row)
+
+    def comparisons(self):
+        """Return the comparison of each row, to build a matcher"""
+        comparisons, row_names = self._comparisons, self._row_names
+        return [comparisons[row_names[row]] for row in self._rows]
+
+    def kinds(self):
+        kinds = self._kinds
+        return [chr(kinds[row]) for row in self._rows]
+
+    def select(self, kinds, accept):
+        """Yield the items of kinds (codes) with a name accepted"""
+        codes = set(ord(kind) for kind in kinds)
+        names, row_names, row_kinds = (self._names, self._row_names,
+                                       self._kinds)
+        for row in self._rows:
+            if row_kinds[row] in codes and accept(names[row_names[row]]):
+                yield self._item(row)
+
+
+class SymbolTable(object):
+    """Symbols of every file indexed, with a view sorted by name.
+
+    The rows of a file are contiguous, when a file is updated its old rows
+    are left dead and the new ones appended; the dead rows are dropped
+    when there are too many of them. The sorted view is updated
+    incrementally when only a few rows changed."""
+
+    def __init__(self):
+        self._paths = []
+        self._path_ids = {}
+        self._names = []
+        self._comparisons = []
+        self._name_ids = {}
+        self._new_columns()
+        # path id -> (first row, number of rows)
+        self._files = {}
+        self._dead = 0
+        self._view = array('I')
+        self._symbols_view = None
+        self._added = []
+        self._removed = set()
+
+    def _new_columns(self):
+        self._kinds = bytearray()
+        self._lines = array('i')
+        self._row_paths = array('I')
+        self._row_names = array('I')
+
+    def columns(self):
+        return (self._paths, self._names, self._comparisons, self._kinds,
+                self._lines, self._row_paths, self._row_names)
+
+    def _path_id(self, path):
+        path_id = self._path_ids.get(path)
+        if path_id is None:
+            path_id = self._path_ids[path] = len(self._paths)
+            self._paths.append(path)
+        return path_id
+
+    def _name_id(self, name):
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = self._name_ids[name] = len(self._names)
+            self._names.append(name)
+            self._comparisons.append(get_comparison(name))
+        return name_id
+
+    def __contains__(self, path):
+        return self._path_ids.get(path) in self._files
+
+    def files(self):
+        """Return the paths of the files in the table"""
+        return [self._paths[path_id] for path_id in self._files]
+
+    def set_file(self, path, symbols):
+        """Replace the symbols ([(kind, name, lineno)]) of path"""
+        path_id = self._path_id(path)
+        self._remove_rows(path_id)
+        start = len(self._lines)
+        for kind, name, lineno in symbols:
+            self._kinds.append(ord(kind))
+            self._lines.append(lineno)
+            self._row_paths.append(path_id)
+            self._row_names.append(self._name_id(name))
+        count = len(self._lines) - start
+        self._files[path_id] = (start, count)
+        self._added.extend(range(start, start + count))
+
+    def remove_file(self, path):
+        path_id = self._path_ids.get(path)
+        if path_id is not None:
+            self._remove_rows(path_id)
+
+    def _remove_rows(self, path_id):
+        rows = self._files.pop(path_id, None)
+        if rows is None:
+            return
+        start, count = rows
+        self._removed.update(range(start, start + count))
+        self._dead += count
+        if self._dead > _MAX_DEAD_ROWS:
+            self._compact()
+
+    def _compact(self):
+        """Copy the live rows to new arrays"""
+        kinds, lines = self._kinds, self._lines
+        row_paths, row_names = self._row_paths, self._row_names
+        self._new_columns()
+        files = {}
+        for path_id, (start, count) in self._files.items():
+            files[path_id] = (len(self._lines), count)
+            end = start + count
+            self._kinds += kinds[start:end]
+            self._lines += lines[start:end]
+            self._row_paths += row_paths[start:end]
+            self._row_names += row_names[start:end]
+        self._files = files
+        self._dead = 0
+        # The row numbers changed, sort everything again
+        self._view = array('I')
+        self._added = list(self._live_rows())
+        self._removed = set()
+
+    def _live_rows(self):
+        for start, count in self._files.values():
+            for row in range(start, start + count):
+                yield row
+
+    def _sort_key(self, row):
+        return self._names[self._row_names[row]]
+
+    def _update_view(self):
+        if not self._added and not self._removed:
+            return
+        # A file could be set again before the view was updated
+        added = sorted((row for row in self._added
+                        if row not in self._removed), key=self._sort_key)
+        if len(added) + len(self._removed) > len(self._view) // 8:
+            view = array('I', sorted(self._live_rows(), key=self._sort_key))
+        else:
+            # A new array, the views already given must not change
+            removed = self._removed
+            view = array('I', (row for row in self._view
+                               if row not in removed))
+            names, row_names = self._names, self._row_names
+            for row in added:
+                name = names[row_names[row]]
+                low, high = 0, len(view)
+                while low < high:
+                    middle = (low + high) // 2
+                    if names[row_names[view[middle]]] <= name:
+                        low = middle + 1
+                    else:
+                        high = middle
+                view.insert(low, row)
+        self._view = view
+        self._added = []
+        self._removed = set()
+
+    def view(self):
+        """Return a SymbolsView with all the symbols sorted by name"""
+        self._update_view()
+        if self._symbols_view is None or \
+                self._symbols_view._rows is not self._view:
+            self._symbols_view = SymbolsView(self, self._view)
+        return self._symbols_view
+
+    def file_items(self, path):
+        """Return the items of path, starting with the file itself"""
+        rows = self._files.get(self._path_ids.get(path))
+        if rows is None:
+            return []
+        start, count = rows
+        return SymbolsView(self, range(start, start + count))[:]
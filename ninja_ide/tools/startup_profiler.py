@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of NINJA-IDE (http://ninja-ide.org).
+#
+# NINJA-IDE is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# any later version.
+#
+# NINJA-IDE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
+"""Time of each phase of the start of NINJA-IDE and of each import.
+
+It is enabled with --profile-startup, the report is written when the
+IDE finished starting (the deferred services are loaded). When it is not
+enabled phase() and mark() do nothing."""
+
+import os
+import sys
+import time
+import builtins
+import threading
+import contextlib
+
+from ninja_ide import resources
+from ninja_ide.tools.logger import NinjaLogger
+
+logger = NinjaLogger('ninja_ide.tools.startup_profiler')
+
+REPORT_PATH = os.path.join(resources.HOME_NINJA_PATH, "startup_profile.txt")
+# Number of imports listed in the report
+REPORT_IMPORTS = 40
+
+_enabled = False
+_report_path = None
+_start = time.perf_counter()
+# (name, start, duration or None for a mark) in seconds
+_phases = []
+# module -> [cumulative time, self time]
+_imports = {}
+# Time spent in the imports done by each import running
+_stack = []
+_original_import = None
+
+
+def enabled():
+    return _enabled
+
+
+def enable(report_path=None):
+    """Start to record the phases and the imports"""
+    global _enabled, _report_path, _original_import
+    if _enabled:
+        return
+    _enabled = True
+    _report_path = report_path or REPORT_PATH
+    _original_import = builtins.__import__
+    builtins.__import__ = _timed_import
+
+
+def _module_name(name, globals_, level):
+    if not level:
+        return name
+    package = (globals_ or {}).get('__package__') or ''
+    base = package.rsplit('.', level - 1)[0]
+    return "%s.%s" % (base, name) if name else base
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if threading.current_thread() is not threading.main_thread() or \
+            (not level and not fromlist and name in sys.modules):
+        return _original_import(name, globals, locals, fromlist, level)
+    # The module imported and the sub modules in fromlist not loaded yet
+    module = _module_name(name, globals, level)
+    candidates = [candidate for candidate in
+                  [module] + ["%s.%s" % (module, sub)
+                              for sub in fromlist or () if sub != '*']
+                  if candidate not in sys.modules]
+    start = time.perf_counter()
+    _stack.append(0.0)
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        inner = _stack.pop()
+        elapsed = time.perf_counter() - start
+        if _stack:
+            _stack[-1] += elapsed
+        loaded = [candidate for candidate in candidates
+                  if candidate in sys.modules]
+        if loaded:
+            times = _imports.setdefault(", ".join(loaded), [0.0, 0.0])
+            times[0] += elapsed
+            times[1] += elapsed - inner
+
+
+@contextlib.contextmanager
+def phase(name):
+    """Record the time spent in the block as the phase name"""
+    if not _enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases.append((name, start - _start, time.perf_counter() - start))
+
+
+def mark(name):
+    """Record the time since the start when name happened"""
+    if _enabled:
+        _phases.append((name, time.perf_counter() - _start, None))
+
+
+def report():
+    """Return the text of the report"""
+    lines = ["NINJA-IDE startup profile", "",
+             "Phases (ms since the start, ms spent):"]
+    for name, start, duration in _phases:
+        if duration is None:
+            lines.append("  %8.1f            * %s" % (start * 1000, name))
+        else:
+            lines.append("  %8.1f  %8.1f  %s" % (
+                start * 1000, duration * 1000, name))
+    imports = sorted(_imports.items(), key=lambda item: -item[1][1])
+    total = sum(self_time for _, (_, self_time) in imports)
+    lines.extend(["", "Imports (ms cumulative, ms self), %d in %.1f ms:" % (
+        len(imports), total * 1000)])
+    for module, (cumulative, self_time) in imports[:REPORT_IMPORTS]:
+        lines.append("  %8.1f  %8.1f  %s" % (
+            cumulative * 1000, self_time * 1000, module))
+    return "\n".join(lines) + "\n"
+
+
+def finish():
+    """Write the report and stop recording"""
+    global _enabled
+    if not _enabled:
+        return
+    builtins.__import__ = _original_import
+    mark("Startup finished")
+    try:
+        with open(_report_path, "w") as f:
+            f.write(report())
+    except OSError as reason:
+        logger.warning("Startup profile not written: %r" % reason)
+    else:
+        logger.info("Startup profile written to %s" % _report_path)
+    _enabled = False
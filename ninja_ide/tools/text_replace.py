@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of NINJA-IDE (http://ninja-ide.org).
+#
+# NINJA-IDE is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# any later version.
+#
+# NINJA-IDE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
+"""Replace all the matches of a pattern in a text in one pass.
+
+The matches are found line by line (see text_search.finditer_lines)
+and given as (start, end, new text) spans, so an editor can apply them
+in one edit block and a preview can be shown before. Find in Files
+replaces in the files with replace_files, run by the text_search pool."""
+
+import os
+import re
+import bisect
+import shutil
+import tempfile
+
+from ninja_ide.tools import text_search
+
+# Max number of lines in a preview
+PREVIEW_LINES = 200
+
+# The chars out of the BMP, they take two UTF-16 code units
+_ASTRAL = re.compile("[\U00010000-\U0010FFFF]")
+
+
+def utf16_spans(text, spans):
+    """Return the spans of text with the positions counted in UTF-16
+    code units, like QTextDocument does"""
+    astral = [match.start() for match in _ASTRAL.finditer(text)]
+    if not astral:
+        return spans
+    return [(start + bisect.bisect_left(astral, start),
+             end + bisect.bisect_left(astral, end), new)
+            for start, end, new in spans]
+
+
+def from_utf16(text, position):
+    """Return the index in text of a position in UTF-16 code units"""
+    # Where each char out of the BMP is in UTF-16 code units
+    astral = [match.start() + number
+              for number, match in enumerate(_ASTRAL.finditer(text))]
+    return position - bisect.bisect_left(astral, position)
+
+
+def replacements(text, pattern, template, start=0, end=None, regex=False):
+    """Return the (start, end, new text) of each match of pattern in
+    text[start:end], each line is searched alone.
+
+    With regex the groups in template (\\1, \\g<name>) are expanded,
+    otherwise template is the new text."""
+    matches = text_search.finditer_lines(pattern, text, start, end)
+    if regex:
+        return [(match.start(), match.end(), match.expand(template))
+                for match in matches]
+    return [(match.start(), match.end(), template) for match in matches]
+
+
+def apply(text, spans):
+    """Return text with the spans (sorted, not overlapped) replaced"""
+    pieces = []
+    last = 0
+    for start, end, new in spans:
+        pieces.append(text[last:start])
+        pieces.append(new)
+        last = end
+    pieces.append(text[last:])
+    return "".join(pieces)
+
+
+def preview(text, spans, limit=PREVIEW_LINES):
+    """Return [(line_index, old lines, new lines)] of the lines changed
+    by spans, at most limit of them"""
+    changes = []
+    index = 0
+    line_index = 0
+    position = 0
+    while index < len(spans) and len(changes) < limit:
+        start = spans[index][0]
+        line_index += text.count("\n", position, start)
+        line_start = text.rfind("\n", 0, start) + 1
+        # The spans that touch the same lines are shown together
+        last = index
+        line_end = text.find("\n", spans[last][1])
+        while last + 1 < len(spans) and line_end != -1 and \
+                spans[last + 1][0] <= line_end:
+            last += 1
+            line_end = text.find("\n", spans[last][1])
+        if line_end == -1:
+            line_end = len(text)
+        shifted = [(span_start - line_start, span_end - line_start, new)
+                   for span_start, span_end, new in spans[index:last + 1]]
+        old = text[line_start:line_end]
+        changes.append((line_index, old, apply(old, shifted)))
+        line_index += old.count("\n")
+        position = line_end
+        index = last + 1
+    return changes
+
+
+def _write(file_path, text):
+    """Write text in file_path through a temporary file in its folder"""
+    folder = os.path.dirname(file_path)
+    fd, temp_path = tempfile.mkstemp(dir=folder, prefix=".ninja-replace-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        shutil.copymode(file_path, temp_path)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def replace_files(file_paths, pattern, template, regex=False):
+    """Replace the matches of pattern in each file of file_paths.
+
+    Returns (replaced, failed): [(file_path, number of replacements)] and
+    [(file_path, reason)]. A file that isn't valid utf-8 isn't touched."""
+    replaced = []
+    failed = []
+    for file_path in file_paths:
+        try:
+            with open(file_path, encoding="utf-8", newline="") as f:
+                text = f.read()
+            spans = replacements(text, pattern, template, regex=regex)
+            if spans:
+                _write(file_path, apply(text, spans))
+                replaced.append((file_path, len(spans)))
+        except (OSError, UnicodeDecodeError, re.error) as reason:
+            failed.append((file_path, str(reason)))
+    return replaced, failed
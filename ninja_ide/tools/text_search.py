@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of NINJA-IDE (http://ninja-ide.org).
+#
+# NINJA-IDE is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# any later version.
+#
+# NINJA-IDE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NINJA-IDE; If not, see <http://www.gnu.org/licenses/>.
+"""Search of text in the files of a folder, used by Find in Files.
+
+The files are read in bulk and the ones that can't contain the literal
+part of the pattern are discarded before running the regular expression.
+The search is done in a pool of processes."""
+
+import os
+import re
+import mmap
+import fnmatch
+import concurrent.futures
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+
+
+# Number of processes used to search the files
+WORKERS = max(1, (os.cpu_count() or 2) - 1)
+# Number of files sent to a worker in each request
+CHUNK_SIZE = 16
+# Files bigger than this are searched through mmap
+MMAP_THRESHOLD = 1024 * 1024
+# Files bigger than this are skipped
+MAX_FILE_SIZE = 32 * 1024 * 1024
+# A file with a NUL byte in this first bytes is considered binary
+BINARY_CHECK_SIZE = 8000
+# Max number of lines found in a single file
+MAX_LINES_PER_FILE = 1000
+# Files bigger than this are not added to the content index
+MAX_INDEXED_SIZE = 2 * 1024 * 1024
+
+_pool = None
+
+
+def compile_pattern(text, case_sensitive=True, regex=False,
+                    whole_words=False):
+    """Return the re pattern to search text with the options given.
+
+    It's also used by the editor to find the occurrences to replace. The
+    text is searched line by line (see finditer_lines), ^ and $ match at
+    the start and the end of each line."""
+    if not regex:
+        text = re.escape(text)
+    if whole_words:
+        text = r"\b(?:%s)\b" % text
+    flags = re.MULTILINE
+    if not case_sensitive:
+        flags |= re.IGNORECASE
+    return re.compile(text, flags)
+
+
+def finditer_lines(pattern, text, start=0, end=None):
+    """Yield the matches of pattern in text[start:end] searching each line
+    alone, a match never goes past the end of its line.
+
+    The whole text is searched to find the next line with a match, so
+    the lines without one cost a single regular expression pass."""
+    if end is None:
+        end = len(text)
+    pos = start
+    while pos <= end:
+        match = pattern.search(text, pos, end)
+        if match is None:
+            return
+        line_start = max(text.rfind('\n', 0, match.start()) + 1, pos)
+        line_end = text.find('\n', match.start(), end)
+        if line_end == -1:
+            line_end = end
+        # The match found can go past the end of its line
+        yield from pattern.finditer(text, line_start, line_end)
+        pos = line_end + 1
+
+
+def required_literal(pattern):
+    """Return the longest literal that any match of pattern contains.
+
+    The literal is encoded to be searched in the bytes of the files, it's
+    lowercase if the pattern ignores the case. Returns None when there is
+    not a useful literal."""
+    try:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    except Exception:
+        return None
+    best = current = ''
+    for op, value in parsed:
+        if op == sre_parse.LITERAL:
+            current += chr(value)
+            continue
+        best = max(best, current, key=len)
+        current = ''
+    best = max(best, current, key=len)
+    if not best:
+        return None
+    if pattern.flags & re.IGNORECASE:
+        # bytes.lower only knows about ASCII
+        if any(ord(char) > 127 for char in best):
+            return None
+        best = best.lower()
+    return best.encode('utf-8')
+
+
+def _read(file_path, literal, ignore_case):
+    """Return the content of file_path or None if it has to be skipped"""
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0 or size > MAX_FILE_SIZE:
+            return None
+        if size < MMAP_THRESHOLD:
+            data = f.read()
+            if b'\0' in data[:BINARY_CHECK_SIZE]:
+                return None
+            if literal is not None:
+                haystack = data.lower() if ignore_case else data
+                if literal not in haystack:
+                    return None
+            return data
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm.find(b'\0', 0, BINARY_CHECK_SIZE) != -1:
+                return None
+            # Don't load big files that can't match
+            if literal is not None and not ignore_case and \
+                    mm.find(literal) == -1:
+                return None
+            return mm[:]
+
+
+def search_text(text, pattern, limit=MAX_LINES_PER_FILE):
+    """Return [(line_index, line)] of the lines of text matching pattern"""
+    lines = []
+    line_index = 0
+    pos = 0
+    search = pattern.search
+    while len(lines) < limit:
+        match = search(text, pos)
+        if match is None:
+            break
+        start = match.start()
+        line_index += text.count('\n', pos, start)
+        line_start = text.rfind('\n', 0, start) + 1
+        line_end = text.find('\n', start)
+        if line_end == -1:
+            line_end = len(text)
+        # Like it's shown, a match can't go past the end of its line
+        if match.end() <= line_end or \
+                search(text, line_start, line_end) is not None:
+            lines.append(
+                (line_index, text[line_start:line_end].rstrip('\r')))
+        if line_end == len(text):
+            break
+        # Only one result for each line
+        pos = line_end + 1
+        line_index += 1
+    return lines
+
+
+def search_files(file_paths, pattern, literal):
+    """Search pattern in each file of file_paths.
+
+    Returns a list of (file_path, [(line_index, line)]) for the files
+    with at least one line found."""
+    ignore_case = bool(pattern.flags & re.IGNORECASE)
+    results = []
+    for file_path in file_paths:
+        try:
+            data = _read(file_path, literal, ignore_case)
+        except (OSError, ValueError):
+            continue
+        if data is None:
+            continue
+        lines = search_text(data.decode('utf-8', 'replace'), pattern)
+        if lines:
+            results.append((file_path, lines))
+    return results
+
+
+def file_trigrams(files):
+    """Return the lowercase trigrams of each (file_path, stamp) in files.
+
+    Returns a list of (file_path, stamp, trigrams), trigrams is a bytes
+    object with the distinct trigrams joined, None if the file is too big
+    to be indexed and b'' if it's binary or can't be read."""
+    results = []
+    for file_path, stamp in files:
+        if stamp[1] > MAX_INDEXED_SIZE:
+            results.append((file_path, stamp, None))
+            continue
+        try:
+            with open(file_path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            data = b''
+        if b'\0' in data[:BINARY_CHECK_SIZE]:
+            data = b''
+        data = data.lower()
+        trigrams = set(data[i:i + 3] for i in range(len(data) - 2))
+        results.append((file_path, stamp, b''.join(sorted(trigrams))))
+    return results
+
+
+class GitIgnore(object):
+    """Rules of the .gitignore files found while walking a folder"""
+
+    def __init__(self, rules=()):
+        # [(base folder, pattern, negated, only dirs, anchored)]
+        self._rules = list(rules)
+
+    def for_folder(self, folder):
+        """Return the rules to use inside folder"""
+        try:
+            with open(os.path.join(folder, '.gitignore')) as f:
+                lines = f.read().splitlines()
+        except (OSError, UnicodeDecodeError):
+            return self
+        rules = list(self._rules)
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            negated = line.startswith('!')
+            if negated:
+                line = line[1:]
+            only_dirs = line.endswith('/')
+            line = line.rstrip('/')
+            anchored = '/' in line
+            line = line.lstrip('/')
+            if line:
+                rules.append((folder, line, negated, only_dirs, anchored))
+        return GitIgnore(rules)
+
+    def ignored(self, path, name, is_dir):
+        result = False
+        for base, pattern, negated, only_dirs, anchored in self._rules:
+            if only_dirs and not is_dir:
+                continue
+            if anchored:
+                target = os.path.relpath(path, base).replace(os.sep, '/')
+            else:
+                target = name
+            if fnmatch.fnmatchcase(target, pattern):
+                result = not negated
+        return result
+
+
+def gitignore_for(root, folder):
+    """Return the GitIgnore to use in folder, a sub folder of root"""
+    gitignore = GitIgnore().for_folder(root)
+    relative = os.path.relpath(folder, root)
+    if relative == os.curdir:
+        return gitignore
+    current = root
+    for part in relative.split(os.sep):
+        current = os.path.join(current, part)
+        gitignore = gitignore.for_folder(current)
+    return gitignore
+
+
+def walk(path, filters, recursive=True, visited=None, skip=(),
+         gitignore=None):
+    """Yield (file_path, stamp) for each file in path matching filters.
+
+    Hidden files and folders and the ones ignored by git are skipped.
+    Each folder walked is added to visited (if given) and the sub folders
+    included in skip are not walked."""
+    if gitignore is None:
+        gitignore = GitIgnore()
+    folders = [(path, gitignore.for_folder(path))]
+    while folders:
+        folder, gitignore = folders.pop()
+        try:
+            entries = sorted(os.scandir(folder), key=lambda e: e.name)
+        except OSError:
+            # Skip not readable dirs!
+            continue
+        if visited is not None:
+            visited.add(folder)
+        sub_folders = []
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            try:
+                is_dir = entry.is_dir()
+                if gitignore.ignored(entry.path, entry.name, is_dir):
+                    continue
+                if is_dir:
+                    if recursive and entry.path not in skip:
+                        sub_folders.append(entry.path)
+                elif any(fnmatch.fnmatch(entry.name, f) for f in filters):
+                    stat = entry.stat()
+                    yield entry.path, (stat.st_mtime_ns, stat.st_size,
+                                       stat.st_ino)
+            except OSError:
+                continue
+        for sub_folder in reversed(sub_folders):
+            folders.append((sub_folder, gitignore.for_folder(sub_folder)))
+
+
+def walk_files(path, filters, recursive=True):
+    """Yield the path of each file in path with a name matching filters"""
+    for file_path, _ in walk(path, filters, recursive):
+        yield file_path
+
+
+def get_pool():
+    """Return the pool of processes used to search, create it lazily.
+
+    Each worker imports the modules of the functions it runs (this one
+    and text_replace), they must stay light."""
+    global _pool
+    if _pool is None:
+        _pool = concurrent.futures.ProcessPoolExecutor(max_workers=WORKERS)
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False)
+        _pool = None
@@ -364,6 +364,7 @@ TR_PROCESS_EXITED_NORMALLY = tr(
     "NINJA-IDE",
     "The process exited normally with code %d")
 TR_PROCESS_INTERRUPTED = tr("NINJA-IDE", "Execution Interrupted!")
+TR_OUTPUT_LOG_SAVED = tr("NINJA-IDE", "The whole output is saved in: {}")
 TR_CLOSE_TAB = tr("NINJA-IDE", "Close Tab")
 TR_CLOSE_ALL_TABS = tr("NINJA-IDE", "Close All Tabs")
 TR_CLOSE_OTHER_TABS = tr("NINJA-IDE", "Close Other Tabs")
@@ -767,6 +768,14 @@ TR_RESTORE_SIZE = tr("NINJA-IDE", "Restore Size")
 TR_COMPLETE_CHARS = tr("NINJA-IDE", "Matching Characters")
 TR_COMPLETE_BRACKETS = tr("NINJA-IDE", "Complete brackets")
 TR_COMPLETE_QUOTES = tr("NINJA-IDE", "Complete Quotes")
+TR_COMPLETION_CACHES = tr("NINJA-IDE", "Code Completion Caches")
+TR_COMPLETION_MEMORY_CACHE = tr("NINJA-IDE", "Parsed modules in memory:")
+TR_COMPLETION_DISK_CACHE = tr("NINJA-IDE", "Parsed modules on disk:")
+TR_COMPLETION_CACHE_STATS = tr(
+    "NINJA-IDE", "{modules} modules (~{megabytes} MB), {hits} hits, "
+    "{misses} misses, {disk_loads} read from disk, {evictions} evicted")
+TR_COMPLETION_CACHE_NO_STATS = tr(
+    "NINJA-IDE", "The completion server is not running")
 
 # TR_PREF_EDITOR_COMPLETE = tr("NINJA-IDE", "Complete:")
 # TR_PREF_EDITOR_PARENTHESES = tr("NINJA-IDE", "Parentheses:")
@@ -914,5 +923,18 @@ TR_REMOVE_ALL_BOOKMARKS_QUESTION = tr(
 
 # Find in files
 TR_MATCHES_FOUND = tr("NINJA-IDE", "{} matches found.")
+TR_MATCHES_FOUND_LIMITED = tr(
+    "NINJA-IDE", "{} matches found, the search was stopped.")
+TR_OCCURRENCES_REPLACED = tr("NINJA-IDE", "{} occurrences replaced.")
+TR_OCCURRENCES_REPLACED_IN_FILES = tr(
+    "NINJA-IDE", "{} occurrences replaced in {} files.")
+TR_FILES_NOT_REPLACED = tr(
+    "NINJA-IDE", "{} files could not be changed, see the log.")
+TR_REPLACE_PREVIEW = tr(
+    "NINJA-IDE", "{} lines of {} files will be changed:")
+TR_REPLACE_PREVIEW_LIMITED = tr(
+    "NINJA-IDE", "The search was stopped after {} lines of {} files, "
+    "all the files will be searched again to replace in them. "
+    "The first lines that will be changed:")
 
 TR_NO_PROJECTS = tr("NINJA-IDE", "No Projects")